@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Fake Shell - a stand-in for a user's shell, for benchmarking.
+
+It waits for a configurable startup delay, to stand in for the time a real
+shell spends reading in its config files, then adds a configurable number of
+env vars (`$BENCH_VAR_0`, `$BENCH_VAR_1`, ...) to its environment, and hands
+over to `sh` to run the script it was given:
+
+    - `fake_shell.py -ic "echo $FOO"` (or `-lc`/`-c`) runs the script
+    - `fake_shell.py -i` (or `-l`, or no flag) reads commands from stdin
+
+Options are read from the environment:
+
+    - `FAKE_SHELL_DELAY`: startup delay in seconds (default: 0)
+    - `FAKE_SHELL_VARS`: number of env vars to add (default: 0)
+"""
+
+import os
+import sys
+import time
+
+
+ENV_VAR_NAME: str = "BENCH_VAR_{index}"
+ENV_VAR_VALUE: str = "value_{index}"
+
+def main() -> None:
+    """
+    Waits out the startup delay, and runs `sh` with the fake env vars.
+    """
+    time.sleep(float(os.environ.get("FAKE_SHELL_DELAY", "0")))
+    env: dict[str, str] = {
+        **os.environ,
+        **{
+            ENV_VAR_NAME.format(index=index): ENV_VAR_VALUE.format(index=index)
+            for index in range(int(os.environ.get("FAKE_SHELL_VARS", "0")))
+        }
+    }
+    args: list[str] = sys.argv[1:]
+    flag: str = args[0] if args else ""
+    sh_args: list[str] = (
+        ["sh", "-c", args[1]]
+        if flag.startswith("-") and flag.endswith("c") and len(args) > 1
+        else ["sh"]
+    )
+
+    os.execvpe("sh", sh_args, env)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+Benchmarks for Plover Local Env Var, run against a fake shell with a
+configurable startup delay and number of env vars, so that results are
+reproducible between machines and versions.
+
+    python benchmark/run.py --delay 0.05 --vars 10000 --output results.json
+
+Results get written as JSON. Pass `--compare` with an earlier results file to
+print how each measurement has changed.
+
+The `LocalEnvVar` extension benchmarks (cold start, reconnect reload, first
+miss, and warm hit) need Plover to be installed, and are skipped otherwise.
+"""
+
+import argparse
+from datetime import (
+    datetime,
+    timezone
+)
+from importlib import metadata
+import json
+import os
+from pathlib import Path
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from typing import (
+    Any,
+    Callable,
+    Optional
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# pylint: disable=wrong-import-position
+from plover_local_env_var import (
+    cache,
+    env_var
+)
+
+
+_FAKE_SHELL: Path = Path(__file__).resolve().parent / "fake_shell.py"
+_FAKE_SHELL_NAME: str = "fakesh"
+_DEFAULT_SIZES: str = "10,100,1000,10000"
+_WARM_HIT_LOOKUPS: int = 10_000
+# NOTE: Stand-ins for the Plover steno engine and formatting context, which
+# only need to accept hooks and create actions.
+_ENGINE: SimpleNamespace = SimpleNamespace(
+    hook_connect=lambda _hook, _callback: None,
+    hook_disconnect=lambda _hook, _callback: None
+)
+_CONTEXT: SimpleNamespace = SimpleNamespace(
+    new_action=lambda: SimpleNamespace(text=None)
+)
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Runs every benchmark, and writes the results to a JSON file.
+    """
+    args: argparse.Namespace = _parse_args(argv)
+    sizes: list[int] = [int(size) for size in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory(prefix="plover-local-env-var-") as tmp:
+        _install_fake_shell(Path(tmp), args.delay, max([args.vars, *sizes]))
+        shell_command: Callable[[str], list[str]] = env_var.resolve_command()
+        results: dict[str, Any] = {
+            "expand_list": _bench_expand_list(
+                shell_command,
+                sizes,
+                args.repeat
+            ),
+            "first_miss": _bench_first_miss(shell_command, args.repeat),
+            "warm_hit": _bench_warm_hit(),
+            "extension": _bench_extension(
+                Path(tmp),
+                args.config_vars,
+                args.strategy,
+                args.repeat
+            )
+        }
+
+    report: dict[str, Any] = {
+        "version": _version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "parameters": {
+            "delay": args.delay,
+            "vars": args.vars,
+            "sizes": sizes,
+            "repeat": args.repeat,
+            "config_vars": args.config_vars,
+            "strategy": args.strategy
+        },
+        "results": results
+    }
+    Path(args.output).write_text(
+        json.dumps(report, indent=2) + "\n",
+        encoding="utf-8"
+    )
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        baseline: dict[str, Any] = json.loads(
+            Path(args.compare).read_text(encoding="utf-8")
+        )
+        for line in _compare(baseline["results"], results):
+            print(line)
+
+    return 0
+
+def _parse_args(argv: Optional[list[str]]) -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Plover Local Env Var benchmarks"
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.05,
+        help="fake shell startup delay in seconds (default: 0.05)"
+    )
+    parser.add_argument(
+        "--vars",
+        type=int,
+        default=10_000,
+        help="number of env vars the fake shell exports (default: 10000)"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=_DEFAULT_SIZES,
+        help=f"expand_list batch sizes (default: {_DEFAULT_SIZES})"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="number of times to repeat each measurement (default: 5)"
+    )
+    parser.add_argument(
+        "--config-vars",
+        type=int,
+        default=100,
+        help="number of env var names in the config file (default: 100)"
+    )
+    parser.add_argument(
+        "--strategy",
+        default="subprocess",
+        help="strategy setting for extension benchmarks (default: subprocess)"
+    )
+    parser.add_argument(
+        "--output",
+        default="benchmark_results.json",
+        help="results file (default: benchmark_results.json)"
+    )
+    parser.add_argument(
+        "--compare",
+        help="earlier results file to compare against"
+    )
+
+    return parser.parse_args(argv)
+
+def _install_fake_shell(directory: Path, delay: float, var_count: int) -> None:
+    """
+    Puts the fake shell on the PATH, and makes it the user's shell, so that
+    `env_var.resolve_command` resolves to it.
+    """
+    fake_shell: Path = directory / _FAKE_SHELL_NAME
+    shutil.copy(_FAKE_SHELL, fake_shell)
+    fake_shell.chmod(0o755)
+    os.environ["PATH"] = f"{directory}{os.pathsep}{os.environ['PATH']}"
+    os.environ["SHELL"] = str(fake_shell)
+    os.environ["FAKE_SHELL_DELAY"] = str(delay)
+    os.environ["FAKE_SHELL_VARS"] = str(var_count)
+
+def _bench_expand_list(
+    shell_command: Callable[[str], list[str]],
+    sizes: list[int],
+    repeat: int
+) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+
+    for size in sizes:
+        names: list[str] = _env_var_names(size)
+        timings: list[float] = []
+        for _run in range(repeat):
+            start: float = time.perf_counter()
+            values: dict[str, str] = env_var.expand_list(shell_command, names)
+            timings.append(time.perf_counter() - start)
+            assert len(values) == size, f"expanded {len(values)} of {size}"
+
+        summary: dict[str, float] = _summarise(timings)
+        results[str(size)] = {
+            **summary,
+            "vars_per_second": size / summary["median"]
+        }
+
+    return results
+
+def _bench_first_miss(
+    shell_command: Callable[[str], list[str]],
+    repeat: int
+) -> dict[str, float]:
+    timings: list[float] = []
+
+    for index in range(repeat):
+        value_cache: cache.ValueCache = cache.ValueCache()
+        start: float = time.perf_counter()
+        value_cache.get_or_fetch(
+            f"$BENCH_VAR_{index}",
+            lambda name: env_var.expand(shell_command, name)
+        )
+        timings.append(time.perf_counter() - start)
+
+    return _summarise(timings)
+
+def _bench_warm_hit() -> dict[str, float]:
+    value_cache: cache.ValueCache = cache.ValueCache()
+    value_cache.set("$BENCH_VAR_0", "value_0")
+    timings: list[float] = []
+
+    for _lookup in range(_WARM_HIT_LOOKUPS):
+        start: float = time.perf_counter()
+        value_cache.get_or_fetch("$BENCH_VAR_0", lambda name: name)
+        timings.append(time.perf_counter() - start)
+
+    return _summarise(timings)
+
+def _bench_extension(
+    directory: Path,
+    config_vars: int,
+    strategy: str,
+    repeat: int
+) -> dict[str, Any]:
+    try:
+        # pylint: disable=import-outside-toplevel
+        from plover.registry import registry
+        from plover_local_env_var import extension
+    except ImportError as exc:
+        return {"skipped": f"Plover not installed: {exc}"}
+
+    # NOTE: Keep the benchmarks away from the user's own config file, and
+    # any values, strategy measurements or trace saved alongside it.
+    config_dir: Path = directory / "config"
+    config_dir.mkdir(exist_ok=True)
+    timings: dict[str, list[float]] = {
+        "cold_start": [],
+        "cold_start_loaded": [],
+        "reconnect_reload": [],
+        "first_miss": [],
+        "warm_hit": []
+    }
+
+    for run in range(repeat):
+        _write_config(config_dir, config_vars, strategy)
+        local_env_var: Any = extension.LocalEnvVar(_ENGINE, config_dir)
+
+        start: float = time.perf_counter()
+        local_env_var.start()
+        timings["cold_start"].append(time.perf_counter() - start)
+        local_env_var.wait()
+        timings["cold_start_loaded"].append(time.perf_counter() - start)
+        env_var_meta: Callable[[Any, str], Any] = registry.get_plugin(
+            "meta",
+            "ENV_VAR"
+        ).obj
+
+        # NOTE: Reconnecting runs this reload, after any shell config file
+        # has changed.
+        start = time.perf_counter()
+        reload: Optional[threading.Thread] = local_env_var.reload()
+        if reload:
+            reload.join()
+        timings["reconnect_reload"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        env_var_meta(_CONTEXT, f"$BENCH_VAR_{config_vars + run}")
+        timings["first_miss"].append(time.perf_counter() - start)
+
+        for _lookup in range(_WARM_HIT_LOOKUPS // repeat):
+            start = time.perf_counter()
+            env_var_meta(_CONTEXT, "$BENCH_VAR_0")
+            timings["warm_hit"].append(time.perf_counter() - start)
+
+        local_env_var.stop()
+
+    return {name: _summarise(values) for name, values in timings.items()}
+
+def _write_config(config_dir: Path, config_vars: int, strategy: str) -> None:
+    (config_dir / "local_env_var.json").write_text(
+        json.dumps({
+            "env_var_names": _env_var_names(config_vars),
+            "strategy": strategy,
+            "stats_log_interval": 0
+        }),
+        encoding="utf-8"
+    )
+
+def _env_var_names(count: int) -> list[str]:
+    return [f"$BENCH_VAR_{index}" for index in range(count)]
+
+def _summarise(timings: list[float]) -> dict[str, float]:
+    ordered: list[float] = sorted(timings)
+
+    return {
+        "runs": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1]
+    }
+
+def _compare(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    path: str = ""
+) -> list[str]:
+    """
+    Returns a line for each median in both results, with the change from the
+    baseline as a percentage.
+    """
+    lines: list[str] = []
+
+    for key, value in current.items():
+        baseline_value: Any = baseline.get(key)
+        if not isinstance(value, dict) or not isinstance(baseline_value, dict):
+            continue
+
+        if "median" in value and "median" in baseline_value:
+            change: float = (
+                (value["median"] - baseline_value["median"])
+                / baseline_value["median"]
+                * 100
+                if baseline_value["median"]
+                else 0.0
+            )
+            lines.append(
+                f"{path}{key}: {baseline_value['median'] * 1000:.3f}ms -> "
+                f"{value['median'] * 1000:.3f}ms ({change:+.1f}%)"
+            )
+        else:
+            lines.extend(_compare(baseline_value, value, f"{path}{key}."))
+
+    return lines
+
+def _version() -> str:
+    try:
+        return metadata.version("plover_local_env_var")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Command line diagnostics for Plover Local Env Var, which can be run without
+Plover:
+
+    python -m plover_local_env_var probe '$FOO' '$BAR'
+    python -m plover_local_env_var diagnose --warm
+
+It can also run the resolver daemon, which shares a single cache of env var
+values between Plover and any other processes that use it:
+
+    python -m plover_local_env_var daemon --shell-mode login
+"""
+
+import argparse
+from pathlib import Path
+import sys
+from typing import Optional
+
+from . import (
+    config,
+    daemon,
+    diagnostics,
+    env_var
+)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Runs the diagnostic command given on the command line.
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="python -m plover_local_env_var",
+        description="Plover Local Env Var diagnostics"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    probe_parser: argparse.ArgumentParser = commands.add_parser(
+        "probe",
+        help=(
+            "time each shell mode, and check it returns the same values as "
+            "interactive mode"
+        )
+    )
+    probe_parser.add_argument(
+        "env_var_names",
+        nargs="*",
+        metavar="ENV_VAR",
+        help="env var names to compare, eg '$FOO'"
+    )
+    probe_parser.add_argument(
+        "--source-file",
+        help="file to source in the sourced file shell mode"
+    )
+    probe_parser.add_argument(
+        "--runs",
+        type=int,
+        default=3,
+        help="number of times to run each mode (default: 3)"
+    )
+    diagnose_parser: argparse.ArgumentParser = commands.add_parser(
+        "diagnose",
+        help=(
+            "time the shell, and the expansion of each env var, with the "
+            "settings in the config file"
+        )
+    )
+    diagnose_parser.add_argument(
+        "env_var_names",
+        nargs="*",
+        metavar="ENV_VAR",
+        help="env var names to expand (default: those in the config file)"
+    )
+    diagnose_parser.add_argument(
+        "--config",
+        type=Path,
+        default=_default_config_filepath(),
+        help="config file (default: the one in the Plover config directory)"
+    )
+    diagnose_parser.add_argument(
+        "--runs",
+        type=int,
+        default=3,
+        help="number of times to time the shell (default: 3)"
+    )
+    diagnose_parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="fetch env var values into any persisted or daemon cache"
+    )
+    diagnose_parser.add_argument(
+        "--socket",
+        type=Path,
+        help="resolver daemon socket to warm (default: the per-user socket)"
+    )
+    daemon_parser: argparse.ArgumentParser = commands.add_parser(
+        "daemon",
+        help="run the resolver daemon until interrupted"
+    )
+    daemon_parser.add_argument(
+        "--socket",
+        type=Path,
+        help=f"socket to listen on (default: {daemon.default_socket_path()})"
+    )
+    daemon_parser.add_argument(
+        "--shell-mode",
+        choices=env_var.SHELL_MODES,
+        default=env_var.SHELL_MODE_INTERACTIVE,
+        help=f"how to start the shell (default: {env_var.SHELL_MODE_INTERACTIVE})"
+    )
+    daemon_parser.add_argument(
+        "--source-file",
+        help="file to source in the sourced file shell mode"
+    )
+    daemon_parser.add_argument(
+        "--shell-config-file",
+        action="append",
+        default=[],
+        dest="shell_config_files",
+        help="extra file that env vars get read in from (can be repeated)"
+    )
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    if args.command == "daemon":
+        return _run_daemon(args)
+
+    if args.command == "diagnose":
+        if not args.config:
+            parser.error("--config is needed when Plover is not installed")
+        return _diagnose(args)
+
+    return _probe(args)
+
+def _probe(args: argparse.Namespace) -> int:
+    results: list[env_var.ProbeResult] = env_var.probe_shell_modes(
+        args.env_var_names,
+        args.source_file,
+        args.runs
+    )
+    print(env_var.format_probe_results(results))
+
+    return 0 if all(result.matches for result in results) else 1
+
+def _diagnose(args: argparse.Namespace) -> int:
+    try:
+        settings: config.Settings = config.load_settings(args.config)
+        env_var_names: list[str] = (
+            args.env_var_names or config.load_env_var_names(args.config)
+        )
+        diagnosis: diagnostics.Diagnosis = diagnostics.diagnose(
+            settings,
+            env_var_names,
+            args.config,
+            args.runs
+        )
+        print(diagnostics.format_diagnosis(diagnosis))
+        if args.warm:
+            for line in diagnostics.warm_caches(
+                settings,
+                env_var_names,
+                args.config,
+                args.socket
+            ):
+                print(line)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+
+    return 1 if diagnosis.failures else 0
+
+def _run_daemon(args: argparse.Namespace) -> int:
+    source_files: tuple[str, ...] = (
+        (args.source_file,) if args.source_file else ()
+    )
+    try:
+        resolver_daemon: daemon.ResolverDaemon = daemon.ResolverDaemon(
+            env_var.resolve_command(args.shell_mode, args.source_file),
+            args.socket,
+            (*args.shell_config_files, *source_files)
+        )
+        print(f"Starting resolver daemon on {resolver_daemon.socket_path}")
+        resolver_daemon.serve_forever()
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+def _default_config_filepath() -> Optional[Path]:
+    try:
+        # pylint: disable=import-outside-toplevel
+        from plover.oslayer.config import CONFIG_DIR
+    except ImportError:
+        return None
+
+    return Path(CONFIG_DIR) / config.CONFIG_BASENAME
+
+if __name__ == "__main__":
+    sys.exit(main())
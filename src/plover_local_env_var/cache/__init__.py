@@ -0,0 +1,26 @@
+"""
+# Cache
+
+A package dealing with:
+    - storing fetched env var values in memory
+    - loading env var values in the background
+    - remembering env vars that could not be expanded
+    - keeping env var values on disk between sessions
+    - remembering filtered env var values
+"""
+
+__all__ = [
+    "VALUE_CACHE_BASENAME",
+    "DiskCache",
+    "NegativeCache",
+    "TransformCache",
+    "ValueCache"
+]
+
+from .disk_cache import DiskCache
+from .negative_cache import NegativeCache
+from .transform_cache import TransformCache
+from .value_cache import ValueCache
+
+
+VALUE_CACHE_BASENAME: str = "local_env_var_values.json"
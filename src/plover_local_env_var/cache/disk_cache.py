@@ -0,0 +1,85 @@
+"""
+Disk Cache - a module for keeping env var values in a file between Plover
+sessions, so they can be served as soon as Plover starts.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import (
+    Any,
+    Optional
+)
+
+from ..config import file
+
+
+_OWNER_ONLY: int = 0o600
+
+class DiskCache:
+    """
+    A file of env var values, along with the key of the shell config they
+    were fetched with.
+
+    Values are only returned for the same key they were saved with, so
+    changes to shell config files invalidate them. The file is only readable
+    by its owner, and is replaced atomically.
+    """
+
+    _filepath: Path
+
+    def __init__(self, filepath: Path) -> None:
+        self._filepath = filepath
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """
+        Returns a key for the given parts, eg shell config file fingerprints
+        and settings.
+        """
+        return hashlib.sha256(
+            json.dumps(parts, sort_keys=True, default=repr).encode("utf-8")
+        ).hexdigest()
+
+    def load(self, key: str) -> Optional[dict[str, str]]:
+        """
+        Returns the saved values if they were saved with `key`, or `None` if
+        there are no saved values, they were saved with a different key, or
+        the file cannot be read.
+        """
+        try:
+            data: dict[str, Any] = file.load(self._filepath)
+        except (OSError, ValueError):
+            return None
+
+        if not (
+            isinstance(data, dict)
+            and data.get("key") == key
+            and isinstance(data.get("values"), dict)
+        ):
+            return None
+
+        return {
+            name: value
+            for name, value in data["values"].items()
+            if isinstance(value, str)
+        }
+
+    def save(self, key: str, values: dict[str, str]) -> None:
+        """
+        Replaces the saved values, unless they have not changed.
+        """
+        file.save(
+            self._filepath,
+            {"key": key, "values": dict(sorted(values.items()))},
+            mode=_OWNER_ONLY
+        )
+
+    def clear(self) -> None:
+        """
+        Removes the saved values.
+        """
+        try:
+            self._filepath.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,120 @@
+"""
+Negative Cache - a module for remembering env vars that have no value, so
+that they do not spawn a new shell on every lookup.
+"""
+
+import threading
+import time
+from typing import (
+    Callable,
+    NamedTuple,
+    Optional
+)
+
+from ..env_var import NoValueError
+from ..metrics import METRICS
+
+
+class _Failure(NamedTuple):
+    failures: int
+    error: str
+    retry_at: float
+
+class NegativeCache:
+    """
+    A store of env var names that have no value, along with their errors.
+
+    A failed name is not retried until `ttl` seconds have passed. Each
+    consecutive failure doubles that wait, up to `max_ttl` seconds.
+    A `ttl` of 0 disables the cache.
+    """
+
+    _clock: Callable[[], float]
+    _failures: dict[str, _Failure]
+    _lock: threading.Lock
+    _max_ttl: float
+    _ttl: float
+
+    def __init__(
+        self,
+        ttl: float,
+        max_ttl: float,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._ttl = ttl
+        self._max_ttl = max_ttl
+        self._clock = clock
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[str]:
+        """
+        Returns the error for a name that failed to expand, if it should not
+        be retried yet.
+        """
+        with self._lock:
+            failure: Optional[_Failure] = self._failures.get(name)
+
+        if failure and self._clock() < failure.retry_at:
+            return failure.error
+
+        return None
+
+    def record(self, name: str, error: str) -> None:
+        """
+        Records a failure to expand a name, backing off the next retry
+        exponentially on repeated failures.
+        """
+        if self._ttl <= 0:
+            return
+
+        with self._lock:
+            previous: Optional[_Failure] = self._failures.get(name)
+            failures: int = previous.failures + 1 if previous else 1
+            backoff: float = min(
+                self._ttl * 2 ** (failures - 1),
+                self._max_ttl
+            )
+            self._failures[name] = _Failure(
+                failures=failures,
+                error=error,
+                retry_at=self._clock() + backoff
+            )
+
+    def get_or_fetch(self, name: str, fetcher: Callable[[str], str]) -> str:
+        """
+        Returns the value fetched for a name, unless it is remembered as
+        having no value, in which case its error is raised again without
+        fetching it.
+
+        Only a `NoValueError` from `fetcher` gets remembered. Any other error
+        (eg the shell timing out, or the circuit breaker being open) is
+        raised without being remembered, as the name may well have a value.
+        """
+        error: Optional[str] = self.get(name)
+        if error:
+            METRICS.increment("negative_hits")
+            raise NoValueError(error)
+
+        try:
+            value: str = fetcher(name)
+        except NoValueError as exc:
+            self.record(name, str(exc))
+            raise
+
+        self.discard(name)
+        return value
+
+    def discard(self, name: str) -> None:
+        """
+        Forgets any failures for a name.
+        """
+        with self._lock:
+            self._failures.pop(name, None)
+
+    def clear(self) -> None:
+        """
+        Forgets all failures.
+        """
+        with self._lock:
+            self._failures.clear()
@@ -0,0 +1,58 @@
+"""
+Transform Cache - a module for remembering filtered env var values, so that
+each filter chain only gets applied once per value.
+"""
+
+import threading
+from typing import (
+    Callable,
+    Optional
+)
+
+
+class TransformCache:
+    """
+    A thread-safe store of transformed values, keyed by env var name and
+    filter chain.
+
+    Each transformed value is stored along with the value it was transformed
+    from, so it is only reused while the env var still has that value.
+    """
+
+    _lock: threading.Lock
+    _transformed: dict[tuple[str, tuple[str, ...]], tuple[str, str]]
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._transformed = {}
+
+    def get_or_transform(
+        self,
+        name: str,
+        filters: tuple[str, ...],
+        value: str,
+        transform: Callable[[str, tuple[str, ...]], str]
+    ) -> str:
+        """
+        Returns the transformed value for an env var and filter chain, or
+        transforms and stores it if its value has changed.
+        """
+        key: tuple[str, tuple[str, ...]] = (name, filters)
+        with self._lock:
+            cached: Optional[tuple[str, str]] = self._transformed.get(key)
+
+        if cached and cached[0] == value:
+            return cached[1]
+
+        transformed: str = transform(value, filters)
+        with self._lock:
+            self._transformed[key] = (value, transformed)
+
+        return transformed
+
+    def clear(self) -> None:
+        """
+        Removes all transformed values.
+        """
+        with self._lock:
+            self._transformed.clear()
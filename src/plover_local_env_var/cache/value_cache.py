@@ -0,0 +1,263 @@
+"""
+Value Cache - a module for storing env var values in memory, and loading
+them in the background.
+"""
+
+from dataclasses import (
+    dataclass,
+    field
+)
+import threading
+from typing import (
+    Callable,
+    Optional
+)
+
+
+@dataclass
+class _Fetch:
+    """
+    A fetch of a single value that other lookups for the same name can wait
+    on.
+    """
+    done: threading.Event = field(default_factory=threading.Event)
+    error: Optional[BaseException] = None
+    value: Optional[str] = None
+
+# NOTE: ValueCache keeps separate state for loads, reloads, and single fetches
+# so that none of them block the others, so it has more attributes than other
+# classes.
+class ValueCache: # pylint: disable=too-many-instance-attributes
+    """
+    A thread-safe, in-memory store of env var values.
+
+    Values can be loaded on a background thread, and any lookups that arrive
+    while that load is in flight wait for it to finish, rather than having
+    to fetch values themselves, unless the load has already cached the value
+    they are looking up.
+
+    Once loaded, values can be reloaded on a background thread: the current
+    values keep being served until the reloaded values are swapped in.
+
+    Concurrent lookups of the same uncached name share a single fetch.
+    """
+
+    _fetched: dict[str, str]
+    _fetches: dict[str, _Fetch]
+    _loaded: threading.Event
+    _lock: threading.Lock
+    _reload_lock: threading.Lock
+    _reload_pending: bool
+    _reloading: bool
+    _values: dict[str, str]
+
+    def __init__(self) -> None:
+        self._values = {}
+        self._fetched = {}
+        self._fetches = {}
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._loaded.set()
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._reload_pending = False
+
+    def load(
+        self,
+        loader: Callable[[], dict[str, str]],
+        on_error: Optional[Callable[[Exception], None]] = None
+    ) -> threading.Thread:
+        """
+        Replaces the cached values with those returned by `loader`, which is
+        run on a background thread. Any values the loader caches before it
+        finishes can be looked up straight away.
+
+        If `loader` raises an error, only the values it cached before failing
+        are kept, and the error is passed to `on_error`.
+        """
+        with self._lock:
+            self._values = {}
+        self._loaded.clear()
+        thread: threading.Thread = threading.Thread(
+            target=self._load,
+            args=(loader, on_error),
+            name="plover-local-env-var-load",
+            daemon=True
+        )
+        thread.start()
+
+        return thread
+
+    def reload(
+        self,
+        loader: Callable[[], dict[str, str]],
+        on_error: Optional[Callable[[Exception], None]] = None
+    ) -> Optional[threading.Thread]:
+        """
+        Swaps in the values returned by `loader`, which is run on a background
+        thread, while the current values continue to be served.
+
+        Reloads requested while one is already in flight collapse into a
+        single follow-up reload, which gets run once the in-flight one
+        finishes. In that case, no new thread is started.
+
+        If `loader` raises an error, the current values are kept, and the
+        error is passed to `on_error`.
+        """
+        with self._reload_lock:
+            if self._reloading:
+                self._reload_pending = True
+                return None
+
+            self._reloading = True
+
+        thread: threading.Thread = threading.Thread(
+            target=self._reload,
+            args=(loader, on_error),
+            name="plover-local-env-var-reload",
+            daemon=True
+        )
+        thread.start()
+
+        return thread
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits for any in-flight load to finish.
+        """
+        return self._loaded.wait(timeout)
+
+    def get(self, name: str) -> Optional[str]:
+        """
+        Returns the cached value for a name, waiting on any in-flight load
+        if it has not cached the name yet.
+        """
+        with self._lock:
+            value: Optional[str] = self._values.get(name)
+        if value is not None:
+            return value
+
+        self._loaded.wait()
+
+        with self._lock:
+            return self._values.get(name)
+
+    def get_or_fetch(self, name: str, fetcher: Callable[[str], str]) -> str:
+        """
+        Returns the cached value for a name, or fetches and caches it.
+
+        If the same name is already being fetched on another thread, this
+        waits for that fetch rather than starting another one. Any error
+        raised by that fetch is raised for all lookups waiting on it.
+        """
+        # NOTE: Also waits on any in-flight load, if it has not cached the
+        # name yet.
+        value: Optional[str] = self.get(name)
+        if value is not None:
+            return value
+
+        with self._lock:
+            value = self._values.get(name)
+            if value is not None:
+                return value
+
+            fetch: Optional[_Fetch] = self._fetches.get(name)
+            if fetch:
+                owner: bool = False
+            else:
+                fetch = self._fetches[name] = _Fetch()
+                owner = True
+
+        if not owner:
+            fetch.done.wait()
+            if fetch.error:
+                raise fetch.error
+
+            assert fetch.value is not None
+            return fetch.value
+
+        try:
+            fetch.value = fetcher(name)
+            self.set(name, fetch.value)
+        except BaseException as exc:
+            fetch.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._fetches[name]
+            fetch.done.set()
+
+        return fetch.value
+
+    def set(self, name: str, value: str) -> None:
+        """
+        Caches a single value.
+        """
+        self.update({name: value})
+
+    def update(self, values: dict[str, str]) -> None:
+        """
+        Caches a set of values.
+
+        NOTE: Values cached while a reload is in flight are also kept after
+        the reload, unless the reload found its own value for them.
+        """
+        with self._lock:
+            self._values.update(values)
+            if self._reloading:
+                self._fetched.update(values)
+
+    def items(self) -> dict[str, str]:
+        """
+        Returns a copy of all cached values.
+        """
+        with self._lock:
+            return dict(self._values)
+
+    def names(self) -> list[str]:
+        """
+        Returns the sorted names of all cached values.
+        """
+        with self._lock:
+            return sorted(self._values.keys())
+
+    def _load(
+        self,
+        loader: Callable[[], dict[str, str]],
+        on_error: Optional[Callable[[Exception], None]]
+    ) -> None:
+        try:
+            values: dict[str, str] = loader()
+            with self._lock:
+                self._values = values
+        except Exception as exc: # pylint: disable=broad-exception-caught
+            if on_error:
+                on_error(exc)
+        finally:
+            self._loaded.set()
+
+    def _reload(
+        self,
+        loader: Callable[[], dict[str, str]],
+        on_error: Optional[Callable[[Exception], None]]
+    ) -> None:
+        while True:
+            # NOTE: Wait for any initial load to finish so it cannot
+            # overwrite reloaded values.
+            self._loaded.wait()
+            try:
+                values: dict[str, str] = loader()
+                with self._lock:
+                    self._values = {**self._fetched, **values}
+            except Exception as exc: # pylint: disable=broad-exception-caught
+                if on_error:
+                    on_error(exc)
+
+            with self._reload_lock:
+                if not self._reload_pending:
+                    self._reloading = False
+                    with self._lock:
+                        self._fetched.clear()
+                    return
+
+                self._reload_pending = False
@@ -3,18 +3,67 @@
 
 A package dealing with:
     - loading and saving config containing env var names
+    - loading behaviour settings
+    - choosing the cheapest strategy for fetching env var values
+    - saving env var names, and how often they get used, in the background
 """
 
 __all__ = [
     "CONFIG_BASENAME",
+    "STRATEGY_MEASUREMENTS_BASENAME",
+    "ConfigPersister",
+    "RESOLVER_DOTENV",
+    "RESOLVER_ENVIRON",
+    "RESOLVER_SHELL",
+    "STRATEGY_AUTO",
+    "STRATEGY_COPROCESS",
+    "STRATEGY_SNAPSHOT",
+    "STRATEGY_SUBPROCESS",
+    "Settings",
+    "StrategyMeasurement",
+    "StrategySelector",
+    "Usage",
+    "choose_strategy",
+    "dependency_filepaths",
+    "format_measurements",
     "load",
+    "load_env_var_names",
+    "load_idle_env_var_names",
+    "load_settings",
+    "prune",
+    "record",
     "save"
 ]
 
+from .dependencies import dependency_filepaths
 from .loader import (
     load,
+    load_env_var_names,
+    load_idle_env_var_names,
+    load_settings,
+    prune,
+    record,
     save
 )
+from .persister import ConfigPersister
+from .selector import (
+    StrategyMeasurement,
+    StrategySelector,
+    choose_strategy,
+    format_measurements
+)
+from .settings import (
+    RESOLVER_DOTENV,
+    RESOLVER_ENVIRON,
+    RESOLVER_SHELL,
+    STRATEGY_AUTO,
+    STRATEGY_COPROCESS,
+    STRATEGY_SNAPSHOT,
+    STRATEGY_SUBPROCESS,
+    Settings
+)
+from .usage import Usage
 
 
 CONFIG_BASENAME: str = "local_env_var.json"
+STRATEGY_MEASUREMENTS_BASENAME: str = "local_env_var_strategy.json"
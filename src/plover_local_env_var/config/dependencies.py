@@ -0,0 +1,34 @@
+"""
+Dependencies - a module for working out which files, other than the config
+file, env var values depend on with a given set of settings.
+"""
+
+from pathlib import Path
+
+from .. import env_var
+from .settings import (
+    RESOLVER_DOTENV,
+    Settings
+)
+
+
+def dependency_filepaths(settings: Settings) -> list[Path]:
+    """
+    Returns the paths of the files that env var values depend on: the shell
+    config files, any sourced file, and any dotenv file.
+    """
+    source_files: tuple[str, ...] = (
+        (settings.shell_source_file,) if settings.shell_source_file else ()
+    )
+    dotenv_filepaths: list[Path] = (
+        [Path(settings.dotenv_file).expanduser()]
+        if RESOLVER_DOTENV in settings.resolvers
+        else []
+    )
+
+    return [
+        *env_var.shell_config_filepaths(
+            (*settings.shell_config_files, *source_files)
+        ),
+        *dotenv_filepaths
+    ]
@@ -3,8 +3,19 @@ Module to handle reading and writing to JSON
 """
 
 import json
+import os
 from pathlib import Path
-from typing import Any
+import tempfile
+import time
+from typing import (
+    Any,
+    Optional
+)
+
+from ..metrics import (
+    METRICS,
+    TRACER
+)
 
 
 def load(filepath: Path) -> dict[str, Any]:
@@ -25,10 +36,50 @@ def load(filepath: Path) -> dict[str, Any]:
 
     return data
 
-def save(filepath: Path, data: dict[str, Any]) -> None:
+def save(
+    filepath: Path,
+    data: dict[str, Any],
+    mode: Optional[int] = None
+) -> None:
     """
-    Saves a dictionary to a JSON file.
+    Saves a dictionary to a JSON file, with the given permissions `mode`, or
+    else those of the file being replaced.
+
+    The file is replaced atomically, by writing to a temporary file and then
+    renaming it, so that it can never be left half-written. Nothing is written
+    if the file contents would not change.
     """
-    with filepath.open("w", encoding="utf-8") as file:
-        json.dump(data, file, indent=2)
-        file.close()
+    start: float = time.perf_counter()
+    contents: str = json.dumps(data, indent=2)
+    try:
+        if filepath.read_text(encoding="utf-8") == contents:
+            return
+    except FileNotFoundError:
+        pass
+
+    file_descriptor, temp_filepath = tempfile.mkstemp(
+        dir=filepath.parent,
+        prefix=f".{filepath.name}.",
+        suffix=".tmp"
+    )
+    try:
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+            file.write(contents)
+            file.close()
+        if mode is not None:
+            os.chmod(temp_filepath, mode)
+        elif filepath.exists():
+            os.chmod(temp_filepath, filepath.stat().st_mode)
+        os.replace(temp_filepath, filepath)
+    except BaseException:
+        os.unlink(temp_filepath)
+        raise
+
+    METRICS.increment("config_writes")
+    if TRACER.sampled():
+        TRACER.record(
+            "save",
+            filename=filepath.name,
+            bytes=len(contents.encode("utf-8")),
+            seconds=time.perf_counter() - start
+        )
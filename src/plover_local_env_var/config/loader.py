@@ -2,52 +2,234 @@
 Module to handle reading in the application JSON config file.
 """
 
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor
+)
 from pathlib import Path
+import time
 from typing import (
     Any,
-    Callable
+    Callable,
+    Optional
 )
 
 from .. import env_var
+from ..metrics import METRICS
 from . import (
     file,
-    transformer
+    transformer,
+    usage
 )
+from .settings import Settings
+
 
+# NOTE: The number of most used env vars that get expanded on their own, so
+# that they are available before the rest have been expanded.
+_HOT_BATCH_SIZE: int = 20
 
-def load(
+# NOTE: Loading takes optional callbacks for how to expand, hand over, and
+# prune env vars, alongside the shell and config file, so it has more
+# arguments than other functions.
+def load( # pylint: disable=too-many-arguments,too-many-positional-arguments
     shell_command: Callable[[str], list[str]],
-    config_filepath: Path
+    config_filepath: Path,
+    expander: Optional[Callable[[list[str]], env_var.BatchResult]] = None,
+    idle_after: float = 0.0,
+    on_values: Optional[Callable[[dict[str, str]], None]] = None,
+    pruner: Optional[Callable[[list[str]], None]] = None
 ) -> dict[str, str]:
     """
-    Reads in the config JSON file and expands each variable.
+    Reads in the config JSON file and expands each variable, with `expander`
+    if provided (eg a resolver chain), or else with the shell.
+
+    The most used variables get expanded first, and if there are more than a
+    handful, their values get passed to `on_values` as soon as they are
+    available. Variables not used in the last `idle_after` seconds do not get
+    expanded at all (0 means always expand them).
+
+    Variables that had no value get removed from the config file, but those
+    that could not be expanded because the shell errored (eg timed out) are
+    kept, so that they get tried again. They get removed with `pruner` if
+    provided (eg a ConfigPersister, so that the write cannot race its own),
+    or else straight away.
 
     Raises an error if the specified config file is not JSON format.
     """
+    start: float = time.perf_counter()
     data: dict[str, Any] = file.load(config_filepath) # extractor function
     env_var_names: list[str] = transformer.transform_inbound(data)
 
     if not env_var_names:
         return {}
 
-    env_vars: dict[str, str] = env_var.expand_list(shell_command, env_var_names)
-    _save_any_changes(config_filepath, env_var_names, env_vars)
+    env_var_usage: dict[str, usage.Usage] = transformer.transform_usage(data)
+    eager_env_var_names: list[str] = usage.eager_env_var_names(
+        env_var_names,
+        env_var_usage,
+        idle_after,
+        time.time()
+    )
+    result: env_var.BatchResult = (
+        _expand_hot_first(
+            expander
+            or (lambda names: env_var.expand_batch(shell_command, names)),
+            eager_env_var_names,
+            on_values
+        )
+        if eager_env_var_names
+        else env_var.BatchResult(values={}, failed=[], errored=[])
+    )
+    if pruner:
+        pruner(result.failed)
+    else:
+        prune(config_filepath, result.failed)
+    METRICS.increment("config_loads")
+    METRICS.observe("config_load_seconds", time.perf_counter() - start)
+
+    return result.values
 
-    return env_vars
+def load_env_var_names(config_filepath: Path) -> list[str]:
+    """
+    Reads in the env var names from the config JSON file, without expanding
+    them.
 
-def save(config_filepath: Path, env_var_names: list[str]) -> None:
+    Raises an error if the specified config file is not JSON format.
     """
-    Saves the set of env var names to the config JSON file.
+    data: dict[str, Any] = file.load(config_filepath)
+
+    return transformer.transform_inbound(data)
+
+def load_idle_env_var_names(
+    config_filepath: Path,
+    idle_after: float
+) -> list[str]:
     """
-    data: dict[str, list[str]] = transformer.transform_outbound(env_var_names)
+    Reads in the env var names from the config JSON file that have not been
+    used in the last `idle_after` seconds (0 means none of them).
+
+    Raises an error if the specified config file is not JSON format.
+    """
+    data: dict[str, Any] = file.load(config_filepath)
+
+    return usage.idle_env_var_names(
+        transformer.transform_inbound(data),
+        transformer.transform_usage(data),
+        idle_after,
+        time.time()
+    )
+
+def load_settings(config_filepath: Path) -> Settings:
+    """
+    Reads in the behaviour settings from the config JSON file.
+
+    Raises an error if the specified config file is not JSON format, or a
+    setting has an invalid value.
+    """
+    data: dict[str, Any] = file.load(config_filepath)
+
+    return transformer.transform_settings(data)
+
+def save(
+    config_filepath: Path,
+    env_var_names: list[str],
+    uses: Optional[dict[str, usage.Usage]] = None
+) -> None:
+    """
+    Saves the set of env var names to the config JSON file, along with their
+    usage, leaving any other settings in it untouched.
+
+    Any `uses` get added to the usage already saved. Names with no usage yet
+    get saved as first seen now, so that they can become idle if never used.
+    """
+    data: dict[str, Any] = file.load(config_filepath)
+    env_var_usage: dict[str, usage.Usage] = transformer.transform_usage(data)
+    now: float = time.time()
+
+    for name, use in (uses or {}).items():
+        env_var_usage[name] = env_var_usage.get(name, usage.Usage()).merge(use)
+
+    for name in env_var_names:
+        env_var_usage.setdefault(name, usage.Usage(last_used=now))
+
+    data.update(transformer.transform_outbound(env_var_names, env_var_usage))
     file.save(config_filepath, data)
 
-def _save_any_changes(
+def prune(config_filepath: Path, env_var_names: list[str]) -> None:
+    """
+    Removes env var names that had no value from those saved in the config
+    JSON file, and records when any names with no usage were first seen.
+
+    NOTE: The names saved get read in again, rather than reusing those read
+    in before expanding, so that names saved in the meantime are kept.
+    """
+    data: dict[str, Any] = file.load(config_filepath)
+    saved_env_var_names: list[str] = transformer.transform_inbound(data)
+    env_var_usage: dict[str, usage.Usage] = transformer.transform_usage(data)
+    kept_env_var_names: list[str] = sorted(
+        set(saved_env_var_names) - set(env_var_names)
+    )
+
+    if kept_env_var_names != saved_env_var_names or any(
+        name not in env_var_usage for name in kept_env_var_names
+    ):
+        save(config_filepath, kept_env_var_names)
+
+def record(
     config_filepath: Path,
     env_var_names: list[str],
-    env_vars: dict[str, str]
+    uses: dict[str, usage.Usage]
 ) -> None:
-    sorted_env_var_names: list[str] = sorted(env_vars.keys())
+    """
+    Adds env var names, and any uses of env vars, to those already saved in
+    the config JSON file. Uses of env vars with no saved name are ignored.
+    """
+    save(
+        config_filepath,
+        sorted({*load_env_var_names(config_filepath), *env_var_names}),
+        uses
+    )
+
+def _expand_hot_first(
+    expander: Callable[[list[str]], env_var.BatchResult],
+    env_var_names: list[str],
+    on_values: Optional[Callable[[dict[str, str]], None]]
+) -> env_var.BatchResult:
+    """
+    Expands the first, most used, env var names alongside the rest, handing
+    their values to `on_values` without waiting for the rest.
+
+    If the rest could not be expanded at all, they are reported as errored,
+    so that the values already handed over still count as loaded.
+    """
+    hot_env_var_names: list[str] = env_var_names[:_HOT_BATCH_SIZE]
+    cold_env_var_names: list[str] = env_var_names[_HOT_BATCH_SIZE:]
+
+    if not on_values or not cold_env_var_names:
+        return expander(env_var_names)
+
+    with ThreadPoolExecutor(
+        max_workers=1,
+        thread_name_prefix="plover-local-env-var-cold"
+    ) as executor:
+        cold_result: Future[env_var.BatchResult] = executor.submit(
+            expander,
+            cold_env_var_names
+        )
+        hot_result: env_var.BatchResult = expander(hot_env_var_names)
+        on_values(dict(hot_result.values))
+
+        try:
+            rest: env_var.BatchResult = cold_result.result()
+        except ValueError:
+            rest = env_var.BatchResult(
+                values={},
+                failed=[],
+                errored=cold_env_var_names
+            )
 
-    if sorted_env_var_names != env_var_names:
-        save(config_filepath, sorted_env_var_names)
+        return env_var.BatchResult(
+            values={**hot_result.values, **rest.values},
+            failed=[*hot_result.failed, *rest.failed],
+            errored=[*hot_result.errored, *rest.errored]
+        )
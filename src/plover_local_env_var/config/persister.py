@@ -0,0 +1,170 @@
+"""
+Persister - a module for saving env var names, and how often they get used,
+to the config JSON file in the background, so that disk writes stay off the
+stroke output path.
+"""
+
+from pathlib import Path
+import threading
+import time
+from typing import (
+    Callable,
+    Optional
+)
+
+from . import loader
+from .usage import Usage
+
+
+_DEFAULT_DELAY: float = 1.0
+_DEFAULT_USAGE_DELAY: float = 60.0
+
+# NOTE: ConfigPersister keeps its delays and callbacks alongside the names and
+# uses waiting to be written, and a lock for each, so it has more attributes
+# than other classes.
+class ConfigPersister: # pylint: disable=too-many-instance-attributes
+    """
+    Write-behind saver of env var names and usage.
+
+    Names scheduled to be saved within `delay` seconds of each other are
+    coalesced into a single write, which adds them to the names already
+    saved. Uses of env vars are counted in memory, and written at most every
+    `usage_delay` seconds, along with any names. `on_save` gets called after
+    each write, and `on_error` with any error writing, in which case the names
+    and uses are kept to be written with the next write.
+
+    NOTE: The config file is read and written outside of the lock that
+    scheduling names and counting uses take, so that lookups never wait on
+    the disk.
+    """
+
+    _config_filepath: Path
+    _delay: float
+    _lock: threading.Lock
+    _on_error: Optional[Callable[[Exception], None]]
+    _on_save: Optional[Callable[[], None]]
+    _pending_env_var_names: Optional[set[str]]
+    _pending_uses: dict[str, Usage]
+    _timer: Optional[threading.Timer]
+    _usage_delay: float
+    _write_lock: threading.Lock
+
+    def __init__(
+        self,
+        config_filepath: Path,
+        delay: float = _DEFAULT_DELAY,
+        on_save: Optional[Callable[[], None]] = None,
+        usage_delay: float = _DEFAULT_USAGE_DELAY,
+        on_error: Optional[Callable[[Exception], None]] = None
+    ) -> None:
+        self._config_filepath = config_filepath
+        self._delay = delay
+        self._on_save = on_save
+        self._on_error = on_error
+        self._usage_delay = usage_delay
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending_env_var_names = None
+        self._pending_uses = {}
+        self._timer = None
+
+    def schedule(self, env_var_names: list[str]) -> None:
+        """
+        Schedules a set of env var names to be saved after the delay, along
+        with any names already waiting to be saved.
+        """
+        with self._lock:
+            self._pending_env_var_names = {
+                *(self._pending_env_var_names or ()),
+                *env_var_names
+            }
+            if self._timer:
+                self._timer.cancel()
+            self._start_timer(self._delay)
+
+    def record_use(self, env_var_name: str) -> None:
+        """
+        Counts a use of an env var, to be saved with the next write.
+        """
+        use: Usage = Usage(1, time.time())
+        with self._lock:
+            pending_use: Optional[Usage] = self._pending_uses.get(env_var_name)
+            self._pending_uses[env_var_name] = (
+                pending_use.merge(use) if pending_use else use
+            )
+            if not self._timer:
+                self._start_timer(self._usage_delay)
+
+    def flush(self) -> None:
+        """
+        Saves any env var names and uses waiting to be saved straight away.
+        """
+        # NOTE: Writes are serialised, so that one cannot overwrite the names
+        # and uses added by another.
+        with self._write_lock:
+            with self._lock:
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+                env_var_names: Optional[set[str]] = (
+                    self._pending_env_var_names
+                )
+                uses: dict[str, Usage] = self._pending_uses
+                self._pending_env_var_names = None
+                self._pending_uses = {}
+
+            if env_var_names is None and not uses:
+                return
+
+            try:
+                loader.record(
+                    self._config_filepath,
+                    sorted(env_var_names or ()),
+                    uses
+                )
+            except (OSError, ValueError) as exc:
+                self._restore(env_var_names, uses)
+                if self._on_error:
+                    self._on_error(exc)
+                return
+
+        if self._on_save:
+            self._on_save()
+
+    def prune(self, env_var_names: list[str]) -> None:
+        """
+        Removes env var names that had no value from the config file straight
+        away, serialised with the writes of any names and uses.
+        """
+        with self._write_lock:
+            try:
+                loader.prune(self._config_filepath, env_var_names)
+            except (OSError, ValueError) as exc:
+                if self._on_error:
+                    self._on_error(exc)
+                return
+
+        if self._on_save:
+            self._on_save()
+
+    def _restore(
+        self,
+        env_var_names: Optional[set[str]],
+        uses: dict[str, Usage]
+    ) -> None:
+        with self._lock:
+            if env_var_names is not None:
+                self._pending_env_var_names = {
+                    *(self._pending_env_var_names or ()),
+                    *env_var_names
+                }
+            for name, use in uses.items():
+                pending_use: Optional[Usage] = self._pending_uses.get(name)
+                self._pending_uses[name] = (
+                    pending_use.merge(use) if pending_use else use
+                )
+
+    def _start_timer(self, delay: float) -> None:
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
@@ -0,0 +1,313 @@
+"""
+Selector - a module for choosing the cheapest strategy that gives correct
+results on the local machine, by timing each strategy with small probes of
+the shell.
+"""
+
+from pathlib import Path
+import time
+from typing import (
+    Any,
+    Callable,
+    NamedTuple,
+    Optional
+)
+
+from .. import env_var
+from . import file
+from .settings import (
+    STRATEGY_AUTO,
+    STRATEGY_COPROCESS,
+    STRATEGY_SNAPSHOT,
+    STRATEGY_SUBPROCESS
+)
+
+
+# NOTE: Only a handful of env var names get used to check each strategy
+# returns the same values as the subprocess strategy, to keep probes cheap.
+_SAMPLE_SIZE: int = 5
+# NOTE: The number of lookups of env vars not already in memory a session is
+# assumed to have, which weighs the cost of each miss against the cost of
+# setting up a strategy.
+_EXPECTED_MISSES: int = 10
+# NOTE: With no env var names to sample, misses get timed with a name that
+# is never set.
+_UNSET_NAME: str = "$PLOVER_LOCAL_ENV_VAR_UNSET"
+
+class StrategyMeasurement(NamedTuple):
+    """
+    The cost of a strategy: the seconds it takes to set up and load env var
+    values, and the seconds it takes to fetch each env var not already in
+    memory. Along with the names of any env vars whose values differ from
+    those of the subprocess strategy.
+    """
+    strategy: str
+    setup_seconds: float
+    miss_seconds: float
+    mismatched: list[str]
+    error: Optional[str]
+
+    @property
+    def correct(self) -> bool:
+        """
+        Whether the strategy returned the same values as the subprocess
+        strategy.
+        """
+        return not self.error and not self.mismatched
+
+    @property
+    def cost(self) -> float:
+        """
+        The estimated seconds spent on the shell with this strategy over a
+        session.
+        """
+        return self.setup_seconds + _EXPECTED_MISSES * self.miss_seconds
+
+class StrategySelector:
+    """
+    Measures the cost of each strategy, keeping the measurements in a file
+    so that they only need to be taken again when the shell config changes.
+    """
+
+    _filepath: Path
+
+    def __init__(self, filepath: Path) -> None:
+        self._filepath = filepath
+
+    def select(
+        self,
+        shell_command_resolver: Callable[[str], list[str]],
+        env_var_names: list[str],
+        key: str
+    ) -> list[StrategyMeasurement]:
+        """
+        Returns the measurements saved with `key` (eg a hash of the shell
+        config), or else measures each strategy with `env_var_names`, and
+        saves the measurements.
+        """
+        measurements: Optional[list[StrategyMeasurement]] = self.saved(key)
+
+        if measurements is None:
+            measurements = measure_strategies(
+                shell_command_resolver,
+                env_var_names
+            )
+            try:
+                file.save(
+                    self._filepath,
+                    {
+                        "key": key,
+                        "measurements": [
+                            measurement._asdict()
+                            for measurement in measurements
+                        ]
+                    }
+                )
+            except OSError:
+                # NOTE: The measurements just get taken again next time.
+                pass
+
+        return measurements
+
+    def starting_strategy(self, strategy: str, key: str) -> str:
+        """
+        Returns the strategy to start fetching env var values with: the
+        `strategy` setting, or with the auto strategy, the one chosen from the
+        measurements saved with `key`, or else the subprocess strategy.
+        """
+        if strategy != STRATEGY_AUTO:
+            return strategy
+
+        measurements: Optional[list[StrategyMeasurement]] = self.saved(key)
+
+        return (
+            choose_strategy(measurements)
+            if measurements
+            else STRATEGY_SUBPROCESS
+        )
+
+    def clear(self) -> None:
+        """
+        Removes any saved measurements.
+        """
+        try:
+            self._filepath.unlink()
+        except FileNotFoundError:
+            pass
+
+    def saved(self, key: str) -> Optional[list[StrategyMeasurement]]:
+        """
+        Returns the measurements saved with `key`, if any.
+        """
+        try:
+            data: dict[str, Any] = file.load(self._filepath)
+            if data.get("key") != key:
+                return None
+
+            return [
+                StrategyMeasurement(**measurement)
+                for measurement in data["measurements"]
+            ]
+        except (KeyError, OSError, TypeError, ValueError):
+            return None
+
+def measure_strategies(
+    shell_command_resolver: Callable[[str], list[str]],
+    env_var_names: list[str]
+) -> list[StrategyMeasurement]:
+    """
+    Times each strategy with the first few env var names, and checks each
+    strategy returns the same values as the subprocess strategy.
+
+    NOTE: With no env var names, there is nothing to check the snapshot
+    strategy against, and it cannot be told apart from a shell that does not
+    export its env vars, so it does not count as correct.
+    """
+    sample: list[str] = env_var_names[:_SAMPLE_SIZE]
+    measurements: list[StrategyMeasurement] = []
+    expected: dict[str, str] = {}
+    load_seconds: float = 0.0
+
+    for strategy, measure in (
+        (STRATEGY_SUBPROCESS, _measure_subprocess),
+        (STRATEGY_COPROCESS, _measure_coprocess),
+        (STRATEGY_SNAPSHOT, _measure_snapshot)
+    ):
+        setup_seconds: float = 0.0
+        miss_seconds: float = 0.0
+        values: dict[str, str] = {}
+        error: Optional[str] = None
+        try:
+            setup_seconds, miss_seconds, values = measure(
+                shell_command_resolver,
+                sample
+            )
+        except ValueError as exc:
+            error = str(exc)
+
+        if strategy == STRATEGY_SUBPROCESS:
+            expected = values
+            load_seconds = setup_seconds
+        elif strategy == STRATEGY_COPROCESS:
+            # NOTE: Env var values still get loaded in a single batch with
+            # the coprocess strategy, before the shell gets started up.
+            setup_seconds += load_seconds
+        elif strategy == STRATEGY_SNAPSHOT and not sample and not error:
+            error = "No env var names to check values against"
+
+        measurements.append(
+            StrategyMeasurement(
+                strategy=strategy,
+                setup_seconds=setup_seconds,
+                miss_seconds=miss_seconds,
+                mismatched=[
+                    name
+                    for name in sample
+                    if values.get(name) != expected.get(name)
+                ],
+                error=error
+            )
+        )
+
+    return measurements
+
+def choose_strategy(measurements: list[StrategyMeasurement]) -> str:
+    """
+    Returns the cheapest strategy that gave correct results, or the
+    subprocess strategy if none did.
+    """
+    correct: list[StrategyMeasurement] = [
+        measurement for measurement in measurements if measurement.correct
+    ]
+
+    if not correct:
+        return STRATEGY_SUBPROCESS
+
+    return min(correct, key=lambda measurement: measurement.cost).strategy
+
+def format_measurements(measurements: list[StrategyMeasurement]) -> str:
+    """
+    Formats measurements on a single line, eg for the Plover log.
+    """
+    formatted: list[str] = []
+
+    for measurement in measurements:
+        if measurement.error:
+            outcome: str = f"error: {measurement.error}"
+        elif measurement.mismatched:
+            outcome = f"differs: {', '.join(measurement.mismatched)}"
+        else:
+            outcome = (
+                f"{measurement.setup_seconds * 1000:.0f}ms setup + "
+                f"{measurement.miss_seconds * 1000:.0f}ms/miss"
+            )
+
+        formatted.append(f"{measurement.strategy} ({outcome})")
+
+    return ", ".join(formatted)
+
+def _measure_subprocess(
+    shell_command_resolver: Callable[[str], list[str]],
+    sample: list[str]
+) -> tuple[float, float, dict[str, str]]:
+    start: float = time.perf_counter()
+    values: dict[str, str] = (
+        env_var.expand_batch(shell_command_resolver, sample).values
+        if sample
+        else {}
+    )
+    setup_seconds: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _expand(shell_command_resolver, sample[0] if sample else _UNSET_NAME)
+
+    return setup_seconds, time.perf_counter() - start, values
+
+def _measure_coprocess(
+    shell_command_resolver: Callable[[str], list[str]],
+    sample: list[str]
+) -> tuple[float, float, dict[str, str]]:
+    coprocess: env_var.ShellCoprocess = env_var.ShellCoprocess(
+        shell_command_resolver
+    )
+    values: dict[str, str] = {}
+    miss_seconds: list[float] = []
+    try:
+        # NOTE: The first request pays for starting up the shell.
+        start: float = time.perf_counter()
+        _expand(shell_command_resolver, _UNSET_NAME, coprocess.run_script)
+        setup_seconds: float = time.perf_counter() - start
+
+        for name in sample or [_UNSET_NAME]:
+            start = time.perf_counter()
+            value: str = _expand(
+                shell_command_resolver,
+                name,
+                coprocess.run_script
+            )
+            miss_seconds.append(time.perf_counter() - start)
+            if value:
+                values[name] = value
+    finally:
+        coprocess.close()
+
+    return setup_seconds, min(miss_seconds), values
+
+def _measure_snapshot(
+    shell_command_resolver: Callable[[str], list[str]],
+    _sample: list[str]
+) -> tuple[float, float, dict[str, str]]:
+    start: float = time.perf_counter()
+    values: dict[str, str] = env_var.snapshot(shell_command_resolver)
+
+    return time.perf_counter() - start, 0.0, values
+
+def _expand(
+    shell_command_resolver: Callable[[str], list[str]],
+    name: str,
+    runner: Optional[Callable[[str], str]] = None
+) -> str:
+    try:
+        return env_var.expand(shell_command_resolver, name, runner)
+    except env_var.NoValueError:
+        return ""
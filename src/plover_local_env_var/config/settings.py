@@ -0,0 +1,113 @@
+"""
+Settings - a module for the behaviour options that can be set in the
+application JSON config file.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from ..env_var.command import SHELL_MODE_INTERACTIVE
+
+
+STRATEGY_SUBPROCESS: str = "subprocess"
+STRATEGY_COPROCESS: str = "coprocess"
+STRATEGY_SNAPSHOT: str = "snapshot"
+STRATEGY_AUTO: str = "auto"
+STRATEGIES: tuple[str, ...] = (
+    STRATEGY_SUBPROCESS,
+    STRATEGY_COPROCESS,
+    STRATEGY_SNAPSHOT,
+    STRATEGY_AUTO
+)
+RESOLVER_ENVIRON: str = "environ"
+RESOLVER_DOTENV: str = "dotenv"
+RESOLVER_SHELL: str = "shell"
+RESOLVERS: tuple[str, ...] = (RESOLVER_ENVIRON, RESOLVER_DOTENV, RESOLVER_SHELL)
+
+# NOTE: Settings has a field for each setting in the config file, so it has
+# more attributes than other classes.
+@dataclass(frozen=True)
+class Settings: # pylint: disable=too-many-instance-attributes
+    """
+    Behaviour options for the plugin.
+
+    `strategy` determines how env var values not already in memory get
+    resolved:
+        - "subprocess": spawn a new shell for every expansion (default)
+        - "coprocess": keep a single shell running and send it expansion
+          requests
+        - "snapshot": fetch every exported env var from a single shell run,
+          and serve all values from that snapshot
+        - "auto": time each of the above with small probes, and use the
+          cheapest one that gives the same values as "subprocess", checking
+          again whenever shell config files change
+
+    `shell_config_files` are any files, beyond the standard shell config
+    files, that env vars get read in from. If none of them, nor the config
+    file itself, have changed since env vars were last fetched, reconnecting
+    does not fetch them again.
+
+    `watch` determines whether those files get watched in the background, so
+    that changes to them are picked up without needing to reconnect.
+
+    `negative_cache_ttl` is the number of seconds to wait before trying to
+    fetch an env var with no value again. The wait doubles on each failure, up
+    to `negative_cache_max_ttl` seconds. A `negative_cache_ttl` of 0 means
+    always try again.
+
+    `shell_timeout` is the number of seconds a shell gets to respond before it
+    is killed (0 means no timeout). After `circuit_breaker_threshold` shell
+    failures or timeouts in a row, no shells get started for
+    `circuit_breaker_cool_down` seconds.
+
+    `shell_mode` determines how the shell gets started on macOS and Linux:
+        - "interactive": read in the whole interactive shell config (default)
+        - "login": read in only the login shell config
+        - "source": read in only `shell_source_file`
+
+    `stats_log_interval` is the number of seconds between writing runtime
+    metrics to the Plover log (0 means never).
+
+    `persist_values` determines whether env var values get kept in a file
+    next to the config file, so that they can be served as soon as Plover
+    starts, while they get checked against the shell in the background.
+
+    `resolvers` is the ordered chain of backends that env var names get
+    looked up in, with each name falling through to the next backend if not
+    found:
+        - "environ": Plover's own process environment
+        - "dotenv": the `.env`-style file at `dotenv_file`
+        - "shell": the shell, using the configured `strategy` (default)
+
+    `use_daemon` determines whether env vars the shell resolver looks up get
+    resolved by a running resolver daemon, which shares its values with
+    every other process using it. When the daemon is not running, or does
+    not respond within `shell_timeout` seconds, they get resolved in-process
+    as usual, and a daemon that timed out does not get used again for
+    `circuit_breaker_cool_down` seconds.
+
+    `idle_after_days` is the number of days after which an env var that has
+    not been used stops being fetched when env vars are loaded, and only gets
+    fetched when it is next used (0 means never).
+
+    `trace_sample_rate` is the fraction of lookups, between 0 and 1, that get
+    traced, along with any shell runs and config file writes, to a JSON
+    lines file next to the config file (0 means never).
+    """
+    strategy: str = STRATEGY_SUBPROCESS
+    shell_config_files: tuple[str, ...] = ()
+    watch: bool = False
+    negative_cache_ttl: float = 5.0
+    negative_cache_max_ttl: float = 300.0
+    shell_timeout: float = 10.0
+    circuit_breaker_threshold: int = 3
+    circuit_breaker_cool_down: float = 60.0
+    resolvers: tuple[str, ...] = (RESOLVER_SHELL,)
+    dotenv_file: str = "~/.env"
+    shell_mode: str = SHELL_MODE_INTERACTIVE
+    shell_source_file: Optional[str] = None
+    stats_log_interval: float = 300.0
+    persist_values: bool = False
+    use_daemon: bool = False
+    idle_after_days: float = 0.0
+    trace_sample_rate: float = 0.0
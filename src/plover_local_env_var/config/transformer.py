@@ -5,12 +5,37 @@ Module to handle transforming information from the application JSON config file
 into a form the application can work with.
 """
 
-from typing import Any
+from typing import (
+    Any,
+    Optional
+)
+
+from ..env_var.command import (
+    SHELL_MODES,
+    SHELL_MODE_SOURCE
+)
+from .settings import (
+    RESOLVERS,
+    STRATEGIES,
+    Settings
+)
+from .usage import Usage
+
+
+CONFIG_VERSION: int = 2
+# NOTE: Version 1 config files are a flat list of `env_var_names`, with no
+# `version` or `usage`.
+_CONFIG_VERSIONS: tuple[int, ...] = (1, CONFIG_VERSION)
+_USAGE_ERROR: str = (
+    "'usage' must map env var names to their non-negative 'hits' and "
+    "'last_used' times."
+)
 
 def transform_inbound(data: dict[str, Any]) -> list[str]:
     """
     Transform inbound config data, providing defaults values where not provided.
     """
+    _transform_version(data)
     env_var_names: list[str] = data.get("env_var_names", [])
 
     if (
@@ -21,8 +46,237 @@ def transform_inbound(data: dict[str, Any]) -> list[str]:
 
     raise ValueError("'env_var_names' must be a list of strings.")
 
-def transform_outbound(env_var_names: list[str]) -> dict[str, list[str]]:
+def transform_usage(data: dict[str, Any]) -> dict[str, Usage]:
     """
-    Transform filepaths into outbound config data.
+    Transform inbound config data into the usage of each env var, which is
+    only present from version 2 config files onwards.
     """
-    return {"env_var_names": env_var_names}
+    if _transform_version(data) < CONFIG_VERSION:
+        return {}
+
+    usage: Any = data.get("usage", {})
+
+    if not isinstance(usage, dict):
+        raise ValueError(_USAGE_ERROR)
+
+    return {
+        name: _transform_env_var_usage(env_var_usage)
+        for name, env_var_usage in usage.items()
+    }
+
+def transform_settings(data: dict[str, Any]) -> Settings:
+    """
+    Transform inbound config data into settings, providing default values
+    where not provided.
+    """
+    strategy: str = data.get("strategy", Settings.strategy)
+
+    if strategy not in STRATEGIES:
+        raise ValueError(
+            f"'strategy' must be one of: {', '.join(STRATEGIES)}."
+        )
+
+    shell_config_files: list[str] = data.get("shell_config_files", [])
+
+    if not (
+        isinstance(shell_config_files, list)
+        and all(isinstance(filepath, str) for filepath in shell_config_files)
+    ):
+        raise ValueError("'shell_config_files' must be a list of strings.")
+
+    negative_cache_ttl: float = _transform_duration(
+        data,
+        "negative_cache_ttl",
+        Settings.negative_cache_ttl
+    )
+    negative_cache_max_ttl: float = _transform_duration(
+        data,
+        "negative_cache_max_ttl",
+        Settings.negative_cache_max_ttl
+    )
+    shell_timeout: float = _transform_duration(
+        data,
+        "shell_timeout",
+        Settings.shell_timeout
+    )
+    circuit_breaker_threshold: int = data.get(
+        "circuit_breaker_threshold",
+        Settings.circuit_breaker_threshold
+    )
+
+    if (
+        isinstance(circuit_breaker_threshold, bool)
+        or not isinstance(circuit_breaker_threshold, int)
+        or circuit_breaker_threshold < 1
+    ):
+        raise ValueError(
+            "'circuit_breaker_threshold' must be a positive integer."
+        )
+
+    circuit_breaker_cool_down: float = _transform_duration(
+        data,
+        "circuit_breaker_cool_down",
+        Settings.circuit_breaker_cool_down
+    )
+
+    resolvers: list[str] = data.get("resolvers", list(Settings.resolvers))
+
+    if not (
+        isinstance(resolvers, list)
+        and resolvers
+        and all(resolver in RESOLVERS for resolver in resolvers)
+        and len(set(resolvers)) == len(resolvers)
+    ):
+        raise ValueError(
+            "'resolvers' must be a non-empty list of unique resolvers from: "
+            f"{', '.join(RESOLVERS)}."
+        )
+
+    dotenv_file: str = data.get("dotenv_file", Settings.dotenv_file)
+
+    if not isinstance(dotenv_file, str):
+        raise ValueError("'dotenv_file' must be a string.")
+
+    shell_mode: str = data.get("shell_mode", Settings.shell_mode)
+
+    if shell_mode not in SHELL_MODES:
+        raise ValueError(
+            f"'shell_mode' must be one of: {', '.join(SHELL_MODES)}."
+        )
+
+    shell_source_file: Optional[str] = data.get(
+        "shell_source_file",
+        Settings.shell_source_file
+    )
+
+    if shell_source_file is not None and not isinstance(shell_source_file, str):
+        raise ValueError("'shell_source_file' must be a string.")
+
+    if shell_mode == SHELL_MODE_SOURCE and not shell_source_file:
+        raise ValueError(
+            f"'shell_source_file' must be set for the '{SHELL_MODE_SOURCE}' "
+            "shell mode."
+        )
+
+    stats_log_interval: float = _transform_duration(
+        data,
+        "stats_log_interval",
+        Settings.stats_log_interval
+    )
+    trace_sample_rate: Any = data.get(
+        "trace_sample_rate",
+        Settings.trace_sample_rate
+    )
+
+    if not (
+        _is_non_negative(trace_sample_rate, (int, float))
+        and trace_sample_rate <= 1
+    ):
+        raise ValueError("'trace_sample_rate' must be a number from 0 to 1.")
+
+    return Settings(
+        strategy=strategy,
+        shell_config_files=tuple(shell_config_files),
+        watch=_transform_bool(data, "watch", Settings.watch),
+        negative_cache_ttl=negative_cache_ttl,
+        negative_cache_max_ttl=negative_cache_max_ttl,
+        shell_timeout=shell_timeout,
+        circuit_breaker_threshold=circuit_breaker_threshold,
+        circuit_breaker_cool_down=circuit_breaker_cool_down,
+        resolvers=tuple(resolvers),
+        dotenv_file=dotenv_file,
+        shell_mode=shell_mode,
+        shell_source_file=shell_source_file,
+        stats_log_interval=stats_log_interval,
+        persist_values=_transform_bool(
+            data,
+            "persist_values",
+            Settings.persist_values
+        ),
+        use_daemon=_transform_bool(data, "use_daemon", Settings.use_daemon),
+        idle_after_days=_transform_duration(
+            data,
+            "idle_after_days",
+            Settings.idle_after_days,
+            "days"
+        ),
+        trace_sample_rate=float(trace_sample_rate)
+    )
+
+def transform_outbound(
+    env_var_names: list[str],
+    usage: dict[str, Usage]
+) -> dict[str, Any]:
+    """
+    Transform env var names, and their usage, into outbound config data.
+
+    NOTE: `env_var_names` are still written as a flat list, so that earlier
+    versions can read in config files written by later ones.
+    """
+    return {
+        "version": CONFIG_VERSION,
+        "env_var_names": env_var_names,
+        "usage": {
+            name: {
+                "hits": usage[name].hits,
+                "last_used": round(usage[name].last_used)
+            }
+            for name in env_var_names
+            if name in usage
+        }
+    }
+
+def _transform_duration(
+    data: dict[str, Any],
+    key: str,
+    default: float,
+    unit: str = "seconds"
+) -> float:
+    duration: Any = data.get(key, default)
+
+    if not _is_non_negative(duration, (int, float)):
+        raise ValueError(f"'{key}' must be a non-negative number of {unit}.")
+
+    return float(duration)
+
+def _transform_bool(data: dict[str, Any], key: str, default: bool) -> bool:
+    value: Any = data.get(key, default)
+
+    if not isinstance(value, bool):
+        raise ValueError(f"'{key}' must be a boolean.")
+
+    return value
+
+def _transform_version(data: dict[str, Any]) -> int:
+    version: Any = data.get("version", 1)
+
+    if isinstance(version, bool) or version not in _CONFIG_VERSIONS:
+        raise ValueError(
+            "'version' must be one of: "
+            f"{', '.join(str(version) for version in _CONFIG_VERSIONS)}."
+        )
+
+    return int(version)
+
+def _transform_env_var_usage(env_var_usage: Any) -> Usage:
+    if not isinstance(env_var_usage, dict):
+        raise ValueError(_USAGE_ERROR)
+
+    hits: Any = env_var_usage.get("hits", 0)
+    last_used: Any = env_var_usage.get("last_used", 0)
+
+    if not (
+        _is_non_negative(hits, (int,))
+        and _is_non_negative(last_used, (int, float))
+    ):
+        raise ValueError(_USAGE_ERROR)
+
+    return Usage(hits, float(last_used))
+
+def _is_non_negative(value: Any, types: tuple[type[float], ...]) -> bool:
+    # NOTE: bool is a subclass of int, but is not a valid number.
+    return (
+        not isinstance(value, bool)
+        and isinstance(value, types)
+        and value >= 0
+    )
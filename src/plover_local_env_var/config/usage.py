@@ -0,0 +1,76 @@
+"""
+Usage - a module for tracking how often, and how recently, each env var gets
+used, so that the most used env vars can be fetched first, and env vars that
+have not been used for a long time only get fetched when needed.
+"""
+
+from typing import NamedTuple
+
+
+class Usage(NamedTuple):
+    """
+    The number of times an env var has been used, and when it was last used,
+    in seconds since the epoch.
+    """
+    hits: int = 0
+    last_used: float = 0.0
+
+    def merge(self, other: "Usage") -> "Usage":
+        """
+        Returns the usage with the hits of both added together, and the later
+        of their last used times.
+        """
+        return Usage(
+            self.hits + other.hits,
+            max(self.last_used, other.last_used)
+        )
+
+def eager_env_var_names(
+    env_var_names: list[str],
+    usage: dict[str, Usage],
+    idle_after: float,
+    now: float
+) -> list[str]:
+    """
+    Returns the env var names that should be fetched up front, most used
+    first, leaving out any not used in the last `idle_after` seconds (0 means
+    never leave any out).
+
+    NOTE: Names with no usage recorded yet (eg from a config file saved by an
+    earlier version) are always fetched, as there is no telling how recently
+    they were used.
+    """
+    eager: list[str] = [
+        name
+        for name in env_var_names
+        if not (
+            idle_after
+            and name in usage
+            and now - usage[name].last_used > idle_after
+        )
+    ]
+
+    # NOTE: Sorting is stable, so names with the same usage keep their order.
+    return sorted(
+        eager,
+        key=lambda name: (
+            -usage.get(name, Usage()).hits,
+            -usage.get(name, Usage()).last_used
+        )
+    )
+
+def idle_env_var_names(
+    env_var_names: list[str],
+    usage: dict[str, Usage],
+    idle_after: float,
+    now: float
+) -> list[str]:
+    """
+    Returns the env var names not used in the last `idle_after` seconds, which
+    only get fetched when they are next used.
+    """
+    eager: set[str] = set(
+        eager_env_var_names(env_var_names, usage, idle_after, now)
+    )
+
+    return [name for name in env_var_names if name not in eager]
@@ -0,0 +1,23 @@
+"""
+# Daemon
+
+A package dealing with:
+    - running a resolver daemon that keeps a single warm cache of env var
+      values for every process on a per-user Unix domain socket
+    - resolving env vars through the daemon, falling back to resolving them
+      in-process when it is not running
+"""
+
+__all__ = [
+    "DaemonClient",
+    "ResolverDaemon",
+    "daemon_backend",
+    "default_socket_path"
+]
+
+from .client import (
+    DaemonClient,
+    daemon_backend
+)
+from .protocol import default_socket_path
+from .server import ResolverDaemon
@@ -0,0 +1,137 @@
+"""
+Client - a module for resolving env vars through the resolver daemon.
+"""
+
+from pathlib import Path
+import socket
+import time
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Optional,
+    cast
+)
+
+from .. import env_var
+from . import protocol
+
+
+_DEFAULT_TIMEOUT: float = 30.0
+_DEFAULT_COOL_DOWN: float = 60.0
+
+class DaemonClient:
+    """
+    Sends requests to the resolver daemon listening on `socket_path`.
+
+    Each request uses its own connection, so a client can be shared between
+    threads.
+
+    NOTE: Requests are only sent if the socket directory belongs to the
+    current user, and only they can access it, as otherwise another user
+    could be serving values in place of the daemon.
+
+    A daemon that takes longer than `timeout` seconds to respond (`None`
+    means no timeout) does not get sent any more requests for `cool_down`
+    seconds, so that a hung daemon does not hold up every stroke.
+    """
+
+    _cool_down: float
+    _socket_path: Path
+    _timeout: Optional[float]
+    _timed_out_until: float
+
+    def __init__(
+        self,
+        socket_path: Optional[Path] = None,
+        timeout: Optional[float] = _DEFAULT_TIMEOUT,
+        cool_down: float = _DEFAULT_COOL_DOWN
+    ) -> None:
+        self._socket_path = socket_path or protocol.default_socket_path()
+        self._timeout = timeout
+        self._cool_down = cool_down
+        self._timed_out_until = 0.0
+
+    def resolve(self, env_var_names: list[str]) -> dict[str, Any]:
+        """
+        Asks the daemon for env var values, returning the values it found,
+        the errors for any it could not, and the names of those it could not
+        because the shell errored, rather than because they have no value.
+
+        Raises an `OSError` if the daemon is not running, or does not respond
+        in time.
+        """
+        return self._request({"op": protocol.OP_RESOLVE, "names": env_var_names})
+
+    def reload(self) -> None:
+        """
+        Asks the daemon to drop its cached values, so they get fetched again.
+
+        Raises an `OSError` if the daemon is not running.
+        """
+        self._request({"op": protocol.OP_RELOAD})
+
+    def is_running(self) -> bool:
+        """
+        Returns whether the daemon is running and responding.
+        """
+        try:
+            self._request({"op": protocol.OP_PING})
+        except (OSError, ValueError):
+            return False
+
+        return True
+
+    def _request(self, message: dict[str, Any]) -> dict[str, Any]:
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix domain sockets are not supported")
+        if time.monotonic() < self._timed_out_until:
+            raise OSError("Resolver daemon recently timed out")
+        if not protocol.is_private_directory(self._socket_path.parent):
+            raise PermissionError(
+                "Socket directory not private to the current user: "
+                f"{self._socket_path.parent}"
+            )
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(self._timeout)
+            try:
+                connection.connect(str(self._socket_path))
+                connection.sendall(protocol.encode(message))
+                with connection.makefile("rb") as stream:
+                    return protocol.read(cast(BinaryIO, stream))
+            except socket.timeout:
+                self._timed_out_until = time.monotonic() + self._cool_down
+                raise
+
+def daemon_backend(
+    client: DaemonClient,
+    fallback: Callable[[list[str]], dict[str, str]]
+) -> Callable[[list[str]], dict[str, str]]:
+    """
+    Returns a resolver chain backend that resolves env var names through the
+    daemon, or with `fallback` if the daemon is not running.
+
+    A single env var that the daemon could not resolve raises its error, as a
+    `NoValueError` if it has no value. Env vars that the daemon's shell
+    errored on raise a `BatchError` with the values of the rest.
+    """
+    def _resolve(env_var_names: list[str]) -> dict[str, str]:
+        try:
+            response: dict[str, Any] = client.resolve(env_var_names)
+        except (OSError, ValueError):
+            return fallback(env_var_names)
+
+        values: dict[str, str] = response.get("values", {})
+        errors: dict[str, str] = response.get("errors", {})
+        errored: list[str] = response.get("errored", [])
+        if len(env_var_names) == 1 and env_var_names[0] in errors:
+            if env_var_names[0] in errored:
+                raise ValueError(errors[env_var_names[0]])
+            raise env_var.NoValueError(errors[env_var_names[0]])
+        if errored:
+            raise env_var.BatchError(values, errored)
+
+        return values
+
+    return _resolve
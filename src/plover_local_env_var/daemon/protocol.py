@@ -0,0 +1,83 @@
+"""
+Protocol - a module for the messages sent between the resolver daemon and
+its clients: a single line of JSON each way, per connection.
+"""
+
+import getpass
+import json
+import os
+from pathlib import Path
+import stat
+import tempfile
+from typing import (
+    Any,
+    BinaryIO
+)
+
+
+OP_PING: str = "ping"
+OP_RELOAD: str = "reload"
+OP_RESOLVE: str = "resolve"
+OWNER_ONLY_DIRECTORY: int = 0o700
+_SOCKET_BASENAME: str = "resolver.sock"
+
+def default_socket_path() -> Path:
+    """
+    Returns the path of the current user's daemon socket, in a directory that
+    only they can access.
+    """
+    runtime_dir: str = (
+        os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    )
+
+    return (
+        Path(runtime_dir)
+        / f"plover-local-env-var-{getpass.getuser()}"
+        / _SOCKET_BASENAME
+    )
+
+def is_owned_directory(directory: Path) -> bool:
+    """
+    Returns whether a directory (and not a link to one) belongs to the
+    current user.
+
+    Raises an `OSError` if it does not exist.
+    """
+    status: os.stat_result = os.lstat(directory)
+
+    return stat.S_ISDIR(status.st_mode) and status.st_uid == os.getuid()
+
+def is_private_directory(directory: Path) -> bool:
+    """
+    Returns whether a directory belongs to the current user, and only they
+    can access it, so that no other user can have put a socket in it.
+
+    Raises an `OSError` if it does not exist.
+    """
+    return (
+        is_owned_directory(directory)
+        and stat.S_IMODE(os.lstat(directory).st_mode) == OWNER_ONLY_DIRECTORY
+    )
+
+def encode(message: dict[str, Any]) -> bytes:
+    """
+    Encodes a message as a single line of JSON.
+    """
+    return json.dumps(message).encode("utf-8") + b"\n"
+
+def read(stream: BinaryIO) -> dict[str, Any]:
+    """
+    Reads a single message from a stream.
+
+    Raises an error if the message is not a JSON object.
+    """
+    line: bytes = stream.readline()
+    try:
+        message: Any = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("Unable to decode daemon message") from exc
+
+    if not isinstance(message, dict):
+        raise ValueError("Unable to decode daemon message")
+
+    return message
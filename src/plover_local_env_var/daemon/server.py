@@ -0,0 +1,274 @@
+"""
+Server - a module for the resolver daemon, which keeps a single warm cache of
+env var values, and serves them to any process on the same machine over a
+per-user Unix domain socket.
+"""
+
+import os
+from pathlib import Path
+import socket
+import socketserver
+import threading
+import time
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Iterable,
+    Optional,
+    cast
+)
+
+from .. import (
+    cache,
+    env_var
+)
+from . import protocol
+
+
+_OWNER_ONLY_SOCKET: int = 0o600
+# NOTE: Shell config files are checked for changes at most this often, so
+# that a burst of requests does not stat them all on every request.
+_FINGERPRINT_INTERVAL: float = 1.0
+
+# NOTE: ResolverDaemon keeps the state for checking shell config files for
+# changes alongside its cache and server, so it has more attributes than
+# other classes.
+class ResolverDaemon: # pylint: disable=too-many-instance-attributes
+    """
+    Resolves env var names sent by clients, caching their values so that the
+    shell only ever gets asked for each one once.
+
+    Cached values are dropped when a client asks for a reload, or when any
+    shell config files change.
+    """
+
+    _fingerprint: dict[str, Optional[tuple[int, int]]]
+    _fingerprint_checked: float
+    _lock: threading.Lock
+    _server: Optional[socketserver.BaseServer]
+    _shell_backend: Callable[[list[str]], dict[str, str]]
+    _shell_config_filepaths: list[Path]
+    _socket_path: Path
+    _values: cache.ValueCache
+
+    def __init__(
+        self,
+        shell_command_resolver: Callable[[str], list[str]],
+        socket_path: Optional[Path] = None,
+        shell_config_files: Iterable[str] = ()
+    ) -> None:
+        self._shell_backend = env_var.shell_backend(shell_command_resolver)
+        self._socket_path = socket_path or protocol.default_socket_path()
+        self._shell_config_filepaths = env_var.shell_config_filepaths(
+            shell_config_files
+        )
+        self._values = cache.ValueCache()
+        self._lock = threading.Lock()
+        self._fingerprint = env_var.fingerprint(self._shell_config_filepaths)
+        self._fingerprint_checked = time.monotonic()
+        self._server = None
+
+    @property
+    def socket_path(self) -> Path:
+        """
+        Returns the path of the socket the daemon listens on.
+        """
+        return self._socket_path
+
+    def serve_forever(self, ready: Optional[threading.Event] = None) -> None:
+        """
+        Listens for clients until `shutdown` is called, setting `ready` once
+        the socket is accepting connections.
+
+        Raises an error if another daemon is already listening on the socket.
+        """
+        self._prepare_socket_path()
+        server: _Server = _Server(str(self._socket_path), self)
+        os.chmod(self._socket_path, _OWNER_ONLY_SOCKET)
+        self._server = server
+        if ready:
+            ready.set()
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            self._socket_path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        """
+        Stops listening for clients.
+        """
+        if self._server:
+            self._server.shutdown()
+            self._server = None
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        """
+        Returns the response to a single client request.
+
+        Names in a resolve request that are not env var names get an error,
+        without being sent to the shell.
+        """
+        operation: Any = request.get("op")
+
+        if operation == protocol.OP_PING:
+            return {"ok": True}
+
+        if operation == protocol.OP_RELOAD:
+            self._reload()
+            return {"ok": True}
+
+        names: Any = request.get("names")
+        if operation == protocol.OP_RESOLVE and (
+            isinstance(names, list)
+            and all(isinstance(name, str) for name in names)
+        ):
+            return self._resolve(names)
+
+        return {"error": f"Invalid request: {request}"}
+
+    def _resolve(self, env_var_names: list[str]) -> dict[str, Any]:
+        self._reload_if_changed()
+        values: cache.ValueCache = self._values
+        found: dict[str, str] = {}
+        errors: dict[str, str] = {}
+        errored: list[str] = []
+        unfetched_env_var_names: list[str] = []
+
+        for name in env_var_names:
+            # NOTE: Any process that can connect to the socket can send
+            # names, so anything that is not an env var name never gets near
+            # the shell.
+            if env_var.bare_name(name) is None:
+                errors[name] = f"Provided value not an $ENV_VAR: {name}"
+                continue
+
+            value: Optional[str] = values.get(name)
+            if value is None:
+                unfetched_env_var_names.append(name)
+            else:
+                found[name] = value
+
+        if len(unfetched_env_var_names) == 1:
+            name = unfetched_env_var_names[0]
+            try:
+                found[name] = values.get_or_fetch(
+                    name,
+                    lambda env_var_name: self._shell_backend(
+                        [env_var_name]
+                    )[env_var_name]
+                )
+            except env_var.NoValueError as exc:
+                errors[name] = str(exc)
+            except ValueError as exc:
+                errors[name] = str(exc)
+                errored.append(name)
+        elif unfetched_env_var_names:
+            try:
+                fetched: dict[str, str] = self._shell_backend(
+                    unfetched_env_var_names
+                )
+            except env_var.BatchError as exc:
+                fetched = exc.values
+                errors.update({name: str(exc) for name in exc.errored})
+                errored.extend(exc.errored)
+            except ValueError as exc:
+                fetched = {}
+                errors.update(
+                    {name: str(exc) for name in unfetched_env_var_names}
+                )
+                errored.extend(unfetched_env_var_names)
+            values.update(fetched)
+            found.update(fetched)
+
+        for name in unfetched_env_var_names:
+            if name not in found and name not in errors:
+                errors[name] = f"No value found for env var: {name}"
+
+        return {"values": found, "errors": errors, "errored": errored}
+
+    def _reload(self) -> None:
+        # NOTE: Swapping in a new cache means any fetch in flight only
+        # caches its value in the old one.
+        self._values = cache.ValueCache()
+
+    def _reload_if_changed(self) -> None:
+        with self._lock:
+            if (
+                time.monotonic() - self._fingerprint_checked
+                < _FINGERPRINT_INTERVAL
+            ):
+                return
+
+            self._fingerprint_checked = time.monotonic()
+            fingerprint: dict[str, Optional[tuple[int, int]]] = (
+                env_var.fingerprint(self._shell_config_filepaths)
+            )
+            if fingerprint == self._fingerprint:
+                return
+
+            self._fingerprint = fingerprint
+
+        self._reload()
+
+    def _prepare_socket_path(self) -> None:
+        """
+        Creates the socket directory, only accessible by the current user,
+        and removes any socket left behind by a daemon that did not shut down
+        cleanly.
+
+        Raises an error if the socket directory already exists, but belongs
+        to another user, as they could have put their own socket in it.
+        """
+        directory: Path = self._socket_path.parent
+        directory.mkdir(
+            mode=protocol.OWNER_ONLY_DIRECTORY,
+            parents=True,
+            exist_ok=True
+        )
+        if not protocol.is_owned_directory(directory):
+            raise ValueError(
+                f"Socket directory not owned by the current user: {directory}"
+            )
+        os.chmod(directory, protocol.OWNER_ONLY_DIRECTORY)
+
+        if not self._socket_path.exists():
+            return
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            try:
+                connection.connect(str(self._socket_path))
+            except OSError:
+                self._socket_path.unlink()
+                return
+
+        raise ValueError(
+            f"Resolver daemon already running on {self._socket_path}"
+        )
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        response: dict[str, Any]
+        try:
+            request: dict[str, Any] = protocol.read(cast(BinaryIO, self.rfile))
+            response = self.server.resolver_daemon.handle(request)
+        except ValueError as exc:
+            response = {"error": str(exc)}
+
+        try:
+            self.wfile.write(protocol.encode(response))
+        except OSError:
+            # NOTE: The client went away without waiting for a response, eg
+            # another daemon checking whether this one is still running.
+            pass
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    resolver_daemon: ResolverDaemon
+
+    def __init__(self, socket_path: str, resolver_daemon: ResolverDaemon) -> None:
+        self.resolver_daemon = resolver_daemon
+        super().__init__(socket_path, _Handler)
@@ -0,0 +1,227 @@
+"""
+Diagnostics - a module for timing the shell, and the expansion of each
+configured env var, with the settings in the config file, without needing to
+start Plover. It can also pre-warm any persisted value cache, and any running
+resolver daemon.
+"""
+
+from pathlib import Path
+import shlex
+import time
+from typing import (
+    NamedTuple,
+    Optional
+)
+
+from . import (
+    cache,
+    config,
+    daemon,
+    env_var,
+    resolver
+)
+
+
+_PLACEHOLDER_ENV_VAR: str = "$ENV_VAR"
+
+class VariableTiming(NamedTuple):
+    """
+    How long a single env var took to fetch when not already in memory, and
+    the error if it could not be.
+    """
+    name: str
+    seconds: float
+    error: Optional[str]
+
+class Diagnosis(NamedTuple):
+    """
+    The resolved shell command, the strategy env var values get fetched
+    with, the fastest times for starting up the shell and echoing every env
+    var in a single batch, and the timings of each env var fetched on its
+    own.
+    """
+    shell_command: list[str]
+    strategy: str
+    startup_seconds: float
+    echo_seconds: float
+    timings: list[VariableTiming]
+
+    @property
+    def failures(self) -> list[VariableTiming]:
+        """
+        The timings of env vars that could not be expanded.
+        """
+        return [timing for timing in self.timings if timing.error]
+
+def diagnose(
+    settings: config.Settings,
+    env_var_names: list[str],
+    config_filepath: Path,
+    runs: int = 3
+) -> Diagnosis:
+    """
+    Times starting up the shell configured in `settings` with nothing to run,
+    and expanding `env_var_names` in a single batch, taking the fastest of
+    `runs` runs each, so the difference between them is the time spent
+    echoing env vars. Then times fetching each env var on its own through the
+    configured resolvers, with the strategy Plover starts with, as happens
+    when an env var is not already in memory.
+
+    With the auto strategy, that is the strategy chosen from any measurements
+    saved next to the config file.
+
+    Raises an error if the shell cannot be started.
+    """
+    env_var_resolver: resolver.Resolver = _resolver(settings, config_filepath)
+    try:
+        startup_seconds: float = env_var.time_expansion(
+            env_var_resolver.shell_command,
+            [],
+            runs
+        )[0]
+        batch_seconds: float = (
+            env_var.time_expansion(
+                env_var_resolver.shell_command,
+                env_var_names,
+                runs
+            )[0]
+            if env_var_names
+            else startup_seconds
+        )
+        timings: list[VariableTiming] = [
+            _time_fetch(env_var_resolver.chain, name)
+            for name in env_var_names
+        ]
+    finally:
+        env_var_resolver.close()
+
+    return Diagnosis(
+        shell_command=env_var_resolver.shell_command(_PLACEHOLDER_ENV_VAR),
+        strategy=env_var_resolver.strategy,
+        startup_seconds=startup_seconds,
+        echo_seconds=max(batch_seconds - startup_seconds, 0.0),
+        timings=timings
+    )
+
+def format_diagnosis(diagnosis: Diagnosis) -> str:
+    """
+    Formats a diagnosis as a report, one line per env var.
+
+    NOTE: Env var values never get shown, as they can be secrets.
+    """
+    lines: list[str] = [
+        f"Shell command: {shlex.join(diagnosis.shell_command)}",
+        f"Strategy: {diagnosis.strategy}",
+        f"Shell startup: {diagnosis.startup_seconds * 1000:.1f}ms",
+        (
+            f"Echo {len(diagnosis.timings)} env vars: "
+            f"{diagnosis.echo_seconds * 1000:.1f}ms"
+        )
+    ]
+
+    for timing in diagnosis.timings:
+        outcome: str = f"error: {timing.error}" if timing.error else "ok"
+        lines.append(
+            f"  {timing.name:<32} {timing.seconds * 1000:8.1f}ms  {outcome}"
+        )
+
+    lines.append(
+        f"{len(diagnosis.failures)} of {len(diagnosis.timings)} env vars "
+        "could not be expanded"
+    )
+
+    return "\n".join(lines)
+
+def warm_caches(
+    settings: config.Settings,
+    env_var_names: list[str],
+    config_filepath: Path,
+    socket_path: Optional[Path] = None
+) -> list[str]:
+    """
+    Fetches env var values into the persisted value cache next to the config
+    file, if `persist_values` is on, and into the resolver daemon, if it is
+    running, returning a line describing what happened to each.
+
+    Raises an error if the shell cannot be started.
+    """
+    lines: list[str] = []
+
+    if settings.persist_values:
+        env_var_resolver: resolver.Resolver = _resolver(
+            settings,
+            config_filepath
+        )
+        try:
+            env_var_values: dict[str, str] = (
+                env_var.snapshot(env_var_resolver.shell_command)
+                if env_var_resolver.strategy == config.STRATEGY_SNAPSHOT
+                else env_var_resolver.chain.resolve(env_var_names).values
+            )
+        finally:
+            env_var_resolver.close()
+        disk_cache: cache.DiskCache = cache.DiskCache(
+            config_filepath.parent / cache.VALUE_CACHE_BASENAME
+        )
+        # NOTE: The same key that Plover saves values under, so that they
+        # get served as soon as it starts.
+        disk_cache.save(_shell_config_key(settings), env_var_values)
+        lines.append(f"Persisted {len(env_var_values)} env var values")
+    else:
+        lines.append("Persisted values are off, not warming them")
+
+    try:
+        errors: dict[str, str] = daemon.DaemonClient(socket_path).resolve(
+            env_var_names
+        ).get("errors", {})
+        lines.append(
+            f"Warmed {len(env_var_names) - len(errors)} env var values in "
+            "the resolver daemon"
+        )
+    except (OSError, ValueError):
+        lines.append("Resolver daemon not running, not warming it")
+
+    return lines
+
+def _resolver(
+    settings: config.Settings,
+    config_filepath: Path
+) -> resolver.Resolver:
+    """
+    Returns a resolver with the strategy Plover starts with, so that env vars
+    get fetched the same way as in Plover.
+    """
+    strategy_selector: config.StrategySelector = config.StrategySelector(
+        config_filepath.parent / config.STRATEGY_MEASUREMENTS_BASENAME
+    )
+
+    return resolver.Resolver(
+        settings,
+        strategy_selector.starting_strategy(
+            settings.strategy,
+            _shell_config_key(settings)
+        )
+    )
+
+def _shell_config_key(settings: config.Settings) -> str:
+    """
+    Returns the same key that Plover saves values and strategy measurements
+    under, so that they get used as soon as it starts.
+    """
+    return cache.DiskCache.key(
+        repr(settings),
+        env_var.fingerprint(config.dependency_filepaths(settings))
+    )
+
+def _time_fetch(
+    resolver_chain: env_var.ResolverChain,
+    name: str
+) -> VariableTiming:
+    start: float = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        resolver_chain.resolve_one(name)
+    except ValueError as exc:
+        error = str(exc)
+
+    return VariableTiming(name, time.perf_counter() - start, error)
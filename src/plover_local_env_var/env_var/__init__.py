@@ -3,18 +3,93 @@
 
 A package dealing with:
     - expanding local environment variables and returning their values
+    - resolving env var values through a chain of backends, like the process
+      environment, a `.env` file, or the shell
+    - keeping a shell running in the background to perform expansions
+    - taking a snapshot of every exported env var from a single shell run
+    - finding the env var names used in dictionary translations
+    - compiling meta arguments that combine env vars, text, defaults, and
+      filters
+    - detecting changes to shell config files
+    - probing how long each shell mode takes to start up
+    - guarding against slow or broken shells with timeouts and a circuit
+      breaker
 """
 
 __all__ = [
+    "FILTERS",
+    "SHELL_GUARD",
+    "SHELL_MODES",
+    "SHELL_MODE_INTERACTIVE",
+    "SHELL_MODE_LOGIN",
+    "SHELL_MODE_SOURCE",
+    "BatchError",
+    "BatchResult",
+    "NoValueError",
+    "Template",
+    "ProbeResult",
+    "ResolverChain",
+    "ShellCoprocess",
+    "dotenv_backend",
+    "apply_filters",
+    "bare_name",
+    "compile_template",
+    "environ_backend",
     "expand",
+    "expand_batch",
     "expand_list",
-    "resolve_command"
+    "fingerprint",
+    "format_probe_results",
+    "probe_shell_modes",
+    "resolve_command",
+    "scan",
+    "shell_backend",
+    "shell_config_filepaths",
+    "snapshot",
+    "time_expansion"
 ]
 
+from .chain import (
+    ResolverChain,
+    dotenv_backend,
+    environ_backend,
+    shell_backend
+)
 from .command import (
+    SHELL_MODES,
+    SHELL_MODE_INTERACTIVE,
+    SHELL_MODE_LOGIN,
+    SHELL_MODE_SOURCE,
     resolve_command
 )
+from .coprocess import ShellCoprocess
 from .expander import (
+    BatchError,
+    BatchResult,
+    NoValueError,
+    bare_name,
     expand,
+    expand_batch,
     expand_list
 )
+from .filters import (
+    FILTERS,
+    apply_filters
+)
+from .fingerprint import (
+    fingerprint,
+    shell_config_filepaths
+)
+from .guard import SHELL_GUARD
+from .probe import (
+    ProbeResult,
+    format_probe_results,
+    probe_shell_modes,
+    time_expansion
+)
+from .scanner import scan
+from .snapshot import snapshot
+from .template import (
+    Template,
+    compile_template
+)
@@ -0,0 +1,177 @@
+"""
+Chain - a module for resolving env var values through an ordered chain of
+backends, so that values that can be found in-process never need a shell.
+"""
+
+import os
+from pathlib import Path
+from typing import (
+    Callable,
+    Optional
+)
+
+from . import (
+    dotenv,
+    expander
+)
+
+
+Backend = Callable[[list[str]], dict[str, str]]
+
+class ResolverChain:
+    """
+    Resolves env var names by trying each backend in turn, only passing on
+    the names that earlier backends could not resolve.
+
+    Each backend takes a list of env var names, and returns the values it
+    found for them. A backend can raise a `ValueError` to report why it could
+    not resolve any of them, or a `BatchError` with the values it found if it
+    could only resolve some of them, in which case the next backend is tried.
+    A `NoValueError` reports that they have no value.
+    """
+
+    _backends: list[Backend]
+
+    def __init__(self, backends: list[Backend]) -> None:
+        self._backends = backends
+
+    def resolve(self, env_var_names: list[str]) -> expander.BatchResult:
+        """
+        Resolves a list of env var names, returning the values found, the
+        names that no backend had a value for, and the names that no backend
+        could resolve because one of them errored.
+
+        NOTE: A name a backend errored on may have a value there, so it only
+        counts as having no value if no backend errored on it.
+
+        Raises the error from the last backend to raise one if no values at
+        all could be resolved, and a backend errored.
+        """
+        values: dict[str, str] = {}
+        remaining: list[str] = list(env_var_names)
+        errored: set[str] = set()
+        error: Optional[ValueError] = None
+
+        for backend in self._backends:
+            if not remaining:
+                break
+
+            try:
+                values.update(backend(remaining))
+            except expander.BatchError as exc:
+                error = exc
+                values.update(exc.values)
+                errored.update(exc.errored)
+            except expander.NoValueError as exc:
+                error = exc
+            except ValueError as exc:
+                error = exc
+                errored.update(remaining)
+
+            remaining = [name for name in remaining if name not in values]
+
+        if error and errored and not values:
+            raise error
+
+        return expander.BatchResult(
+            values=values,
+            failed=[name for name in remaining if name not in errored],
+            errored=[name for name in remaining if name in errored]
+        )
+
+    def resolve_one(self, env_var_name: str) -> str:
+        """
+        Resolves a single env var name.
+
+        Raises the error from the last backend to raise one, if no backend
+        could resolve it, or else a `NoValueError`.
+
+        NOTE: An error other than a `NoValueError` (eg the shell timing out)
+        gets raised in preference, as the env var may have a value that
+        backend could not get to.
+        """
+        error: Optional[ValueError] = None
+
+        for backend in self._backends:
+            try:
+                value: Optional[str] = backend([env_var_name]).get(
+                    env_var_name
+                )
+            except expander.NoValueError as exc:
+                if not error or isinstance(error, expander.NoValueError):
+                    error = exc
+                continue
+            except ValueError as exc:
+                error = exc
+                continue
+
+            if value:
+                return value
+
+        if error:
+            raise error
+
+        raise expander.NoValueError(
+            f"No value found for env var: {env_var_name}"
+        )
+
+def environ_backend(env_var_names: list[str]) -> dict[str, str]:
+    """
+    Resolves env var names from the environment of the current process.
+    """
+    return _lookup(dict(os.environ), env_var_names)
+
+def dotenv_backend(dotenv_filepath: Path) -> Backend:
+    """
+    Returns a backend that resolves env var names from a `.env`-style file.
+    """
+    return lambda env_var_names: _lookup(
+        dotenv.load(dotenv_filepath),
+        env_var_names
+    )
+
+def shell_backend(
+    shell_command_resolver: Callable[[str], list[str]],
+    runner: Optional[Callable[[str], str]] = None
+) -> Backend:
+    """
+    Returns a backend that resolves env var names with a shell: a single
+    name gets expanded with `runner`, if provided, and multiple names get
+    expanded in a single batch.
+
+    Raises a `BatchError` if the shell errored for only some of the names.
+    """
+    def _resolve(env_var_names: list[str]) -> dict[str, str]:
+        if len(env_var_names) == 1:
+            return {
+                env_var_names[0]: expander.expand(
+                    shell_command_resolver,
+                    env_var_names[0],
+                    runner
+                )
+            }
+
+        result: expander.BatchResult = expander.expand_batch(
+            shell_command_resolver,
+            env_var_names
+        )
+        if result.errored:
+            raise expander.BatchError(result.values, result.errored)
+
+        return result.values
+
+    return _resolve
+
+def _lookup(
+    env_vars: dict[str, str],
+    env_var_names: list[str]
+) -> dict[str, str]:
+    values: dict[str, str] = {}
+
+    for env_var_name in env_var_names:
+        name: Optional[str] = expander.bare_name(env_var_name)
+        value: Optional[str] = env_vars.get(name) if name else None
+        if value:
+            values[env_var_name] = value
+
+    return values
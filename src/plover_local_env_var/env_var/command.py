@@ -5,8 +5,20 @@ environment variables.
 
 import os
 import platform
+import shlex
+import signal
 import subprocess
-from typing import Callable
+import time
+from typing import (
+    Callable,
+    Optional
+)
+
+from ..metrics import (
+    METRICS,
+    TRACER
+)
+from .guard import SHELL_GUARD
 
 
 _POWERSHELL_COMMAND: Callable[[str], list[str]] = lambda env_var: (
@@ -22,18 +34,103 @@ _POWERSHELL_COMMAND: Callable[[str], list[str]] = lambda env_var: (
 _SHELL_COMMAND: Callable[[str], Callable[[str], list[str]]] = lambda shell: (
     lambda env_var: [f"{shell}", "-ic", f"echo {env_var}"]
 )
+_LOGIN_SHELL_COMMAND: Callable[[str], Callable[[str], list[str]]] = (
+    lambda shell: lambda env_var: [f"{shell}", "-lc", f"echo {env_var}"]
+)
+_SOURCE_SHELL_COMMAND: Callable[
+    [str, str],
+    Callable[[str], list[str]]
+] = lambda shell, source: (
+    lambda env_var: [f"{shell}", "-c", f"{source}; echo {env_var}"]
+)
+# NOTE: In a sourced file shell command, the source command and the script
+# are separated by the last "; ".
+_SCRIPT_SEPARATOR: str = "; "
 _DEFAULT_SHELL: str = "bash"
+_FISH: str = "fish"
+_POWERSHELL: str = "powershell"
+
+SHELL_MODE_INTERACTIVE: str = "interactive"
+SHELL_MODE_LOGIN: str = "login"
+SHELL_MODE_SOURCE: str = "source"
+SHELL_MODES: tuple[str, ...] = (
+    SHELL_MODE_INTERACTIVE,
+    SHELL_MODE_LOGIN,
+    SHELL_MODE_SOURCE
+)
 
-def resolve_command() -> Callable[[str], list[str]]:
+def resolve_command(
+    mode: str = SHELL_MODE_INTERACTIVE,
+    source_file: Optional[str] = None
+) -> Callable[[str], list[str]]:
     """
     Resolves a shell command for a given platform.
+
+    On macOS and Linux, `mode` determines how the shell gets started:
+        - "interactive": read in the whole interactive shell config (default)
+        - "login": read in only the login shell config
+        - "source": read in only `source_file`
+
+    Windows always uses PowerShell, whatever the mode.
     """
     if platform.system() == "Windows":
         return _POWERSHELL_COMMAND
 
-    return _SHELL_COMMAND(
-        os.getenv("SHELL", _DEFAULT_SHELL).split("/")[-1]
-    )
+    shell: str = os.getenv("SHELL", _DEFAULT_SHELL).split("/")[-1]
+
+    if mode == SHELL_MODE_LOGIN:
+        return _LOGIN_SHELL_COMMAND(shell)
+
+    if mode == SHELL_MODE_SOURCE:
+        if not source_file:
+            raise ValueError("No file to source provided for shell mode")
+
+        source_command: str = "source" if shell == _FISH else "."
+        return _SOURCE_SHELL_COMMAND(
+            shell,
+            f"{source_command} {shlex.quote(os.path.expanduser(source_file))}"
+        )
+
+    return _SHELL_COMMAND(shell)
+
+def resolve_script_command(
+    shell_command_resolver: Callable[[str], list[str]],
+    script: str
+) -> list[str]:
+    """
+    Resolves a shell command that runs an arbitrary script, rather than one
+    that outputs an expanded target.
+
+    NOTE: The last element of a resolved shell command is always the script
+    that outputs the expanded target, so it gets swapped out, keeping any
+    file sourcing that comes before it.
+    """
+    *invocation, _target_script = shell_command_resolver("")
+    source: str = resolve_source_script(shell_command_resolver)
+
+    if not source:
+        return [*invocation, script]
+
+    return [*invocation, f"{source}{_SCRIPT_SEPARATOR}{script}"]
+
+def resolve_source_script(
+    shell_command_resolver: Callable[[str], list[str]]
+) -> str:
+    """
+    Returns the part of a resolved shell command's script that reads in a
+    file before the target gets expanded (eg `. ~/.env_vars`), or an empty
+    string if it does not source a file.
+    """
+    target_script: str = shell_command_resolver("")[-1]
+    source, _separator, _echo = target_script.rpartition(_SCRIPT_SEPARATOR)
+
+    return source
+
+def is_powershell(shell_command_resolver: Callable[[str], list[str]]) -> bool:
+    """
+    Returns whether a resolved shell command runs in PowerShell.
+    """
+    return shell_command_resolver("")[0] == _POWERSHELL
 
 def run_command(
     shell_command_resolver: Callable[[str], list[str]],
@@ -43,11 +140,109 @@ def run_command(
     Runs a provided shell command against target in a subprocess.
     """
     command: list[str] = shell_command_resolver(target)
-    result: str = subprocess.run(
-        command,
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
-    ).stdout.strip()
+    result: str = _run(command).strip()
 
     return result
+
+def run_script(
+    shell_command_resolver: Callable[[str], list[str]],
+    script: str,
+    check: bool = False
+) -> str:
+    """
+    Runs a provided script in the resolved shell in a subprocess, returning
+    its output untouched.
+
+    If `check` is set, raises an error if the shell exits with a non-zero
+    status.
+    """
+    command: list[str] = resolve_script_command(shell_command_resolver, script)
+    result: str = _run(command, check)
+
+    return result
+
+def kill_process_group(process: "subprocess.Popen[str]") -> None:
+    """
+    Kills a shell process started in its own session, along with any
+    processes it started.
+    """
+    if platform.system() == "Windows":
+        process.kill()
+        return
+
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        process.kill()
+
+def _run(command: list[str], check: bool = False) -> str:
+    """
+    Runs a command in a subprocess, killing it and everything it started if
+    it runs longer than the shell guard timeout.
+
+    Raises an error if the shell guard circuit breaker is open, the command
+    cannot be started, or it times out, or if `check` is set and it exits
+    with a non-zero status.
+
+    NOTE: Only the length of the command gets traced, as scripts can contain
+    env var values (eg when checking them in the diagnose command).
+    """
+    SHELL_GUARD.check()
+    start: float = time.perf_counter()
+    try:
+        process: "subprocess.Popen[str]" = subprocess.Popen( # pylint: disable=consider-using-with
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",
+            start_new_session=True
+        )
+    except OSError as exc:
+        SHELL_GUARD.record_failure(time.perf_counter() - start)
+        raise ValueError(f"Unable to start shell: {exc}") from exc
+    spawn_seconds: float = time.perf_counter() - start
+
+    try:
+        stdout, _stderr = process.communicate(timeout=SHELL_GUARD.timeout)
+    except subprocess.TimeoutExpired as exc:
+        kill_process_group(process)
+        process.wait()
+        for stream in (process.stdout, process.stderr):
+            if stream:
+                stream.close()
+        timed_out_seconds: float = time.perf_counter() - start
+        SHELL_GUARD.record_failure(timed_out_seconds, timed_out=True)
+        METRICS.observe("shell_seconds", timed_out_seconds)
+        _trace_run(command, None, spawn_seconds, timed_out_seconds)
+        raise ValueError(
+            f"Shell timed out after {SHELL_GUARD.timeout}s"
+        ) from exc
+
+    seconds: float = time.perf_counter() - start
+    if process.returncode == 0:
+        SHELL_GUARD.record_success(seconds)
+    else:
+        SHELL_GUARD.record_failure(seconds)
+    METRICS.observe("shell_seconds", seconds)
+    _trace_run(command, process.returncode, spawn_seconds, seconds)
+
+    if check and process.returncode != 0:
+        raise ValueError(f"Shell exited with status {process.returncode}")
+
+    return stdout or ""
+
+def _trace_run(
+    command: list[str],
+    exit_code: Optional[int],
+    spawn_seconds: float,
+    seconds: float
+) -> None:
+    if TRACER.sampled():
+        TRACER.record(
+            "run_command",
+            argv_length=sum(len(argument) for argument in command),
+            exit_code=exit_code,
+            timed_out=exit_code is None,
+            spawn_seconds=spawn_seconds,
+            wait_seconds=seconds - spawn_seconds
+        )
@@ -0,0 +1,251 @@
+"""
+Coprocess - a module for keeping a single shell process running in the
+background, and sending it env var expansion requests, so that the cost of
+starting up a shell only has to be paid once.
+"""
+
+import subprocess
+import threading
+import time
+from typing import (
+    Callable,
+    Optional
+)
+import uuid
+
+from ..metrics import METRICS
+from . import command
+from .guard import SHELL_GUARD
+
+
+_FRAME_MARKER: Callable[[str, str], str] = lambda token, edge: (
+    f"__PLOVER_LOCAL_ENV_VAR_{token}_{edge}__"
+)
+_POWERSHELL_COMMAND_FLAG: str = "-command"
+_READ_FROM_STDIN: str = "-"
+
+class ShellCoprocess:
+    """
+    A long-lived shell that runs scripts sent to it over stdin, eg to expand
+    env vars.
+
+    Each request is framed with unique start and end markers so that any
+    output from the shell's startup files cannot be confused with the output
+    of the script.
+
+    Any file that the shell command sources (eg in the sourced file shell
+    mode) gets sourced once, when the shell starts, rather than on every
+    request.
+
+    A retired coprocess stops its shell once the requests in flight have
+    finished, instead of cutting them off.
+    """
+
+    _in_flight: int
+    _in_flight_lock: threading.Lock
+    _lock: threading.Lock
+    _process: Optional["subprocess.Popen[str]"]
+    _retired: bool
+    _shell_command_resolver: Callable[[str], list[str]]
+
+    def __init__(
+        self,
+        shell_command_resolver: Callable[[str], list[str]]
+    ) -> None:
+        self._shell_command_resolver = shell_command_resolver
+        self._process = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._retired = False
+
+    def run_script(self, script: str) -> str:
+        """
+        Runs a script in the running shell, starting the shell if needed, and
+        returns its output untouched.
+
+        If the shell has crashed since the last request, it gets restarted
+        and the request is sent again. If the shell takes longer than the
+        shell guard timeout to respond, it gets killed.
+
+        Raises an error if the shell guard circuit breaker is open, or the
+        shell fails or times out.
+        """
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            return self._run_script(script)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+                idle: bool = self._retired and not self._in_flight
+            if idle:
+                self.close()
+
+    def restart(self) -> None:
+        """
+        Replaces the running shell with a new one, so that any changes to
+        shell config files get read in.
+        """
+        with self._lock:
+            self._stop()
+            self._start()
+
+    def close(self) -> None:
+        """
+        Stops the running shell.
+        """
+        with self._lock:
+            self._stop()
+
+    def retire(self) -> None:
+        """
+        Stops the running shell once any requests in flight have finished.
+        Any request sent after that gets served by a shell that is stopped
+        again straight after.
+        """
+        with self._in_flight_lock:
+            self._retired = True
+            idle: bool = not self._in_flight
+        if idle:
+            self.close()
+
+    def _run_script(self, script: str) -> str:
+        with self._lock:
+            SHELL_GUARD.check()
+            start: float = time.perf_counter()
+            try:
+                try:
+                    result: str = self._request(script)
+                except (OSError, EOFError):
+                    self._stop()
+                    result = self._request(script)
+            except subprocess.TimeoutExpired as exc:
+                self._stop()
+                SHELL_GUARD.record_failure(
+                    time.perf_counter() - start,
+                    timed_out=True
+                )
+                raise ValueError(
+                    f"Shell timed out after {SHELL_GUARD.timeout}s"
+                ) from exc
+            except (OSError, EOFError) as exc:
+                self._stop()
+                SHELL_GUARD.record_failure(time.perf_counter() - start)
+                raise ValueError(f"Shell coprocess failed: {exc}") from exc
+            finally:
+                METRICS.observe(
+                    "coprocess_seconds",
+                    time.perf_counter() - start
+                )
+
+            SHELL_GUARD.record_success(time.perf_counter() - start)
+            return result
+
+    def _request(self, script: str) -> str:
+        process: "subprocess.Popen[str]" = self._start()
+        token: str = uuid.uuid4().hex
+        start_marker: str = _FRAME_MARKER(token, "START")
+        end_marker: str = _FRAME_MARKER(token, "END")
+
+        assert process.stdin is not None and process.stdout is not None
+        process.stdin.write(
+            f"echo {start_marker}; {script}; echo {end_marker}\n"
+        )
+        process.stdin.flush()
+
+        timeout: Optional[float] = SHELL_GUARD.timeout
+        timed_out: threading.Event = threading.Event()
+
+        def _expire() -> None:
+            timed_out.set()
+            command.kill_process_group(process)
+
+        watchdog: Optional[threading.Timer] = (
+            threading.Timer(timeout, _expire) if timeout else None
+        )
+        if watchdog:
+            watchdog.daemon = True
+            watchdog.start()
+
+        lines: Optional[list[str]] = None
+        try:
+            while True:
+                line: str = process.stdout.readline()
+                if not line:
+                    if timed_out.is_set() and timeout:
+                        raise subprocess.TimeoutExpired(process.args, timeout)
+                    raise EOFError("Shell coprocess exited unexpectedly")
+
+                # NOTE: Output that does not end in a newline, like a
+                # NUL-terminated record, runs straight into the end marker.
+                stripped_line: str = line.rstrip("\r\n")
+                if lines is None:
+                    if stripped_line == start_marker:
+                        lines = []
+                elif stripped_line.endswith(end_marker):
+                    lines.append(stripped_line[:-len(end_marker)])
+                    break
+                else:
+                    lines.append(line)
+        finally:
+            if watchdog:
+                watchdog.cancel()
+
+        return "".join(lines)
+
+    def _start(self) -> "subprocess.Popen[str]":
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen( # pylint: disable=consider-using-with
+                _stdin_command(self._shell_command_resolver("")),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                encoding="utf-8",
+                bufsize=1,
+                start_new_session=True
+            )
+            source: str = command.resolve_source_script(
+                self._shell_command_resolver
+            )
+            if source:
+                assert self._process.stdin is not None
+                self._process.stdin.write(f"{source}\n")
+                self._process.stdin.flush()
+
+        return self._process
+
+    def _stop(self) -> None:
+        if self._process is None:
+            return
+
+        process: "subprocess.Popen[str]" = self._process
+        self._process = None
+        if process.poll() is None:
+            command.kill_process_group(process)
+        process.wait()
+        for stream in (process.stdin, process.stdout):
+            if stream:
+                stream.close()
+
+def _stdin_command(shell_command: list[str]) -> list[str]:
+    """
+    Converts a resolved shell command that runs a script given on the command
+    line into one that reads commands from stdin.
+
+    eg. `bash -ic "echo $FOO"` becomes `bash -i`, and
+    `powershell -command "..."` becomes `powershell -command -`.
+
+    NOTE: Any file sourcing in the script gets dropped along with it, so it
+    has to be sent to the shell separately.
+    """
+    *invocation, _script = shell_command
+    *executable, flag = invocation
+
+    if flag.lower() == _POWERSHELL_COMMAND_FLAG:
+        return [*invocation, _READ_FROM_STDIN]
+
+    if flag.startswith("-") and flag.endswith("c"):
+        flag = flag[:-1]
+
+    return [*executable, flag] if flag != "-" else executable
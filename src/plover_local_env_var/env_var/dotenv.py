@@ -0,0 +1,96 @@
+"""
+Dotenv - a module for reading env var values from a plain `.env`-style file,
+without needing to start up a shell.
+"""
+
+from pathlib import Path
+import re
+import threading
+from typing import (
+    Optional,
+    Pattern
+)
+
+
+_LINE: Pattern[str] = re.compile(
+    r"^\s*(?:export\s+)?([A-Za-z_][A-Za-z_0-9]*)\s*=\s*(.*?)\s*$"
+)
+_DOUBLE_QUOTE_ESCAPES: dict[str, str] = {
+    "n": "\n",
+    "t": "\t",
+    "\"": "\"",
+    "\\": "\\"
+}
+_DOUBLE_QUOTE_ESCAPE: Pattern[str] = re.compile(r"\\(.)")
+_INLINE_COMMENT: Pattern[str] = re.compile(r"\s+#.*$")
+
+_cache_lock: threading.Lock = threading.Lock()
+_cache: dict[str, tuple[tuple[int, int], dict[str, str]]] = {}
+
+def parse(text: str) -> dict[str, str]:
+    """
+    Parses `.env`-style file contents into a dict of env var values, keyed
+    by bare name (eg `FOO`, rather than `$FOO`).
+
+    Supports `export` prefixes, comments, single-quoted (literal) values, and
+    double-quoted values with `\\n`, `\\t`, `\\"` and `\\\\` escapes.
+    Variables are not interpolated.
+    """
+    env_vars: dict[str, str] = {}
+
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+
+        match: Optional[re.Match[str]] = _LINE.match(line)
+        if not match:
+            continue
+
+        name, value = match.groups()
+        if len(value) >= 2 and value[0] == value[-1] == "'":
+            value = value[1:-1]
+        elif len(value) >= 2 and value[0] == value[-1] == "\"":
+            value = _DOUBLE_QUOTE_ESCAPE.sub(
+                lambda escape: _DOUBLE_QUOTE_ESCAPES.get(
+                    escape.group(1),
+                    escape.group(0)
+                ),
+                value[1:-1]
+            )
+        else:
+            value = _INLINE_COMMENT.sub("", value)
+
+        env_vars[name] = value
+
+    return env_vars
+
+def load(filepath: Path) -> dict[str, str]:
+    """
+    Reads in and parses a `.env`-style file, returning no values if it does
+    not exist.
+
+    Parsed values are cached until the file changes.
+    """
+    path: Path = filepath.expanduser()
+    try:
+        stat = path.stat()
+    except OSError:
+        return {}
+
+    fingerprint: tuple[int, int] = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached: Optional[tuple[tuple[int, int], dict[str, str]]] = (
+            _cache.get(str(path))
+        )
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+
+    try:
+        env_vars: dict[str, str] = parse(path.read_text(encoding="utf-8"))
+    except OSError:
+        return {}
+
+    with _cache_lock:
+        _cache[str(path)] = (fingerprint, env_vars)
+
+    return env_vars
@@ -3,31 +3,111 @@ Expander - a module for dealing with fetching and expanding local ENV var
 values.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import re
 from typing import (
     Callable,
-    Pattern
+    NamedTuple,
+    Optional,
+    Pattern,
+    Union
 )
 
 from . import command
 
 
-_ENV_VAR: Pattern[str] = re.compile(r"(\$[A-Za-z_][A-Za-z_0-9]*)")
-_VAR_DIVIDER: str = "##"
+_NAME: Pattern[str] = re.compile(r"[A-Za-z_][A-Za-z_0-9]*")
+_POWERSHELL_NAME_PREFIX: str = "$ENV:"
+_POSIX_NAME_PREFIX: str = "$"
+# NOTE: Env var values cannot contain NUL characters, so each value in a
+# batch gets output as a NUL-terminated record. The batch is preceded by a
+# marker record so that any output from shell config files can be discarded.
+_BATCH_MARKER: str = "__PLOVER_LOCAL_ENV_VAR_BATCH__"
+_RECORD_DIVIDER: str = "\0"
+_POSIX_BATCH_SCRIPT: Callable[[list[str]], str] = lambda var_names: (
+    "printf '%s\\0' "
+    + " ".join([_BATCH_MARKER, *(f"\"{name}\"" for name in var_names)])
+)
+_POWERSHELL_BATCH_SCRIPT: Callable[[list[str]], str] = lambda var_names: (
+    "[Console]::Out.Write(\""
+    + "".join(f"{record}`0" for record in [_BATCH_MARKER, *var_names])
+    + "\")"
+)
+# NOTE: Each chunk of a batch gets expanded in its own shell, so chunks are
+# bounded both in number of names, and in script length, to stay well under
+# command line length limits (32,767 characters on Windows).
+_CHUNK_SIZE: int = 200
+_MAX_CHUNK_SCRIPT_LENGTH: int = 16_000
+_MAX_WORKERS: int = 4
+
+class BatchResult(NamedTuple):
+    """
+    The outcome of expanding a batch of env vars: the values that were
+    found, the names of env vars that had no value, and the names of env vars
+    that could not be expanded because the shell errored (eg timed out).
 
-def expand(shell_command_resolver: Callable[[str], list[str]], var: str) -> str:
+    NOTE: Only env vars that `failed` are known to have no value. Those that
+    `errored` may well have one, and should be tried again later.
+    """
+    values: dict[str, str]
+    failed: list[str]
+    errored: list[str]
+
+class NoValueError(ValueError):
+    """
+    Raised when an env var has no value, or is not an env var, as opposed to
+    when it could not be expanded at all (eg the shell timed out).
+    """
+
+class BatchError(ValueError):
+    """
+    Raised when some env vars in a batch could not be expanded because the
+    shell errored, along with the values found for the rest.
+    """
+
+    values: dict[str, str]
+    errored: list[str]
+
+    def __init__(self, values: dict[str, str], errored: list[str]) -> None:
+        super().__init__(
+            f"Unable to expand {len(errored)} env vars: the shell errored"
+        )
+        self.values = values
+        self.errored = errored
+
+def expand(
+    shell_command_resolver: Callable[[str], list[str]],
+    var: str,
+    runner: Optional[Callable[[str], str]] = None
+) -> str:
     """
     Fetches and returns a single local env var value.
 
-    Raises an error if `var` is not an ENV var or a value for the env var
-    cannot be found.
+    If a `runner` is provided (eg a running shell coprocess), it is used to
+    run the expansion script instead of spawning a new shell.
+
+    NOTE: The value gets output as a NUL-terminated record, the same as in a
+    batch, so that it is kept exactly as it is, whitespace and all, however
+    it gets fetched.
+
+    Raises a `NoValueError` if `var` is not an ENV var or it has no value, or
+    else an error if it cannot be expanded.
     """
-    if not re.match(_ENV_VAR, var):
-        raise ValueError(f"Provided value not an $ENV_VAR: {var}")
+    if bare_name(var) is None:
+        raise NoValueError(f"Provided value not an $ENV_VAR: {var}")
 
-    expanded: str = _perform_expansion(shell_command_resolver, var)
+    script: str = _batch_script(shell_command_resolver)([var])
+    output: str = (
+        runner(script)
+        if runner
+        else command.run_script(shell_command_resolver, script)
+    )
+    records: list[str] = _parse_records(output)
 
-    return expanded
+    if not records or not records[0]:
+        raise NoValueError(f"No value found for env var: {var}")
+
+    return records[0]
 
 def expand_list(
     shell_command_resolver: Callable[[str], list[str]],
@@ -40,30 +120,174 @@ def expand_list(
         - its name not an ENV var
         - its value is blank.
     """
+    return expand_batch(shell_command_resolver, env_var_name_list).values
+
+def expand_batch(
+    shell_command_resolver: Callable[[str], list[str]],
+    env_var_name_list: list[str],
+    chunk_size: int = _CHUNK_SIZE,
+    max_workers: int = _MAX_WORKERS
+) -> BatchResult:
+    """
+    Expands a list of env var names, returning the values found for each
+    one, along with the names that had no value, and the names whose shell
+    errored.
+
+    Names get expanded in chunks of at most `chunk_size`, with a subprocess
+    per chunk, and up to `max_workers` chunks expanding in parallel. A small
+    list is expanded in a single subprocess.
+
+    A name fails if it is not an ENV var, its value is blank, or its value
+    was not present in the shell output. A name errors if the shell for its
+    chunk failed.
+
+    Raises an error if the shell failed for every chunk.
+    """
     parsed_env_var_name_list: list[str] = [
         var_name
         for var_name in env_var_name_list
-        if re.match(_ENV_VAR, var_name)
+        if bare_name(var_name) is not None
     ]
-    var_names: str = _VAR_DIVIDER.join(parsed_env_var_name_list)
-    expanded: str = _perform_expansion(shell_command_resolver, var_names)
-    env_vars: dict[str, str] = dict(
-        zip(parsed_env_var_name_list, expanded.split(_VAR_DIVIDER))
+    failed: list[str] = [
+        var_name
+        for var_name in env_var_name_list
+        if var_name not in parsed_env_var_name_list
+    ]
+
+    if not parsed_env_var_name_list:
+        return BatchResult(values={}, failed=failed, errored=[])
+
+    batch_script: Callable[[list[str]], str] = _batch_script(
+        shell_command_resolver
+    )
+    chunks: list[list[str]] = _chunk(
+        parsed_env_var_name_list,
+        chunk_size,
+        batch_script
+    )
+    expand_chunk: Callable[[list[str]], Union[BatchResult, ValueError]] = (
+        lambda chunk: _expand_chunk(shell_command_resolver, batch_script, chunk)
+    )
+    results: list[Union[BatchResult, ValueError]]
+
+    if len(chunks) == 1:
+        results = [expand_chunk(chunks[0])]
+    else:
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(chunks)),
+            thread_name_prefix="plover-local-env-var-expand"
+        ) as executor:
+            results = list(executor.map(expand_chunk, chunks))
+
+    return _merge_chunks(chunks, results, failed)
+
+def bare_name(env_var_name: str) -> Optional[str]:
+    """
+    Strips the platform-specific prefix off an env var name, eg `$FOO` or
+    `$ENV:FOO` become `FOO`.
+
+    Returns `None` if the name is not an env var name.
+
+    NOTE: Names get pasted into shell scripts, so the whole name has to
+    match, or else anything after a valid prefix (eg `$FOO;rm -rf ~`) would
+    get run by the shell.
+    """
+    for prefix in (_POWERSHELL_NAME_PREFIX, _POSIX_NAME_PREFIX):
+        if env_var_name.startswith(prefix):
+            name: str = env_var_name[len(prefix):]
+            return name if _NAME.fullmatch(name) else None
+
+    return None
+
+def _batch_script(
+    shell_command_resolver: Callable[[str], list[str]]
+) -> Callable[[list[str]], str]:
+    return (
+        _POWERSHELL_BATCH_SCRIPT
+        if command.is_powershell(shell_command_resolver)
+        else _POSIX_BATCH_SCRIPT
     )
 
-    return {
-        key: value
-        for (key, value) in env_vars.items()
-        if value
-    }
+def _chunk(
+    env_var_name_list: list[str],
+    chunk_size: int,
+    batch_script: Callable[[list[str]], str]
+) -> list[list[str]]:
+    chunks: list[list[str]] = [[]]
+    # NOTE: The script length of a chunk grows by at most the length of the
+    # script for each single name.
+    script_length: int = 0
+    overhead: int = len(batch_script([]))
+
+    for var_name in env_var_name_list:
+        name_length: int = len(batch_script([var_name])) - overhead
+        if chunks[-1] and (
+            len(chunks[-1]) >= chunk_size
+            or script_length + name_length > _MAX_CHUNK_SCRIPT_LENGTH
+        ):
+            chunks.append([])
+            script_length = 0
+
+        chunks[-1].append(var_name)
+        script_length += name_length
+
+    return chunks
+
+def _merge_chunks(
+    chunks: list[list[str]],
+    results: list[Union[BatchResult, ValueError]],
+    failed: list[str]
+) -> BatchResult:
+    errors: list[ValueError] = [
+        result for result in results if isinstance(result, ValueError)
+    ]
+    if len(errors) == len(results):
+        raise errors[0]
+
+    values: dict[str, str] = {}
+    errored: list[str] = []
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, ValueError):
+            errored.extend(chunk)
+        else:
+            values.update(result.values)
+            failed.extend(result.failed)
 
-def _perform_expansion(
+    return BatchResult(values=values, failed=failed, errored=errored)
+
+def _expand_chunk(
     shell_command_resolver: Callable[[str], list[str]],
-    target: str
-) -> str:
-    expanded: str = command.run_command(shell_command_resolver, target)
+    batch_script: Callable[[list[str]], str],
+    env_var_name_list: list[str]
+) -> Union[BatchResult, ValueError]:
+    try:
+        output: str = command.run_script(
+            shell_command_resolver,
+            batch_script(env_var_name_list)
+        )
+    except ValueError as exc:
+        return exc
+
+    records: list[str] = _parse_records(output)
+    values: dict[str, str] = {}
+    failed: list[str] = []
+
+    for index, var_name in enumerate(env_var_name_list):
+        value: str = records[index] if index < len(records) else ""
+        if value:
+            values[var_name] = value
+        else:
+            failed.append(var_name)
+
+    return BatchResult(values=values, failed=failed, errored=[])
+
+def _parse_records(output: str) -> list[str]:
+    marker: str = f"{_BATCH_MARKER}{_RECORD_DIVIDER}"
+    start: int = output.rfind(marker)
 
-    if not expanded:
-        raise ValueError(f"No value found for env var: {target}")
+    if start == -1:
+        return []
 
-    return expanded
+    # NOTE: A complete record is always followed by a divider, so the final
+    # split element is either empty or a truncated record.
+    return output[start + len(marker):].split(_RECORD_DIVIDER)[:-1]
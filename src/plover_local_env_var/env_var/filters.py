@@ -0,0 +1,38 @@
+"""
+Filters - a module for the output transforms that can be applied to env var
+values in `ENV_VAR` meta arguments, eg `$PHONE|digits` or `$NAME|upper`.
+"""
+
+from typing import Callable
+
+
+FILTERS: dict[str, Callable[[str], str]] = {
+    "alnum": lambda value: "".join(char for char in value if char.isalnum()),
+    "capitalize": str.capitalize,
+    "digits": lambda value: "".join(char for char in value if char.isdigit()),
+    "lower": str.lower,
+    "nospace": lambda value: "".join(value.split()),
+    "title": str.title,
+    "trim": str.strip,
+    "upper": str.upper
+}
+
+def apply_filters(value: str, filters: tuple[str, ...]) -> str:
+    """
+    Applies each filter to a value in turn.
+    """
+    for name in filters:
+        value = FILTERS[name](value)
+
+    return value
+
+def validate_filters(filters: tuple[str, ...]) -> None:
+    """
+    Raises an error if any filter does not exist.
+    """
+    for name in filters:
+        if name not in FILTERS:
+            raise ValueError(
+                f"Unknown filter: {name} (must be one of: "
+                f"{', '.join(sorted(FILTERS))})"
+            )
@@ -0,0 +1,53 @@
+"""
+Fingerprint - a module for detecting changes to the shell config files that
+env var values get read in from.
+"""
+
+from pathlib import Path
+from typing import (
+    Iterable,
+    Optional
+)
+
+
+SHELL_CONFIG_FILES: tuple[str, ...] = (
+    "~/.bash_profile",
+    "~/.bashrc",
+    "~/.profile",
+    "~/.zprofile",
+    "~/.zshenv",
+    "~/.zshrc",
+    "~/.config/fish/config.fish"
+)
+
+def fingerprint(
+    filepaths: Iterable[Path]
+) -> dict[str, Optional[tuple[int, int]]]:
+    """
+    Returns the modification time and size of each file, keyed by path, so
+    that two fingerprints taken at different times can be compared to find
+    out whether any of the files changed in between.
+
+    Files that do not exist get fingerprinted as `None`.
+    """
+    fingerprints: dict[str, Optional[tuple[int, int]]] = {}
+
+    for filepath in filepaths:
+        path: Path = filepath.expanduser()
+        try:
+            stat = path.stat()
+            fingerprints[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            fingerprints[str(path)] = None
+
+    return fingerprints
+
+def shell_config_filepaths(extra_filepaths: Iterable[str] = ()) -> list[Path]:
+    """
+    Returns the paths of the standard shell config files, along with any
+    extra files that env vars get read in from.
+    """
+    return [
+        Path(filepath).expanduser()
+        for filepath in (*SHELL_CONFIG_FILES, *extra_filepaths)
+    ]
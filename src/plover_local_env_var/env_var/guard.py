@@ -0,0 +1,146 @@
+"""
+Guard - a module for protecting the stroke output path from slow or broken
+shells, with timeouts and a circuit breaker.
+"""
+
+import threading
+import time
+from typing import (
+    Callable,
+    Optional
+)
+
+
+_DEFAULT_TIMEOUT: float = 10.0
+_DEFAULT_FAILURE_THRESHOLD: int = 3
+_DEFAULT_COOL_DOWN: float = 60.0
+
+# NOTE: ShellGuard keeps its timeout and circuit breaker settings alongside
+# the state of the circuit breaker, so it has more attributes than other
+# classes.
+class ShellGuard: # pylint: disable=too-many-instance-attributes
+    """
+    Keeps track of shell runs, so that after `failure_threshold` consecutive
+    failures or timeouts, no more shells get started for `cool_down` seconds.
+
+    Once the cool-down has passed, a single trial shell run is let through:
+    if it succeeds, shells can run again as normal, otherwise another
+    cool-down starts.
+
+    Timing and failure counters are kept for diagnosis.
+    """
+
+    cool_down: float
+    failure_threshold: int
+    timeout: Optional[float]
+    _clock: Callable[[], float]
+    _consecutive_failures: int
+    _counters: dict[str, float]
+    _lock: threading.Lock
+    _open_until: float
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def configure(
+        self,
+        timeout: Optional[float],
+        failure_threshold: int,
+        cool_down: float
+    ) -> None:
+        """
+        Sets the shell timeout in seconds (or `None` for no timeout), and
+        the circuit breaker options.
+        """
+        with self._lock:
+            self.timeout = timeout
+            self.failure_threshold = failure_threshold
+            self.cool_down = cool_down
+
+    def reset(self) -> None:
+        """
+        Restores the default options, closes the circuit breaker, and zeroes
+        all counters.
+        """
+        with self._lock:
+            self.timeout = _DEFAULT_TIMEOUT
+            self.failure_threshold = _DEFAULT_FAILURE_THRESHOLD
+            self.cool_down = _DEFAULT_COOL_DOWN
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+            self._counters = {
+                "runs": 0,
+                "successes": 0,
+                "failures": 0,
+                "timeouts": 0,
+                "rejections": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+                "last_seconds": 0.0
+            }
+
+    def check(self) -> None:
+        """
+        Raises an error if the circuit breaker is open, and a shell should not
+        be started.
+        """
+        with self._lock:
+            now: float = self._clock()
+            if now < self._open_until:
+                self._counters["rejections"] += 1
+                raise ValueError(
+                    "Shell unavailable after repeated failures, retrying in "
+                    f"{self._open_until - now:.0f}s"
+                )
+
+            if self._consecutive_failures >= self.failure_threshold:
+                # NOTE: Half-open: only let one trial run through until it
+                # has a result.
+                self._open_until = now + self.cool_down
+
+    def record_success(self, seconds: float) -> None:
+        """
+        Records a shell run that completed successfully.
+        """
+        with self._lock:
+            self._record_run(seconds)
+            self._counters["successes"] += 1
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+
+    def record_failure(self, seconds: float, timed_out: bool = False) -> None:
+        """
+        Records a shell run that failed or timed out, opening the circuit
+        breaker if there have been too many in a row.
+        """
+        with self._lock:
+            self._record_run(seconds)
+            self._counters["failures"] += 1
+            if timed_out:
+                self._counters["timeouts"] += 1
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open_until = self._clock() + self.cool_down
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns a copy of the timing and failure counters.
+        """
+        with self._lock:
+            return {
+                **self._counters,
+                "open": float(self._clock() < self._open_until)
+            }
+
+    def _record_run(self, seconds: float) -> None:
+        self._counters["runs"] += 1
+        self._counters["total_seconds"] += seconds
+        self._counters["last_seconds"] = seconds
+        self._counters["max_seconds"] = max(
+            self._counters["max_seconds"],
+            seconds
+        )
+
+SHELL_GUARD: ShellGuard = ShellGuard()
@@ -0,0 +1,137 @@
+"""
+Probe - a module for measuring how long each shell mode takes to start up,
+and checking that each one returns the same env var values as interactive
+mode.
+"""
+
+import time
+from typing import (
+    Callable,
+    NamedTuple,
+    Optional
+)
+
+from . import (
+    command,
+    expander
+)
+
+
+_DEFAULT_RUNS: int = 3
+
+class ProbeResult(NamedTuple):
+    """
+    The outcome of probing a shell mode: its fastest run time, and the names
+    of any env vars whose values differ from those in interactive mode.
+    """
+    mode: str
+    seconds: float
+    mismatched: list[str]
+    error: Optional[str]
+
+    @property
+    def matches(self) -> bool:
+        """
+        Whether the mode returned the same values as interactive mode.
+        """
+        return not self.error and not self.mismatched
+
+def probe_shell_modes(
+    env_var_names: list[str],
+    source_file: Optional[str] = None,
+    runs: int = _DEFAULT_RUNS
+) -> list[ProbeResult]:
+    """
+    Expands the env var names in each shell mode `runs` times, returning the
+    results for each mode, starting with interactive mode.
+
+    The sourced file mode only gets probed if a `source_file` is provided.
+    """
+    modes: list[str] = [
+        mode
+        for mode in command.SHELL_MODES
+        if mode != command.SHELL_MODE_SOURCE or source_file
+    ]
+    results: list[ProbeResult] = []
+    expected: dict[str, str] = {}
+
+    for mode in modes:
+        seconds: float = 0.0
+        values: dict[str, str] = {}
+        error: Optional[str] = None
+        try:
+            seconds, values = time_expansion(
+                command.resolve_command(mode, source_file),
+                env_var_names,
+                runs
+            )
+        except ValueError as exc:
+            error = str(exc)
+
+        if mode == command.SHELL_MODE_INTERACTIVE:
+            expected = values
+
+        results.append(
+            ProbeResult(
+                mode=mode,
+                seconds=seconds,
+                mismatched=[
+                    name
+                    for name in env_var_names
+                    if values.get(name) != expected.get(name)
+                ],
+                error=error
+            )
+        )
+
+    return results
+
+def format_probe_results(results: list[ProbeResult]) -> str:
+    """
+    Formats probe results as a table, one line per shell mode.
+    """
+    lines: list[str] = []
+
+    for result in results:
+        if result.error:
+            outcome: str = f"error: {result.error}"
+        elif result.mismatched:
+            outcome = (
+                f"differs from interactive: {', '.join(result.mismatched)}"
+            )
+        else:
+            outcome = "same values as interactive"
+
+        lines.append(f"{result.mode:<12} {result.seconds:8.3f}s  {outcome}")
+
+    return "\n".join(lines)
+
+def time_expansion(
+    shell_command_resolver: Callable[[str], list[str]],
+    env_var_names: list[str],
+    runs: int = _DEFAULT_RUNS
+) -> tuple[float, dict[str, str]]:
+    """
+    Expands the env var names in a single batch `runs` times, or just starts
+    up the shell if there are none, returning the fastest run time, and the
+    values found.
+
+    Raises an error if the shell cannot be started.
+    """
+    fastest: Optional[float] = None
+    values: dict[str, str] = {}
+
+    for _run in range(max(runs, 1)):
+        start: float = time.perf_counter()
+        if env_var_names:
+            values = expander.expand_batch(
+                shell_command_resolver,
+                env_var_names
+            ).values
+        else:
+            command.run_command(shell_command_resolver, "")
+        seconds: float = time.perf_counter() - start
+        fastest = seconds if fastest is None else min(fastest, seconds)
+
+    assert fastest is not None
+    return fastest, values
@@ -0,0 +1,41 @@
+"""
+Scanner - a module for finding the env var names used by `ENV_VAR` metas in
+dictionary translations.
+"""
+
+import re
+from typing import (
+    Iterable,
+    Pattern
+)
+
+from .template import compile_template
+
+
+# NOTE: Braces inside a meta argument, like in `${CITY:-Unknown}`, need to be
+# escaped with backslashes in Plover translations.
+_ENV_VAR_META: Pattern[str] = re.compile(
+    r"\{:ENV_VAR:((?:\\.|[^}\\])+)\}",
+    re.IGNORECASE
+)
+_ESCAPED_CHARACTER: Pattern[str] = re.compile(r"\\(.)")
+
+def scan(translations: Iterable[str]) -> set[str]:
+    """
+    Returns the set of env var names used in `ENV_VAR` meta arguments in the
+    given translations, including each env var in a template argument.
+    """
+    env_var_names: set[str] = set()
+
+    for translation in translations:
+        for argument in _ENV_VAR_META.findall(translation):
+            try:
+                env_var_names.update(
+                    compile_template(
+                        _ESCAPED_CHARACTER.sub(r"\1", argument.strip())
+                    ).names
+                )
+            except ValueError:
+                continue
+
+    return env_var_names
@@ -0,0 +1,70 @@
+"""
+Snapshot - a module for fetching every exported env var from a single run of
+the local shell.
+"""
+
+from typing import Callable
+
+from . import command
+
+
+_POSIX_ENV_DUMP: str = "env -0"
+_POWERSHELL_ENV_DUMP: str = (
+    "Get-ChildItem env: | ForEach-Object "
+    "{ [Console]::Out.Write(\"$($_.Name)=$($_.Value)`0\") }"
+)
+_POSIX_NAME_PREFIX: str = "$"
+_POWERSHELL_NAME_PREFIX: str = "$ENV:"
+_RECORD_DIVIDER: str = "\0"
+_NAME_VALUE_DIVIDER: str = "="
+
+def snapshot(
+    shell_command_resolver: Callable[[str], list[str]]
+) -> dict[str, str]:
+    """
+    Returns a dict of every env var exported by the local shell, keyed by
+    the name used to reference it in the `ENV_VAR` meta (eg `$FOO` or
+    `$ENV:FOO`).
+
+    Env vars with blank values are left out.
+
+    Raises an error if the shell fails, or exports no env vars at all, so
+    that a broken shell does not replace an earlier snapshot with an empty
+    one.
+    """
+    powershell: bool = command.is_powershell(shell_command_resolver)
+    output: str = command.run_script(
+        shell_command_resolver,
+        _POWERSHELL_ENV_DUMP if powershell else _POSIX_ENV_DUMP,
+        check=True
+    )
+    env_vars: dict[str, str] = parse(
+        output,
+        _POWERSHELL_NAME_PREFIX if powershell else _POSIX_NAME_PREFIX
+    )
+
+    # NOTE: A working shell always exports some env vars, like `PATH`.
+    if not env_vars:
+        raise ValueError("No env vars found in the shell's environment")
+
+    return env_vars
+
+def parse(output: str, name_prefix: str) -> dict[str, str]:
+    """
+    Parses NUL-delimited `NAME=value` records into a dict of env var values.
+
+    Any output printed by shell config files before the first record is
+    discarded.
+    """
+    env_vars: dict[str, str] = {}
+
+    for record in output.split(_RECORD_DIVIDER):
+        name, divider, value = record.partition(_NAME_VALUE_DIVIDER)
+        # NOTE: Env var names cannot contain newlines, so anything before
+        # the last newline in a name is stray output from the shell.
+        name = name.rsplit("\n", 1)[-1]
+
+        if divider and name and value:
+            env_vars[f"{name_prefix}{name}"] = value
+
+    return env_vars
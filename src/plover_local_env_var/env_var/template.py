@@ -0,0 +1,168 @@
+"""
+Template - a module for compiling `ENV_VAR` meta arguments that combine env
+vars, literal text, defaults and filters, eg `$FIRST $LAST`,
+`${CITY:-Unknown}` or `$PHONE|digits`.
+"""
+
+from functools import lru_cache
+import re
+from typing import (
+    Callable,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Union
+)
+
+from .filters import (
+    apply_filters,
+    validate_filters
+)
+
+
+# NOTE: Matches, in order: an escaped `$$`, a braced `${NAME}` or
+# `${NAME:-default}`, or a bare `$NAME`. Windows names are prefixed with
+# `ENV:`, eg `$ENV:NAME` or `${ENV:NAME}`. Names can be followed by a chain of
+# filters, eg `$NAME|trim|upper` or `${NAME|upper:-default}`.
+_TOKEN: Pattern[str] = re.compile(
+    r"\$(?:"
+    r"(?P<escaped>\$)"
+    r"|\{(?P<braced_prefix>ENV:)?(?P<braced_name>[A-Za-z_][A-Za-z_0-9]*)"
+    r"(?P<braced_filters>(?:\|[A-Za-z_]+)*)"
+    r"(?::-(?P<default>[^}]*))?\}"
+    r"|(?P<prefix>ENV:)?(?P<name>[A-Za-z_][A-Za-z_0-9]*)"
+    r"(?P<filters>(?:\|[A-Za-z_]+)*)"
+    r")",
+    re.IGNORECASE
+)
+_FILTER_DIVIDER: str = "|"
+_CACHE_SIZE: int = 4096
+
+class Variable(NamedTuple):
+    """
+    An env var in a template, along with any default for when it has no
+    value, and any filters to apply to its value.
+    """
+    name: str
+    default: Optional[str]
+    filters: tuple[str, ...] = ()
+
+class Template(NamedTuple):
+    """
+    A parsed `ENV_VAR` meta argument, which renders its env vars and literal
+    text without any further parsing.
+
+    `names` are the distinct env var names used in the template, in order.
+    """
+    names: tuple[str, ...]
+    parts: tuple[Union[str, Variable], ...]
+
+    def render(
+        self,
+        lookup: Callable[[str], str],
+        transform: Callable[[str, tuple[str, ...], str], str] = (
+            lambda _name, filters, value: apply_filters(value, filters)
+        )
+    ) -> str:
+        """
+        Renders the template, looking up each env var value with `lookup`, and
+        applying any filters to it with `transform`.
+
+        If `lookup` raises an error for an env var with a default, the default
+        is used instead. Otherwise, the error is raised.
+        """
+        rendered: list[str] = []
+
+        for part in self.parts:
+            if isinstance(part, str):
+                rendered.append(part)
+                continue
+
+            try:
+                value: str = lookup(part.name)
+            except ValueError:
+                if part.default is None:
+                    raise
+                value = part.default
+
+            rendered.append(
+                transform(part.name, part.filters, value)
+                if part.filters
+                else value
+            )
+
+        return "".join(rendered)
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def compile_template(argument: str) -> Template:
+    """
+    Parses an `ENV_VAR` meta argument into a template, which is cached, so
+    that each distinct argument only gets parsed once.
+
+    Raises an error if the argument does not contain any env vars, or uses a
+    filter that does not exist.
+    """
+    parts: list[Union[str, Variable]] = []
+    position: int = 0
+
+    for match in _TOKEN.finditer(argument):
+        if match.start() > position:
+            parts.append(argument[position:match.start()])
+        position = match.end()
+
+        if match.group("escaped"):
+            parts.append("$")
+        elif match.group("braced_name"):
+            parts.append(
+                Variable(
+                    name=_env_var_name(
+                        match.group("braced_prefix"),
+                        match.group("braced_name")
+                    ),
+                    default=match.group("default"),
+                    filters=_filters(match.group("braced_filters"))
+                )
+            )
+        else:
+            parts.append(
+                Variable(
+                    name=_env_var_name(match.group("prefix"), match.group("name")),
+                    default=None,
+                    filters=_filters(match.group("filters"))
+                )
+            )
+
+    if position < len(argument):
+        parts.append(argument[position:])
+
+    names: tuple[str, ...] = tuple(dict.fromkeys(
+        part.name for part in parts if isinstance(part, Variable)
+    ))
+    if not names:
+        raise ValueError(f"Provided value not an $ENV_VAR: {argument}")
+
+    return Template(names=names, parts=tuple(_join_literals(parts)))
+
+def _env_var_name(prefix: Optional[str], name: str) -> str:
+    return f"$ENV:{name}" if prefix else f"${name}"
+
+def _filters(filter_chain: str) -> tuple[str, ...]:
+    filters: tuple[str, ...] = tuple(
+        name.lower() for name in filter_chain.split(_FILTER_DIVIDER)[1:]
+    )
+    validate_filters(filters)
+
+    return filters
+
+def _join_literals(
+    parts: list[Union[str, Variable]]
+) -> list[Union[str, Variable]]:
+    joined: list[Union[str, Variable]] = []
+
+    for part in parts:
+        if isinstance(part, str) and joined and isinstance(joined[-1], str):
+            joined[-1] += part
+        else:
+            joined.append(part)
+
+    return joined
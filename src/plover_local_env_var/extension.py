@@ -5,10 +5,18 @@ Plover entry point extension module for Plover Local Env Var.
     - https://plover.readthedocs.io/en/latest/plugin-dev/meta.html
 """
 
+import functools
 from pathlib import Path
-from typing import Callable
+import threading
+import time
+from typing import Optional
 
+from plover import log
 from plover.engine import StenoEngine
+from plover.steno_dictionary import (
+    StenoDictionary,
+    StenoDictionaryCollection
+)
 from plover.formatting import (
     _Action,
     _Context
@@ -18,67 +26,318 @@ from plover.oslayer.config import CONFIG_DIR
 from plover.registry import registry
 
 from . import (
+    cache,
     config,
-    env_var
+    env_var,
+    metrics,
+    resolver,
+    watcher
 )
 
 
-_CONFIG_FILE: Path = Path(CONFIG_DIR) / config.CONFIG_BASENAME
+_CONFIG_DIR: Path = Path(CONFIG_DIR)
+_SECONDS_PER_DAY: float = 24 * 60 * 60
 
-class LocalEnvVar:
+# NOTE: LocalEnvVar ties together the caches, the config file, the resolver,
+# and the optional watcher and reporter, for the lifetime of the plugin, so it
+# has more attributes than other classes.
+class LocalEnvVar: # pylint: disable=too-many-instance-attributes
     """
     Extension class that also registers a meta plugin.
     The meta deals with fetching local env var values.
+
+    The config file, and any persisted values, strategy measurements and
+    trace, are kept in `config_dir`, which defaults to Plover's config
+    directory.
     """
 
+    _config_filepath: Path
+    _disk_cache: cache.DiskCache
     _engine: StenoEngine
-    _env_var_values: dict[str, str]
-    _shell_command: Callable[[str], list[str]]
+    _env_var_values: cache.ValueCache
+    _fingerprint: dict[str, Optional[tuple[int, int]]]
+    _negative_cache: cache.NegativeCache
+    _persister: config.ConfigPersister
+    _reporter: Optional[metrics.PeriodicReporter]
+    _resolver: resolver.Resolver
+    _settings: config.Settings
+    _strategy_selector: config.StrategySelector
+    _trace_filepath: Path
+    _transforms: cache.TransformCache
+    _watcher: Optional[watcher.FileWatcher]
 
-    def __init__(self, engine: StenoEngine) -> None:
+    def __init__(
+        self,
+        engine: StenoEngine,
+        config_dir: Path = _CONFIG_DIR
+    ) -> None:
         self._engine = engine
+        self._config_filepath = config_dir / config.CONFIG_BASENAME
+        self._trace_filepath = config_dir / metrics.TRACE_BASENAME
+        self._env_var_values = cache.ValueCache()
+        self._disk_cache = cache.DiskCache(
+            config_dir / cache.VALUE_CACHE_BASENAME
+        )
+        self._strategy_selector = config.StrategySelector(
+            config_dir / config.STRATEGY_MEASUREMENTS_BASENAME
+        )
+        self._transforms = cache.TransformCache()
+        self._persister = config.ConfigPersister(
+            self._config_filepath,
+            on_save=self._refresh_config_fingerprint,
+            on_error=self._log_save_error
+        )
+        self._fingerprint = {}
+        self._watcher = None
+        self._reporter = None
 
     def start(self) -> None:
         """
-        Sets up the meta plugin and steno engine hooks
+        Sets up the meta plugin and steno engine hooks.
+
+        The initial fetch of env var values runs in the background, so that
+        Plover's startup does not have to wait on the shell. If values were
+        persisted to disk with the same shell config, they get served
+        straight away, and replaced once the fetch finishes.
+
+        With the auto strategy, env var values get fetched with the strategy
+        chosen last time, if the shell config has not changed since, or else
+        the subprocess strategy. Each strategy then gets measured in the
+        background, unless they have already been measured with the same
+        shell config.
         """
-        self._shell_command = env_var.resolve_command()
-        self._env_var_values = config.load(self._shell_command, _CONFIG_FILE)
+        self._settings = config.load_settings(self._config_filepath)
+        try:
+            metrics.TRACER.configure(
+                self._trace_filepath,
+                self._settings.trace_sample_rate
+            )
+        except OSError as exc:
+            log.error(f"Plover Local Env Var: unable to trace: {exc}")
+        env_var.SHELL_GUARD.configure(
+            timeout=self._settings.shell_timeout or None,
+            failure_threshold=self._settings.circuit_breaker_threshold,
+            cool_down=self._settings.circuit_breaker_cool_down
+        )
+        self._fingerprint = self._fingerprint_files()
+        if self._settings.strategy != config.STRATEGY_AUTO:
+            self._strategy_selector.clear()
+        self._resolver = resolver.Resolver(
+            self._settings,
+            self._strategy_selector.starting_strategy(
+                self._settings.strategy,
+                self._shell_config_key()
+            )
+        )
+        self._negative_cache = cache.NegativeCache(
+            self._settings.negative_cache_ttl,
+            self._settings.negative_cache_max_ttl
+        )
+        persisted_values: Optional[dict[str, str]] = (
+            self._disk_cache.load(self._shell_config_key())
+            if self._settings.persist_values
+            else None
+        )
+        if persisted_values:
+            self._env_var_values.update(persisted_values)
+            self._env_var_values.reload(
+                self._load_env_var_values,
+                self._log_load_error
+            )
+        else:
+            if not self._settings.persist_values:
+                self._disk_cache.clear()
+            self._env_var_values.load(
+                self._load_env_var_values,
+                self._log_load_error
+            )
         registry.register_plugin("meta", "ENV_VAR", self._env_var)
+        registry.register_plugin("meta", "ENV_VAR_STATS", self._env_var_stats)
         self._engine.hook_connect(
             "machine_state_changed",
             self._machine_state_changed
         )
+        self._engine.hook_connect(
+            "dictionaries_loaded",
+            self._dictionaries_loaded
+        )
+        if self._settings.watch:
+            self._watcher = watcher.FileWatcher(
+                self._watched_filepaths(),
+                self._files_changed
+            )
+            self._watcher.start()
+        if self._settings.stats_log_interval:
+            self._reporter = metrics.PeriodicReporter(
+                self._settings.stats_log_interval,
+                self._log_stats
+            )
+            self._reporter.start()
 
     def stop(self) -> None:
         """
-        Tears down the steno engine hooks
+        Tears down the steno engine hooks, any file watcher, any metrics
+        reporter, and any running shell coprocess, saves any env var names
+        waiting to be saved, and stops tracing.
         """
         self._engine.hook_disconnect(
             "machine_state_changed",
             self._machine_state_changed
         )
+        self._engine.hook_disconnect(
+            "dictionaries_loaded",
+            self._dictionaries_loaded
+        )
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
+        if self._reporter:
+            self._reporter.stop()
+            self._reporter = None
+        self._resolver.close()
+        self._persister.flush()
+        self._persist_values(self._env_var_values.items())
+        log.info(
+            f"Plover Local Env Var: shell stats: {env_var.SHELL_GUARD.stats()}"
+        )
+        self._log_stats()
+        metrics.TRACER.close()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits for the initial fetch of env var values to finish, returning
+        whether it did within `timeout` seconds.
+        """
+        return self._env_var_values.wait(timeout)
+
+    def reload(self) -> Optional[threading.Thread]:
+        """
+        Fetches env var values again in the background, whether or not any
+        shell config files have changed, returning the thread it runs on, or
+        `None` if it got queued behind a reload already in flight.
+
+        Any env vars remembered as having no value get tried again on their
+        next lookup.
+        """
+        self._fingerprint = self._fingerprint_files()
+        self._negative_cache.clear()
+        metrics.METRICS.increment("reloads")
+
+        return self._env_var_values.reload(
+            self._reload_env_var_values,
+            self._log_load_error
+        )
 
     def _env_var(self, ctx: _Context, argument: str) -> _Action:
         """
-        Fetches a local env var and stores it in memory for faster
+        Outputs the value of a local env var, or a template of env vars and
+        text, eg `$FIRST $LAST`, `${CITY:-Unknown}` or `$PHONE|digits`,
+        fetching any env vars not already stored in memory for faster
         execution on subsequent calls.
+
+        Each distinct argument only gets parsed once, and each filtered value
+        only gets filtered once. Concurrent lookups of the same env var share
+        a single fetch.
+
+        NOTE: Sampled lookups get traced with the names of the env vars they
+        use, and the names of any not already in memory, but never their
+        values, or the argument, which can contain literal text.
         """
         if not argument:
             raise ValueError("No $ENV_VAR provided")
 
-        env_var_value: str
-        try:
-            env_var_value = self._env_var_values[argument]
-        except KeyError:
-            env_var_value = env_var.expand(self._shell_command, argument)
-            self._env_var_values[argument] = env_var_value
-            config.save(_CONFIG_FILE, sorted(self._env_var_values.keys()))
+        template: env_var.Template = env_var.compile_template(argument)
+        missed: list[str] = []
+        with metrics.TRACER.sample() as sampled:
+            start: float = time.perf_counter()
+            try:
+                text: str = template.render(
+                    functools.partial(self._lookup, missed=missed),
+                    self._transform
+                )
+            finally:
+                seconds: float = time.perf_counter() - start
+                metrics.METRICS.observe("lookup_seconds", seconds)
+                if sampled:
+                    metrics.TRACER.record(
+                        "env_var",
+                        names=list(template.names),
+                        hit=not missed,
+                        missed=missed,
+                        seconds=seconds
+                    )
 
         action: _Action = ctx.new_action()
-        action.text = env_var_value
+        action.text = text
         return action
 
+    def _lookup(self, name: str, missed: list[str]) -> str:
+        """
+        Returns the value of a single env var, from memory if possible, and
+        counts the use of it, so that the most used env vars get loaded first.
+        Names not already in memory get added to `missed`.
+        """
+        env_var_value: Optional[str] = self._env_var_values.get(name)
+        if env_var_value is not None:
+            metrics.METRICS.increment("hits")
+        else:
+            metrics.METRICS.increment("misses")
+            missed.append(name)
+            env_var_value = self._env_var_values.get_or_fetch(
+                name,
+                self._fetch
+            )
+
+        self._persister.record_use(name)
+        return env_var_value
+
+    def _transform(
+        self,
+        name: str,
+        filters: tuple[str, ...],
+        value: str
+    ) -> str:
+        """
+        Returns an env var value with filters applied, reusing the result
+        until the value changes.
+        """
+        return self._transforms.get_or_transform(
+            name,
+            filters,
+            value,
+            env_var.apply_filters
+        )
+
+    def _env_var_stats(self, ctx: _Context, _argument: str) -> _Action:
+        """
+        Outputs a summary of runtime metrics, eg cache hits and misses, and
+        lookup and shell latencies.
+        """
+        action: _Action = ctx.new_action()
+        action.text = metrics.METRICS.summary()
+        return action
+
+    def _fetch(self, argument: str) -> str:
+        """
+        Fetches a local env var that is not in memory, scheduling its name to
+        be saved to the config file.
+
+        The env var gets looked up in each of the configured resolvers in
+        turn, so only env vars not found in-process need a shell.
+
+        Env vars found to have no value are remembered for a while, and
+        their error raised again without spawning another shell. Env vars
+        that could not be fetched for any other reason (eg the shell timed
+        out) get fetched again on their next lookup.
+        """
+        env_var_value: str = self._negative_cache.get_or_fetch(
+            argument,
+            self._resolver.chain.resolve_one
+        )
+        self._persister.schedule([argument])
+
+        return env_var_value
+
     def _machine_state_changed(
         self,
         _machine_type: str,
@@ -86,11 +345,308 @@ class LocalEnvVar:
     ) -> None:
         """
         This hook will be called when when the Plover UI "Reconnect" button is
-        pressed. Resetting the `_env_var_values` dictionary allows for changes
-        made to env vars to be re-read in.
+        pressed. Reloading the `_env_var_values` cache, and restarting any
+        shell coprocess, allows for changes made to env vars to be re-read in.
+
+        The reload happens in the background, so the reconnect does not have
+        to wait on the shell, and current values keep getting served until the
+        reloaded ones are swapped in. Any env vars remembered as having no
+        value get tried again on their next lookup.
         """
         if machine_state == STATE_RUNNING:
-            self._env_var_values = config.load(
-                self._shell_command,
-                _CONFIG_FILE
+            self._negative_cache.clear()
+            self._reload_if_changed()
+
+    def _files_changed(self, filepaths: list[str]) -> None:
+        """
+        Called from the file watcher thread when any watched files change.
+
+        Changes to shell config files mean any env var value could have
+        changed, so they all get reloaded. Changes to only the config file
+        mean that only newly-added env var names need fetching.
+        """
+        if str(self._config_filepath) not in filepaths or len(filepaths) > 1:
+            self._reload_if_changed()
+            return
+
+        if self._resolver.strategy == config.STRATEGY_SNAPSHOT:
+            return
+
+        config_fingerprint: dict[str, Optional[tuple[int, int]]] = (
+            env_var.fingerprint([self._config_filepath])
+        )
+        if config_fingerprint.items() <= self._fingerprint.items():
+            return
+
+        self._fingerprint.update(config_fingerprint)
+        try:
+            self._prefetch(
+                set(config.load_env_var_names(self._config_filepath))
+            )
+        except ValueError as exc:
+            self._log_load_error(exc)
+
+    def _reload_if_changed(self) -> None:
+        """
+        Reloads env var values in the background, unless no shell config
+        files, nor the config file, have changed since the last load.
+
+        Any env vars remembered as having no value get tried again on their
+        next lookup, as the changes could have given them one.
+        """
+        fingerprint: dict[str, Optional[tuple[int, int]]] = (
+            self._fingerprint_files()
+        )
+        if fingerprint == self._fingerprint:
+            log.info(
+                "Plover Local Env Var: shell config files unchanged, "
+                "skipping reload"
             )
+            metrics.METRICS.increment("reloads_skipped")
+            return
+
+        self.reload()
+
+    def _dictionaries_loaded(
+        self,
+        dictionaries: StenoDictionaryCollection
+    ) -> None:
+        """
+        This hook will be called when Plover (re)loads its dictionaries.
+        Any env var names used in `ENV_VAR` metas that have not been fetched
+        yet get fetched in a single batch in the background, so that the first
+        stroke of any outline is already a cache hit.
+
+        NOTE: Scanning every translation can take a while with large
+        dictionaries, so it happens in the background too, rather than
+        holding up Plover's hook thread.
+        """
+        if self._resolver.strategy == config.STRATEGY_SNAPSHOT:
+            return
+
+        threading.Thread(
+            target=self._scan,
+            args=([
+                dictionary
+                for dictionary in dictionaries.dicts
+                if dictionary.enabled
+            ],),
+            name="plover-local-env-var-scan",
+            daemon=True
+        ).start()
+
+    def _scan(self, dictionaries: list[StenoDictionary]) -> None:
+        """
+        Prefetches any env var names used in `ENV_VAR` metas in the
+        dictionaries.
+        """
+        env_var_names: set[str] = env_var.scan(
+            translation
+            for dictionary in dictionaries
+            for (_outline, translation) in dictionary.items()
+        )
+
+        if env_var_names:
+            self._prefetch(env_var_names)
+
+    def _prefetch(self, env_var_names: set[str]) -> None:
+        """
+        Fetches a batch of any env var values that are not already in memory,
+        storing any found in memory and their names in the config file.
+
+        Env vars that have been idle for too long only get fetched when they
+        are next used.
+        """
+        self._env_var_values.wait()
+        try:
+            idle_env_var_names: list[str] = config.load_idle_env_var_names(
+                self._config_filepath,
+                self._settings.idle_after_days * _SECONDS_PER_DAY
+            )
+        except ValueError as exc:
+            self._log_load_error(exc)
+            return
+
+        unfetched_env_var_names: list[str] = sorted(
+            env_var_names
+            - set(self._env_var_values.names())
+            - set(idle_env_var_names)
+        )
+
+        if not unfetched_env_var_names:
+            return
+
+        result: env_var.BatchResult
+        try:
+            result = self._resolver.chain.resolve(unfetched_env_var_names)
+        except ValueError as exc:
+            self._log_load_error(exc)
+            return
+
+        if result.values:
+            self._env_var_values.update(result.values)
+            self._persister.schedule(sorted(result.values))
+
+    def _load_env_var_values(self) -> dict[str, str]:
+        """
+        Fetches env var values with the configured strategy: either a
+        snapshot of the whole shell environment, or just the values for the
+        env var names in the config file, resolved through the resolver chain.
+
+        The most used env vars in the config file get served as soon as they
+        have been fetched, and any idle ones are left to be fetched when they
+        are next used.
+
+        With the auto strategy, the strategy gets chosen in the background
+        once they have been fetched (or failed to be), so that lookups never
+        wait on measuring strategies.
+        """
+        start: float = time.perf_counter()
+        env_var_values: dict[str, str]
+        try:
+            if self._resolver.strategy == config.STRATEGY_SNAPSHOT:
+                env_var_values = env_var.snapshot(self._resolver.shell_command)
+            else:
+                env_var_values = config.load(
+                    self._resolver.shell_command,
+                    self._config_filepath,
+                    self._resolver.chain.resolve,
+                    self._settings.idle_after_days * _SECONDS_PER_DAY,
+                    self._env_var_values.update,
+                    self._persister.prune
+                )
+        finally:
+            if self._settings.strategy == config.STRATEGY_AUTO:
+                threading.Thread(
+                    target=self._select_strategy,
+                    name="plover-local-env-var-strategy",
+                    daemon=True
+                ).start()
+        log.info(
+            f"Plover Local Env Var: loaded {len(env_var_values)} env var "
+            f"values in {time.perf_counter() - start:.3f}s"
+        )
+        self._persist_values(env_var_values)
+
+        return env_var_values
+
+    def _reload_env_var_values(self) -> dict[str, str]:
+        """
+        Restarts any shell coprocess, and asks any resolver daemon to drop its
+        values, so they pick up shell config changes, and fetches env var
+        values again, dropping any filtered values.
+        """
+        self._transforms.clear()
+        self._resolver.restart()
+
+        return self._load_env_var_values()
+
+    def _select_strategy(self) -> None:
+        """
+        Measures each strategy, unless they have already been measured with
+        the same shell config, and switches to the cheapest one that gives
+        correct results.
+
+        Switching to or from the snapshot strategy fetches env var values
+        again in the background, as the snapshot strategy serves every value
+        from a single snapshot, while the others only fetch the values in the
+        config file.
+        """
+        try:
+            measurements: list[config.StrategyMeasurement] = (
+                self._strategy_selector.select(
+                    self._resolver.shell_command,
+                    config.load_env_var_names(self._config_filepath),
+                    self._shell_config_key()
+                )
+            )
+        except ValueError as exc:
+            self._log_load_error(exc)
+            return
+
+        strategy: str = config.choose_strategy(measurements)
+        log.info(
+            f"Plover Local Env Var: using the {strategy} strategy: "
+            f"{config.format_measurements(measurements)}"
+        )
+
+        if strategy == self._resolver.strategy:
+            return
+
+        snapshot_changed: bool = config.STRATEGY_SNAPSHOT in (
+            strategy,
+            self._resolver.strategy
+        )
+        self._resolver.use_strategy(strategy)
+        if snapshot_changed:
+            self._env_var_values.reload(
+                self._load_env_var_values,
+                self._log_load_error
+            )
+
+    def _persist_values(self, env_var_values: dict[str, str]) -> None:
+        """
+        Saves env var values to disk, if enabled, replacing any saved with a
+        different shell config.
+        """
+        if not self._settings.persist_values:
+            return
+
+        try:
+            self._disk_cache.save(self._shell_config_key(), env_var_values)
+        except OSError as exc:
+            log.error(
+                f"Plover Local Env Var: unable to persist env var values: {exc}"
+            )
+
+    def _shell_config_key(self) -> str:
+        """
+        Returns the key that persisted values and strategy measurements are
+        saved under: a hash of the settings and the fingerprints of the shell
+        config files, but not the config file, which changes whenever a new
+        env var name gets saved.
+        """
+        return cache.DiskCache.key(
+            repr(self._settings),
+            {
+                filepath: fingerprint
+                for filepath, fingerprint in self._fingerprint.items()
+                if filepath != str(self._config_filepath)
+            }
+        )
+
+    def _fingerprint_files(self) -> dict[str, Optional[tuple[int, int]]]:
+        """
+        Fingerprints the files that env var values depend on.
+        """
+        return env_var.fingerprint(self._watched_filepaths())
+
+    def _watched_filepaths(self) -> list[Path]:
+        """
+        Returns the paths of the files that env var values depend on: the
+        shell config files, any sourced file, any dotenv file, and the config
+        file.
+        """
+        return [
+            *config.dependency_filepaths(self._settings),
+            self._config_filepath
+        ]
+
+    def _refresh_config_fingerprint(self) -> None:
+        """
+        Records the config file's fingerprint after the plugin itself has
+        saved to it, so that its own saves do not count as changes.
+        """
+        self._fingerprint.update(env_var.fingerprint([self._config_filepath]))
+
+    @staticmethod
+    def _log_stats() -> None:
+        log.info(f"Plover Local Env Var: stats: {metrics.METRICS.summary()}")
+
+    @staticmethod
+    def _log_load_error(exc: Exception) -> None:
+        log.error(f"Plover Local Env Var: unable to load env vars: {exc}")
+
+    @staticmethod
+    def _log_save_error(exc: Exception) -> None:
+        log.error(f"Plover Local Env Var: unable to save env vars: {exc}")
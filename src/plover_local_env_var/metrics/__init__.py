@@ -0,0 +1,31 @@
+"""
+# Metrics
+
+A package dealing with:
+    - counting cache hits, misses, reloads and config file writes
+    - keeping latency histograms for lookups and shell runs
+    - reporting metrics periodically in the background
+    - tracing a sample of lookups, shell runs and config file writes
+"""
+
+__all__ = [
+    "METRICS",
+    "TRACER",
+    "TRACE_BASENAME",
+    "Histogram",
+    "Metrics",
+    "PeriodicReporter",
+    "Tracer"
+]
+
+from .histogram import Histogram
+from .metrics import (
+    METRICS,
+    Metrics
+)
+from .reporter import PeriodicReporter
+from .tracer import (
+    TRACER,
+    TRACE_BASENAME,
+    Tracer
+)
@@ -0,0 +1,86 @@
+"""
+Histogram - a module for keeping a fixed-size distribution of latencies.
+"""
+
+import bisect
+from typing import Optional
+
+
+# NOTE: Bucket upper bounds in seconds, from sub-millisecond cache hits up to
+# shells that hit the default timeout.
+_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0
+)
+
+class Histogram:
+    """
+    A count of latencies in fixed buckets, so that recording one costs the
+    same no matter how many have been recorded.
+
+    Percentiles are estimated as the upper bound of the bucket they fall in,
+    capped at the largest latency recorded.
+    """
+
+    count: int
+    max_seconds: float
+    total_seconds: float
+    _counts: list[int]
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._counts = [0] * (len(_BUCKETS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        """
+        Records a latency.
+        """
+        self._counts[bisect.bisect_left(_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Returns an estimate of the latency that `percent` percent of recorded
+        latencies were at or under, or `None` if none have been recorded.
+        """
+        if not self.count:
+            return None
+
+        rank: float = self.count * percent / 100
+        seen: int = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                upper_bound: float = (
+                    _BUCKETS[index] if index < len(_BUCKETS) else self.max_seconds
+                )
+                return min(upper_bound, self.max_seconds)
+
+        return self.max_seconds
+
+    def buckets(self) -> dict[str, int]:
+        """
+        Returns the count in each bucket, keyed by its upper bound.
+        """
+        return {
+            **{
+                f"<={bucket:g}s": bucket_count
+                for bucket, bucket_count in zip(_BUCKETS, self._counts)
+            },
+            f">{_BUCKETS[-1]:g}s": self._counts[-1]
+        }
@@ -0,0 +1,105 @@
+"""
+Metrics - a module for counting events and timing operations across the
+plugin, so that slow strokes can be diagnosed.
+"""
+
+import threading
+from typing import (
+    Any,
+    Optional
+)
+
+from .histogram import Histogram
+
+
+_PERCENTILES: tuple[int, ...] = (50, 95, 99)
+
+class Metrics:
+    """
+    A thread-safe store of named counters and latency histograms.
+
+    Counters and histograms are created the first time they are used.
+    """
+
+    _counters: dict[str, int]
+    _histograms: dict[str, Histogram]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """
+        Adds `amount` to a counter.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        Records a latency in a histogram.
+        """
+        with self._lock:
+            histogram: Optional[Histogram] = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self) -> None:
+        """
+        Removes all counters and histograms.
+        """
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Returns a copy of all counters, and a summary of each histogram.
+        """
+        with self._lock:
+            return {
+                "counters": dict(sorted(self._counters.items())),
+                "histograms": {
+                    name: {
+                        "count": histogram.count,
+                        "total_seconds": histogram.total_seconds,
+                        "max_seconds": histogram.max_seconds,
+                        **{
+                            f"p{percent}_seconds": histogram.percentile(percent)
+                            for percent in _PERCENTILES
+                        },
+                        "buckets": histogram.buckets()
+                    }
+                    for name, histogram in sorted(self._histograms.items())
+                }
+            }
+
+    def summary(self) -> str:
+        """
+        Returns a single-line, human-readable summary of all counters and
+        histograms, with latencies in milliseconds.
+        """
+        snapshot: dict[str, Any] = self.snapshot()
+        parts: list[str] = [
+            f"{name}={count}"
+            for name, count in snapshot["counters"].items()
+        ]
+
+        for name, histogram in snapshot["histograms"].items():
+            percentiles: str = " ".join(
+                f"p{percent}={_milliseconds(histogram[f'p{percent}_seconds'])}"
+                for percent in _PERCENTILES
+            )
+            parts.append(
+                f"{name}[n={histogram['count']} {percentiles} "
+                f"max={_milliseconds(histogram['max_seconds'])}]"
+            )
+
+        return ", ".join(parts) or "no activity"
+
+METRICS: Metrics = Metrics()
+
+def _milliseconds(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f}ms"
@@ -0,0 +1,54 @@
+"""
+Reporter - a module for reporting metrics periodically on a background
+thread.
+"""
+
+import threading
+from typing import (
+    Callable,
+    Optional
+)
+
+
+class PeriodicReporter:
+    """
+    Calls `report` every `interval` seconds on a background thread, until
+    stopped.
+    """
+
+    _interval: float
+    _report: Callable[[], None]
+    _stopped: threading.Event
+    _thread: Optional[threading.Thread]
+
+    def __init__(self, interval: float, report: Callable[[], None]) -> None:
+        self._interval = interval
+        self._report = report
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Starts reporting on a background thread.
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="plover-local-env-var-metrics",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops reporting, and waits for the background thread to finish.
+        """
+        self._stopped.set()
+        thread: Optional[threading.Thread] = self._thread
+        self._thread = None
+        if thread:
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self._report()
@@ -0,0 +1,127 @@
+"""
+Tracer - a module for writing a sample of lookups, shell runs and config file
+writes to a JSON lines file, so that where the time went on a slow stroke can
+be diagnosed.
+"""
+
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+import random
+import threading
+import time
+from typing import (
+    Any,
+    Iterator,
+    Optional,
+    TextIO
+)
+
+
+TRACE_BASENAME: str = "local_env_var_trace.jsonl"
+
+class Tracer:
+    """
+    A thread-safe writer of trace events, one JSON object per line.
+
+    Tracing is off until a file gets configured. Each traced operation gets
+    sampled with a probability of `sample_rate`, and every event within a
+    sampled operation on the same thread also gets traced, so that a slow
+    lookup can be followed through to the shell run it caused.
+
+    NOTE: Only names, timings and sizes get traced, never env var values, as
+    they can be secrets.
+    """
+
+    _file: Optional[TextIO]
+    _local: threading.local
+    _lock: threading.Lock
+    _random: random.Random
+    _sample_rate: float
+
+    def __init__(self) -> None:
+        self._file = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self._sample_rate = 0.0
+
+    def configure(self, filepath: Optional[Path], sample_rate: float) -> None:
+        """
+        Starts appending trace events to `filepath`, creating it readable only
+        by the current user, or stops tracing if there is no `filepath` or
+        `sample_rate` is 0.
+
+        Raises an error if the file cannot be opened.
+        """
+        self.close()
+        if filepath is None or not sample_rate:
+            return
+
+        file_descriptor: int = os.open(
+            filepath,
+            os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+            0o600
+        )
+        with self._lock:
+            self._file = os.fdopen(file_descriptor, "a", encoding="utf-8")
+            self._sample_rate = sample_rate
+
+    def close(self) -> None:
+        """
+        Stops tracing, and closes any trace file.
+        """
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._file = None
+            self._sample_rate = 0.0
+
+    def sampled(self) -> bool:
+        """
+        Returns whether an event should be traced: always within a sampled
+        operation on the same thread, or else with a probability of the
+        sample rate.
+        """
+        if self._file is None:
+            return False
+        if getattr(self._local, "sampled", False):
+            return True
+
+        return (
+            self._sample_rate >= 1.0
+            or self._random.random() < self._sample_rate
+        )
+
+    @contextmanager
+    def sample(self) -> Iterator[bool]:
+        """
+        Decides whether an operation gets traced, yielding the decision, and
+        traces every event within it on the same thread if it does.
+        """
+        sampled: bool = self.sampled()
+        previous: bool = getattr(self._local, "sampled", False)
+        self._local.sampled = sampled
+        try:
+            yield sampled
+        finally:
+            self._local.sampled = previous
+
+    def record(self, event: str, **fields: Any) -> None:
+        """
+        Writes an event, with the time and thread it happened on, to the trace
+        file, if tracing is on.
+        """
+        line: str = json.dumps({
+            "time": round(time.time(), 6),
+            "thread": threading.current_thread().name,
+            "event": event,
+            **fields
+        })
+        with self._lock:
+            if self._file:
+                self._file.write(f"{line}\n")
+                self._file.flush()
+
+TRACER: Tracer = Tracer()
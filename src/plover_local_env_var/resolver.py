@@ -0,0 +1,151 @@
+"""
+Resolver - a module for resolving env var values with a strategy, keeping
+the shell command, any shell coprocess, and the chain of backends built from
+them together, so that they can be swapped out whenever the strategy
+changes.
+"""
+
+from pathlib import Path
+from typing import (
+    Callable,
+    Optional
+)
+
+from . import (
+    config,
+    daemon,
+    env_var
+)
+
+
+class Resolver:
+    """
+    Resolves env var names through the chain of backends in `settings`, with
+    the shell backend using `strategy`.
+
+    With a resolver daemon, the shell backend asks the daemon first, and only
+    uses its own shell when the daemon is not running, or does not respond
+    within the shell timeout.
+    """
+
+    _chain: env_var.ResolverChain
+    _coprocess: Optional[env_var.ShellCoprocess]
+    _daemon_client: Optional[daemon.DaemonClient]
+    _settings: config.Settings
+    _shell_command: Callable[[str], list[str]]
+    _strategy: str
+
+    def __init__(self, settings: config.Settings, strategy: str) -> None:
+        self._settings = settings
+        self._shell_command = env_var.resolve_command(
+            settings.shell_mode,
+            settings.shell_source_file
+        )
+        self._daemon_client = (
+            daemon.DaemonClient(
+                timeout=settings.shell_timeout or None,
+                cool_down=settings.circuit_breaker_cool_down
+            )
+            if settings.use_daemon
+            else None
+        )
+        self._coprocess = None
+        self.use_strategy(strategy)
+
+    @property
+    def chain(self) -> env_var.ResolverChain:
+        """
+        The chain of backends that env var names get looked up in.
+        """
+        return self._chain
+
+    @property
+    def shell_command(self) -> Callable[[str], list[str]]:
+        """
+        The resolved shell command that env vars get expanded with.
+        """
+        return self._shell_command
+
+    @property
+    def strategy(self) -> str:
+        """
+        The strategy the shell backend uses.
+        """
+        return self._strategy
+
+    def use_strategy(self, strategy: str) -> None:
+        """
+        Switches to fetching env var values with `strategy`, starting or
+        stopping a shell coprocess as needed.
+
+        NOTE: Lookups already going through the previous chain can still be
+        using its shell coprocess, so it only gets stopped once they have
+        finished, after the new chain has been swapped in.
+        """
+        previous_coprocess: Optional[env_var.ShellCoprocess] = self._coprocess
+        self._strategy = strategy
+        self._coprocess = (
+            env_var.ShellCoprocess(self._shell_command)
+            if strategy == config.STRATEGY_COPROCESS
+            else None
+        )
+        self._chain = self._build_chain()
+        if previous_coprocess:
+            previous_coprocess.retire()
+
+    def restart(self) -> None:
+        """
+        Restarts any shell coprocess, and asks any resolver daemon to drop its
+        values, so they pick up shell config changes.
+        """
+        if self._coprocess:
+            self._coprocess.restart()
+        if self._daemon_client:
+            try:
+                self._daemon_client.reload()
+            except (OSError, ValueError):
+                # NOTE: The daemon is not running, so values are being
+                # resolved in-process instead.
+                pass
+
+    def close(self) -> None:
+        """
+        Stops any running shell coprocess.
+        """
+        if self._coprocess:
+            self._coprocess.close()
+
+    def _build_chain(self) -> env_var.ResolverChain:
+        """
+        Builds the chain of backends that env var names get looked up in, in
+        the configured order.
+
+        NOTE: With the snapshot strategy, every value the shell has is
+        already in memory, so the shell is never asked for anything else.
+        """
+        shell_backend: Callable[[list[str]], dict[str, str]] = (
+            env_var.shell_backend(
+                self._shell_command,
+                self._coprocess.run_script if self._coprocess else None
+            )
+        )
+        backends: dict[str, Callable[[list[str]], dict[str, str]]] = {
+            config.RESOLVER_ENVIRON: env_var.environ_backend,
+            config.RESOLVER_DOTENV: env_var.dotenv_backend(
+                Path(self._settings.dotenv_file)
+            ),
+            config.RESOLVER_SHELL: (
+                daemon.daemon_backend(self._daemon_client, shell_backend)
+                if self._daemon_client
+                else shell_backend
+            )
+        }
+
+        return env_var.ResolverChain([
+            backends[resolver]
+            for resolver in self._settings.resolvers
+            if not (
+                resolver == config.RESOLVER_SHELL
+                and self._strategy == config.STRATEGY_SNAPSHOT
+            )
+        ])
@@ -0,0 +1,12 @@
+"""
+# Watcher
+
+A package dealing with:
+    - watching files for changes in the background
+"""
+
+__all__ = [
+    "FileWatcher"
+]
+
+from .file_watcher import FileWatcher
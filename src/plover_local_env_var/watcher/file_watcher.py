@@ -0,0 +1,150 @@
+"""
+File Watcher - a module for watching files for changes on a background
+thread, using inotify where it is available, and polling otherwise.
+"""
+
+import os
+from pathlib import Path
+import threading
+from typing import (
+    Callable,
+    Iterable,
+    Optional
+)
+
+from .. import env_var
+from . import inotify
+
+
+_DEFAULT_POLL_INTERVAL: float = 2.0
+_STOP_CHECK_INTERVAL: float = 0.5
+# NOTE: Editors often save a file with a burst of writes and renames, so
+# changes are only reported once they have settled.
+_SETTLE_DELAY: float = 0.2
+
+class FileWatcher:
+    """
+    Calls `on_change` with the paths of any watched files that get created,
+    modified, replaced or deleted.
+    """
+
+    _filepaths: set[str]
+    _inotify: Optional[inotify.Inotify]
+    _on_change: Callable[[list[str]], None]
+    _poll_interval: float
+    _stopped: threading.Event
+    _thread: Optional[threading.Thread]
+
+    def __init__(
+        self,
+        filepaths: Iterable[Path],
+        on_change: Callable[[list[str]], None],
+        poll_interval: float = _DEFAULT_POLL_INTERVAL,
+        use_inotify: bool = True
+    ) -> None:
+        self._filepaths = {
+            str(filepath.expanduser()) for filepath in filepaths
+        }
+        self._on_change = on_change
+        self._poll_interval = poll_interval
+        self._inotify = inotify.create() if use_inotify else None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def uses_inotify(self) -> bool:
+        """
+        Returns whether changes are detected with inotify, rather than by
+        polling.
+        """
+        return self._inotify is not None
+
+    def start(self) -> None:
+        """
+        Starts watching files on a background thread.
+        """
+        # NOTE: Take the initial fingerprint before starting the thread, so
+        # changes made straight after starting do not get missed.
+        fingerprint: dict[str, Optional[tuple[int, int]]] = (
+            env_var.fingerprint(self._paths())
+        )
+        target: Callable[..., None] = self._poll
+        args: tuple[dict[str, Optional[tuple[int, int]]], ...] = (fingerprint,)
+        if self._inotify:
+            try:
+                for directory in {
+                    os.path.dirname(filepath) for filepath in self._filepaths
+                }:
+                    if os.path.isdir(directory):
+                        self._inotify.add_watch(directory)
+                target = self._watch
+                args = ()
+            except OSError:
+                self._inotify.close()
+                self._inotify = None
+
+        self._thread = threading.Thread(
+            target=target,
+            args=args,
+            name="plover-local-env-var-watcher",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops watching files.
+        """
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def _watch(self) -> None:
+        assert self._inotify is not None
+        while not self._stopped.is_set():
+            changed_filepaths: set[str] = self._watched(
+                self._inotify.read(_STOP_CHECK_INTERVAL)
+            )
+            if not changed_filepaths:
+                continue
+
+            while not self._stopped.wait(_SETTLE_DELAY):
+                settling_filepaths: list[str] = self._inotify.read(0)
+                if not settling_filepaths:
+                    break
+                changed_filepaths |= self._watched(settling_filepaths)
+
+            if not self._stopped.is_set():
+                self._on_change(sorted(changed_filepaths))
+
+    def _poll(
+        self,
+        fingerprint: dict[str, Optional[tuple[int, int]]]
+    ) -> None:
+        while not self._stopped.wait(self._poll_interval):
+            current_fingerprint: dict[str, Optional[tuple[int, int]]] = (
+                env_var.fingerprint(self._paths())
+            )
+            changed_filepaths: list[str] = sorted(
+                filepath
+                for (filepath, file_fingerprint) in current_fingerprint.items()
+                if fingerprint.get(filepath) != file_fingerprint
+            )
+            fingerprint = current_fingerprint
+
+            if changed_filepaths:
+                self._on_change(changed_filepaths)
+
+    def _paths(self) -> list[Path]:
+        return [Path(filepath) for filepath in self._filepaths]
+
+    def _watched(self, filepaths: Iterable[str]) -> set[str]:
+        return {
+            filepath
+            for filepath in filepaths
+            if filepath in self._filepaths
+        }
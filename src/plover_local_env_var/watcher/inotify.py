@@ -0,0 +1,119 @@
+"""
+Inotify - a module for watching directories for changes with the Linux
+inotify API.
+
+    - https://man7.org/linux/man-pages/man7/inotify.7.html
+"""
+
+import ctypes
+import ctypes.util
+import os
+import platform
+import select
+import struct
+from typing import Optional
+
+
+# REF: /usr/include/linux/inotify.h
+_IN_MODIFY: int = 0x00000002
+_IN_CLOSE_WRITE: int = 0x00000008
+_IN_MOVED_TO: int = 0x00000080
+_IN_CREATE: int = 0x00000100
+_IN_DELETE: int = 0x00000200
+_IN_NONBLOCK: int = 0o4000
+_IN_CLOEXEC: int = 0o2000000
+_WATCH_MASK: int = (
+    _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+)
+_EVENT_HEADER: struct.Struct = struct.Struct("iIII")
+_READ_SIZE: int = 64 * 1024
+
+class Inotify:
+    """
+    A minimal inotify instance that reports the names of files changed in
+    watched directories.
+    """
+
+    _directories: dict[int, str]
+    _file_descriptor: int
+    _libc: ctypes.CDLL
+
+    def __init__(self, libc: ctypes.CDLL) -> None:
+        self._libc = libc
+        self._directories = {}
+        self._file_descriptor = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+
+        if self._file_descriptor < 0:
+            raise OSError(ctypes.get_errno(), "Unable to initialise inotify")
+
+    def add_watch(self, directory: str) -> None:
+        """
+        Watches a directory for changes to the files in it.
+        """
+        watch_descriptor: int = self._libc.inotify_add_watch(
+            self._file_descriptor,
+            os.fsencode(directory),
+            _WATCH_MASK
+        )
+
+        if watch_descriptor < 0:
+            raise OSError(ctypes.get_errno(), f"Unable to watch {directory}")
+
+        self._directories[watch_descriptor] = directory
+
+    def read(self, timeout: float) -> list[str]:
+        """
+        Waits up to `timeout` seconds for changes, returning the paths of any
+        files that changed.
+        """
+        readable, _writable, _errored = select.select(
+            [self._file_descriptor], [], [], timeout
+        )
+        if not readable:
+            return []
+
+        try:
+            data: bytes = os.read(self._file_descriptor, _READ_SIZE)
+        except BlockingIOError:
+            return []
+
+        changed_filepaths: list[str] = []
+        offset: int = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            watch_descriptor, _mask, _cookie, name_length = (
+                _EVENT_HEADER.unpack_from(data, offset)
+            )
+            offset += _EVENT_HEADER.size
+            name: str = os.fsdecode(
+                data[offset:offset + name_length].rstrip(b"\0")
+            )
+            offset += name_length
+            directory: Optional[str] = self._directories.get(watch_descriptor)
+
+            if directory and name:
+                changed_filepaths.append(os.path.join(directory, name))
+
+        return changed_filepaths
+
+    def close(self) -> None:
+        """
+        Stops watching all directories.
+        """
+        os.close(self._file_descriptor)
+
+def create() -> Optional[Inotify]:
+    """
+    Returns an inotify instance, or None if inotify is not available on this
+    platform.
+    """
+    if platform.system() != "Linux":
+        return None
+
+    try:
+        libc: ctypes.CDLL = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6",
+            use_errno=True
+        )
+        return Inotify(libc)
+    except (OSError, AttributeError):
+        return None
@@ -0,0 +1,270 @@
+import threading
+
+from plover_local_env_var import cache
+
+
+def test_lookups_wait_for_in_flight_load():
+    release = threading.Event()
+
+    def loader():
+        release.wait()
+        return {"$FOO": "Bar"}
+
+    value_cache = cache.ValueCache()
+    value_cache.load(loader)
+    results = []
+    lookup = threading.Thread(
+        target=lambda: results.append(value_cache.get("$FOO"))
+    )
+    lookup.start()
+
+    assert not value_cache.wait(timeout=0.05)
+    assert results == []
+
+    release.set()
+    lookup.join(timeout=1)
+
+    assert results == ["Bar"]
+
+def test_failed_load_leaves_cache_empty_and_reports_error():
+    errors = []
+
+    def loader():
+        raise ValueError("Unable to decode file contents as JSON")
+
+    value_cache = cache.ValueCache()
+    value_cache.load(loader, errors.append).join(timeout=1)
+
+    assert value_cache.get("$FOO") is None
+    assert [str(error) for error in errors] == [
+        "Unable to decode file contents as JSON"
+    ]
+
+def test_failed_load_keeps_values_already_cached():
+    errors = []
+    value_cache = cache.ValueCache()
+
+    def loader():
+        value_cache.update({"$FOO": "Bar"})
+        raise ValueError("Shell timed out after 1.0s")
+
+    value_cache.load(loader, errors.append).join(timeout=1)
+
+    assert value_cache.get("$FOO") == "Bar"
+    assert [str(error) for error in errors] == ["Shell timed out after 1.0s"]
+
+def test_set_and_names():
+    value_cache = cache.ValueCache()
+    value_cache.update({"$FOO": "Bar"})
+    value_cache.set("$BAZ", "Quux")
+
+    assert value_cache.get("$BAZ") == "Quux"
+    assert value_cache.names() == ["$BAZ", "$FOO"]
+
+def test_reload_keeps_serving_old_values_until_swap():
+    release = threading.Event()
+
+    def loader():
+        release.wait()
+        return {"$FOO": "New"}
+
+    value_cache = cache.ValueCache()
+    value_cache.load(lambda: {"$FOO": "Old"}).join(timeout=1)
+    reload = value_cache.reload(loader)
+
+    assert value_cache.get("$FOO") == "Old"
+
+    release.set()
+    reload.join(timeout=1)
+
+    assert value_cache.get("$FOO") == "New"
+
+def test_reloads_in_flight_collapse_into_one_follow_up():
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(len(calls))
+        release.wait()
+        return {"$FOO": f"Load {len(calls)}"}
+
+    value_cache = cache.ValueCache()
+    reload = value_cache.reload(loader)
+
+    assert value_cache.reload(loader) is None
+    assert value_cache.reload(loader) is None
+    assert value_cache.reload(loader) is None
+
+    release.set()
+    reload.join(timeout=1)
+
+    assert len(calls) == 2
+    assert value_cache.get("$FOO") == "Load 2"
+
+def test_failed_reload_keeps_old_values():
+    errors = []
+
+    def loader():
+        raise ValueError("Shell went away")
+
+    value_cache = cache.ValueCache()
+    value_cache.load(lambda: {"$FOO": "Old"}).join(timeout=1)
+    value_cache.reload(loader, errors.append).join(timeout=1)
+
+    assert value_cache.get("$FOO") == "Old"
+    assert len(errors) == 1
+
+def test_concurrent_misses_share_a_single_fetch():
+    release = threading.Event()
+    fetches = []
+
+    def fetcher(name):
+        fetches.append(name)
+        release.wait()
+        return "Bar"
+
+    value_cache = cache.ValueCache()
+    results = []
+    lookups = [
+        threading.Thread(
+            target=lambda: results.append(
+                value_cache.get_or_fetch("$FOO", fetcher)
+            )
+        )
+        for _lookup in range(10)
+    ]
+    for lookup in lookups:
+        lookup.start()
+    release.set()
+    for lookup in lookups:
+        lookup.join(timeout=1)
+
+    assert fetches == ["$FOO"]
+    assert results == ["Bar"] * 10
+    assert value_cache.get("$FOO") == "Bar"
+
+def test_fetch_errors_are_raised_for_all_waiting_lookups():
+    release = threading.Event()
+    fetches = []
+
+    def fetcher(name):
+        fetches.append(name)
+        release.wait()
+        raise ValueError(f"No value found for env var: {name}")
+
+    def lookup():
+        try:
+            value_cache.get_or_fetch("$FOO", fetcher)
+        except ValueError as exc:
+            errors.append(str(exc))
+
+    value_cache = cache.ValueCache()
+    errors = []
+    lookups = [threading.Thread(target=lookup) for _lookup in range(5)]
+    for thread in lookups:
+        thread.start()
+    release.set()
+    for thread in lookups:
+        thread.join(timeout=1)
+
+    assert fetches == ["$FOO"]
+    assert errors == ["No value found for env var: $FOO"] * 5
+    assert value_cache.get("$FOO") is None
+
+def test_values_fetched_during_reload_are_kept():
+    release = threading.Event()
+
+    def loader():
+        release.wait()
+        return {"$FOO": "New"}
+
+    value_cache = cache.ValueCache()
+    value_cache.load(lambda: {"$FOO": "Old"}).join(timeout=1)
+    reload = value_cache.reload(loader)
+    value_cache.get_or_fetch("$BAR", lambda _name: "Fetched")
+    release.set()
+    reload.join(timeout=1)
+
+    assert value_cache.get("$FOO") == "New"
+    assert value_cache.get("$BAR") == "Fetched"
+
+def _hammer(value_cache, names, fetcher, on_lookup=None):
+    errors = []
+
+    def lookups(offset):
+        try:
+            for index in range(500):
+                name = names[(index + offset) % len(names)]
+                assert value_cache.get_or_fetch(name, fetcher) == name.lower()
+                if on_lookup:
+                    on_lookup(index)
+        except Exception as exc: # pylint: disable=broad-exception-caught
+            errors.append(exc)
+
+    threads = [
+        threading.Thread(target=lookups, args=(offset,))
+        for offset in range(16)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    return errors
+
+def test_stress_concurrent_misses_fetch_each_name_once():
+    fetch_counts = {}
+    fetch_counts_lock = threading.Lock()
+    names = [f"$VAR_{index}" for index in range(50)]
+
+    def fetcher(name):
+        with fetch_counts_lock:
+            fetch_counts[name] = fetch_counts.get(name, 0) + 1
+        return name.lower()
+
+    value_cache = cache.ValueCache()
+
+    assert _hammer(value_cache, names, fetcher) == []
+    assert fetch_counts == {name: 1 for name in names}
+
+def test_stress_reloads_never_expose_missing_values():
+    loaded_names = [f"$LOADED_{index}" for index in range(10)]
+    fetched_names = [f"$FETCHED_{index}" for index in range(40)]
+    fetches = []
+
+    def fetcher(name):
+        fetches.append(name)
+        return name.lower()
+
+    def loader():
+        return {name: name.lower() for name in loaded_names}
+
+    value_cache = cache.ValueCache()
+    value_cache.load(loader).join(timeout=1)
+    errors = _hammer(
+        value_cache,
+        loaded_names + fetched_names,
+        fetcher,
+        lambda index: index % 50 == 0 and value_cache.reload(loader)
+    )
+
+    assert errors == []
+    assert not set(fetches) & set(loaded_names)
+
+def test_values_cached_during_load_are_served_without_waiting():
+    release = threading.Event()
+    value_cache = cache.ValueCache()
+
+    def loader():
+        value_cache.update({"$FOO": "Bar"})
+        release.wait()
+        return {"$FOO": "Bar", "$BAZ": "Quux"}
+
+    value_cache.load(loader)
+
+    assert value_cache.get_or_fetch("$FOO", lambda name: "Fetched") == "Bar"
+    assert not value_cache.wait(timeout=0.01)
+
+    release.set()
+
+    assert value_cache.get("$BAZ") == "Quux"
@@ -0,0 +1,68 @@
+import os
+import stat
+
+from plover_local_env_var import cache
+
+
+def test_values_are_served_for_the_same_key(tmp_path):
+    disk_cache = cache.DiskCache(tmp_path / "values.json")
+    key = cache.DiskCache.key("settings", {"~/.bashrc": [1, 2]})
+
+    assert disk_cache.load(key) is None
+
+    disk_cache.save(key, {"$FOO": "Bar"})
+
+    assert disk_cache.load(key) == {"$FOO": "Bar"}
+    assert cache.DiskCache(tmp_path / "values.json").load(key) == {
+        "$FOO": "Bar"
+    }
+
+def test_values_are_not_served_for_a_different_key(tmp_path):
+    disk_cache = cache.DiskCache(tmp_path / "values.json")
+    disk_cache.save(cache.DiskCache.key({"~/.bashrc": [1, 2]}), {"$FOO": "Bar"})
+
+    assert disk_cache.load(cache.DiskCache.key({"~/.bashrc": [3, 2]})) is None
+
+def test_values_file_is_owner_only(tmp_path):
+    filepath = tmp_path / "values.json"
+    filepath.write_text("{}", encoding="utf-8")
+    os.chmod(filepath, 0o644)
+
+    cache.DiskCache(filepath).save("key", {"$FOO": "Bar"})
+
+    assert stat.S_IMODE(filepath.stat().st_mode) == 0o600
+    assert [path.name for path in tmp_path.iterdir()] == ["values.json"]
+
+def test_stale_values_are_replaced(tmp_path):
+    disk_cache = cache.DiskCache(tmp_path / "values.json")
+    disk_cache.save("old", {"$FOO": "Bar"})
+
+    disk_cache.save("new", {"$FOO": "Baz"})
+
+    assert disk_cache.load("old") is None
+    assert disk_cache.load("new") == {"$FOO": "Baz"}
+
+def test_unreadable_values_file(tmp_path):
+    filepath = tmp_path / "values.json"
+    filepath.write_text("not json", encoding="utf-8")
+
+    assert cache.DiskCache(filepath).load("key") is None
+
+def test_clearing_values(tmp_path):
+    filepath = tmp_path / "values.json"
+    disk_cache = cache.DiskCache(filepath)
+    disk_cache.save("key", {"$FOO": "Bar"})
+
+    disk_cache.clear()
+    disk_cache.clear()
+
+    assert not filepath.exists()
+
+def test_value_cache_items():
+    value_cache = cache.ValueCache()
+    value_cache.update({"$FOO": "Bar"})
+
+    items = value_cache.items()
+    items["$BAZ"] = "Quux"
+
+    assert value_cache.items() == {"$FOO": "Bar"}
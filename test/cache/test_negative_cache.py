@@ -0,0 +1,87 @@
+import pytest
+
+from plover_local_env_var import (
+    cache,
+    env_var,
+    metrics
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_failed_name_is_not_retried_until_ttl_passes():
+    clock = _Clock()
+    negative_cache = cache.NegativeCache(ttl=5, max_ttl=60, clock=clock)
+    negative_cache.record("$FOO", "No value found for env var: $FOO")
+
+    assert negative_cache.get("$FOO") == "No value found for env var: $FOO"
+    assert negative_cache.get("$BAR") is None
+
+    clock.now = 5
+
+    assert negative_cache.get("$FOO") is None
+
+def test_repeated_failures_back_off_exponentially_up_to_max_ttl():
+    clock = _Clock()
+    negative_cache = cache.NegativeCache(ttl=5, max_ttl=12, clock=clock)
+    retry_waits = []
+
+    for _failure in range(4):
+        negative_cache.record("$FOO", "No value found for env var: $FOO")
+        start = clock.now
+        while negative_cache.get("$FOO"):
+            clock.now += 1
+        retry_waits.append(clock.now - start)
+
+    assert retry_waits == [5, 10, 12, 12]
+
+def test_discard_and_clear_forget_failures():
+    negative_cache = cache.NegativeCache(ttl=5, max_ttl=60)
+    negative_cache.record("$FOO", "No value found for env var: $FOO")
+    negative_cache.record("$BAR", "No value found for env var: $BAR")
+
+    negative_cache.discard("$FOO")
+
+    assert negative_cache.get("$FOO") is None
+    assert negative_cache.get("$BAR") is not None
+
+    negative_cache.clear()
+
+    assert negative_cache.get("$BAR") is None
+
+def test_zero_ttl_disables_negative_cache():
+    negative_cache = cache.NegativeCache(ttl=0, max_ttl=60)
+    negative_cache.record("$FOO", "No value found for env var: $FOO")
+
+    assert negative_cache.get("$FOO") is None
+
+def test_fetch_remembers_names_with_no_value(mocker):
+    negative_cache = cache.NegativeCache(ttl=5, max_ttl=60)
+    fetcher = mocker.Mock(
+        side_effect=env_var.NoValueError("No value found for env var: $FOO")
+    )
+
+    for _lookup in range(2):
+        with pytest.raises(env_var.NoValueError, match="No value found"):
+            negative_cache.get_or_fetch("$FOO", fetcher)
+
+    fetcher.assert_called_once_with("$FOO")
+    assert metrics.METRICS.snapshot()["counters"]["negative_hits"] == 1
+
+def test_fetch_does_not_remember_shell_timeouts(mocker):
+    negative_cache = cache.NegativeCache(ttl=5, max_ttl=60)
+    fetcher = mocker.Mock(
+        side_effect=[ValueError("Shell timed out after 1.0s"), "Bar"]
+    )
+
+    with pytest.raises(ValueError, match="Shell timed out"):
+        negative_cache.get_or_fetch("$FOO", fetcher)
+
+    assert negative_cache.get("$FOO") is None
+    assert negative_cache.get_or_fetch("$FOO", fetcher) == "Bar"
+    assert fetcher.call_count == 2
@@ -0,0 +1,34 @@
+from plover_local_env_var import cache
+
+
+def test_transformed_values_are_reused_while_value_unchanged():
+    transforms = cache.TransformCache()
+    calls = []
+
+    def _transform(value, filters):
+        calls.append((value, filters))
+        return value.upper()
+
+    for value in ["bar", "bar", "baz"]:
+        assert transforms.get_or_transform(
+            "$FOO",
+            ("upper",),
+            value,
+            _transform
+        ) == value.upper()
+
+    assert calls == [("bar", ("upper",)), ("baz", ("upper",))]
+
+def test_clearing_transformed_values():
+    transforms = cache.TransformCache()
+    calls = []
+
+    def _transform(value, _filters):
+        calls.append(value)
+        return value.upper()
+
+    transforms.get_or_transform("$FOO", ("upper",), "bar", _transform)
+    transforms.clear()
+    transforms.get_or_transform("$FOO", ("upper",), "bar", _transform)
+
+    assert calls == ["bar", "bar"]
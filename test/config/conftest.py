@@ -41,5 +41,54 @@ def valid_env_var_names_windows_config_path():
         json.dump(config_data, file, indent=2)
         file.close()
 
+@pytest.fixture
+def settings_coprocess_config_path():
+    path = _path("files/settings_coprocess.json")
+    with path.open(encoding="utf-8") as file:
+        config_data = json.load(file)
+        file.close()
+
+    yield path
+
+    with path.open("w", encoding="utf-8") as file:
+        json.dump(config_data, file, indent=2)
+        file.close()
+
+@pytest.fixture
+def invalid_strategy_config_path():
+    return _path("files/invalid_strategy.json")
+
+@pytest.fixture
+def settings_shell_config_files_config_path():
+    return _path("files/settings_shell_config_files.json")
+
+@pytest.fixture
+def invalid_shell_config_files_config_path():
+    return _path("files/invalid_shell_config_files.json")
+
+@pytest.fixture
+def settings_all_config_path():
+    return _path("files/settings_all.json")
+
+@pytest.fixture
+def invalid_negative_cache_ttl_config_path():
+    return _path("files/invalid_negative_cache_ttl.json")
+
+@pytest.fixture
+def settings_resolvers_config_path():
+    return _path("files/settings_resolvers.json")
+
+@pytest.fixture
+def invalid_resolvers_config_path():
+    return _path("files/invalid_resolvers.json")
+
+@pytest.fixture
+def settings_shell_mode_config_path():
+    return _path("files/settings_shell_mode.json")
+
+@pytest.fixture
+def invalid_shell_mode_config_path():
+    return _path("files/invalid_shell_mode.json")
+
 def _path(path):
     return (Path(__file__).parent / path).resolve()
@@ -2,10 +2,22 @@ import json
 import os
 import pytest
 import subprocess
+import time
 
-from plover_local_env_var import config
+from plover_local_env_var import (
+    config,
+    env_var
+)
+from plover_local_env_var.config import loader
 
 
+def _all_found(env_var_names):
+    return env_var.BatchResult(
+        values={name: "value" for name in env_var_names},
+        failed=[],
+        errored=[]
+    )
+
 def test_bad_config(bad_config_path, bash_command):
     with pytest.raises(
         ValueError,
@@ -25,13 +37,14 @@ def test_config_with_non_array_env_var_names(
         config.load(bash_command, non_array_env_var_names_config_path)
 
 def test_expanding_existing_env_vars_on_windows(
+    batch_output,
     mock_subprocess_run,
     mocker,
     powershell_command,
     valid_env_var_names_windows_config_path
 ):
-    mock_subprocess_run(return_value="baz##quux")
-    spy = mocker.spy(subprocess, "run")
+    mock_subprocess_run(return_value=batch_output("baz", "quux"))
+    spy = mocker.spy(subprocess, "Popen")
     loaded_config = config.load(
         powershell_command,
         valid_env_var_names_windows_config_path
@@ -42,12 +55,13 @@ def test_expanding_existing_env_vars_on_windows(
         [
             "powershell",
             "-command",
-            "$ExecutionContext.InvokeCommand.ExpandString("
-            "\"$ENV:BAR##$ENV:FOO\")"
+            "[Console]::Out.Write("
+            "\"__PLOVER_LOCAL_ENV_VAR_BATCH__`0$ENV:BAR`0$ENV:FOO`0\")"
         ],
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
     )
 
     # No change to original config file
@@ -61,13 +75,14 @@ def test_expanding_existing_env_vars_on_windows(
     assert config_env_var_names == ["$ENV:BAR", "$ENV:FOO"]
 
 def test_expanding_existing_env_vars_on_mac_or_linux(
+    batch_output,
     mock_subprocess_run,
     mocker,
     bash_command,
     valid_env_var_names_mac_linux_config_path,
 ):
-    mock_subprocess_run(return_value="baz##quux")
-    spy = mocker.spy(subprocess, "run")
+    mock_subprocess_run(return_value=batch_output("baz", "quux"))
+    spy = mocker.spy(subprocess, "Popen")
     loaded_config = config.load(
         bash_command,
         valid_env_var_names_mac_linux_config_path
@@ -75,10 +90,15 @@ def test_expanding_existing_env_vars_on_mac_or_linux(
 
     assert loaded_config == {"$BAR": "baz", "$FOO": "quux"}
     spy.assert_called_once_with(
-        ["bash", "-ic", "echo $BAR##$FOO"],
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
+        [
+            "bash",
+            "-ic",
+            "printf '%s\\0' __PLOVER_LOCAL_ENV_VAR_BATCH__ \"$BAR\" \"$FOO\""
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
     )
 
     # No change to original config file
@@ -92,13 +112,14 @@ def test_expanding_existing_env_vars_on_mac_or_linux(
     assert config_env_var_names == ["$BAR", "$FOO"]
 
 def test_expanding_non_existent_env_vars_on_windows(
+    batch_output,
     mock_subprocess_run,
     mocker,
     powershell_command,
     valid_env_var_names_windows_config_path,
 ):
-    mock_subprocess_run(return_value="##")
-    spy = mocker.spy(subprocess, "run")
+    mock_subprocess_run(return_value=batch_output("", ""))
+    spy = mocker.spy(subprocess, "Popen")
     loaded_config = config.load(
         powershell_command,
         valid_env_var_names_windows_config_path
@@ -109,12 +130,13 @@ def test_expanding_non_existent_env_vars_on_windows(
         [
             "powershell",
             "-command",
-            "$ExecutionContext.InvokeCommand.ExpandString("
-            "\"$ENV:BAR##$ENV:FOO\")"
+            "[Console]::Out.Write("
+            "\"__PLOVER_LOCAL_ENV_VAR_BATCH__`0$ENV:BAR`0$ENV:FOO`0\")"
         ],
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
     )
 
     # Original config file has been blanked out
@@ -128,13 +150,14 @@ def test_expanding_non_existent_env_vars_on_windows(
     assert config_env_var_names == []
 
 def test_expanding_non_existent_env_vars_on_mac_or_linux(
+    batch_output,
     mock_subprocess_run,
     mocker,
     bash_command,
     valid_env_var_names_mac_linux_config_path,
 ):
-    mock_subprocess_run(return_value="##")
-    spy = mocker.spy(subprocess, "run")
+    mock_subprocess_run(return_value=batch_output("", ""))
+    spy = mocker.spy(subprocess, "Popen")
     loaded_config = config.load(
         bash_command,
         valid_env_var_names_mac_linux_config_path
@@ -142,10 +165,15 @@ def test_expanding_non_existent_env_vars_on_mac_or_linux(
 
     assert loaded_config == {}
     spy.assert_called_once_with(
-        ["bash", "-ic", "echo $BAR##$FOO"],
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
+        [
+            "bash",
+            "-ic",
+            "printf '%s\\0' __PLOVER_LOCAL_ENV_VAR_BATCH__ \"$BAR\" \"$FOO\""
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
     )
 
     # Original config file has been blanked out
@@ -159,13 +187,14 @@ def test_expanding_non_existent_env_vars_on_mac_or_linux(
     assert config_env_var_names == []
 
 def test_expanding_some_existing_env_vars_on_windows(
+    batch_output,
     mock_subprocess_run,
     mocker,
     powershell_command,
     valid_env_var_names_windows_config_path,
 ):
-    mock_subprocess_run(return_value="baz##")
-    spy = mocker.spy(subprocess, "run")
+    mock_subprocess_run(return_value=batch_output("baz", ""))
+    spy = mocker.spy(subprocess, "Popen")
     loaded_config = config.load(
         powershell_command,
         valid_env_var_names_windows_config_path
@@ -176,12 +205,13 @@ def test_expanding_some_existing_env_vars_on_windows(
         [
             "powershell",
             "-command",
-            "$ExecutionContext.InvokeCommand.ExpandString("
-            "\"$ENV:BAR##$ENV:FOO\")"
+            "[Console]::Out.Write("
+            "\"__PLOVER_LOCAL_ENV_VAR_BATCH__`0$ENV:BAR`0$ENV:FOO`0\")"
         ],
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
     )
 
     # Original config file has had null variable BAR removed from it
@@ -195,13 +225,14 @@ def test_expanding_some_existing_env_vars_on_windows(
     assert config_env_var_names == ["$ENV:BAR"]
 
 def test_expanding_some_existing_env_vars_on_mac_or_linux(
+    batch_output,
     mock_subprocess_run,
     mocker,
     bash_command,
     valid_env_var_names_mac_linux_config_path,
 ):
-    mock_subprocess_run(return_value="##baz")
-    spy = mocker.spy(subprocess, "run")
+    mock_subprocess_run(return_value=batch_output("", "baz"))
+    spy = mocker.spy(subprocess, "Popen")
     loaded_config = config.load(
         bash_command,
         valid_env_var_names_mac_linux_config_path
@@ -209,10 +240,15 @@ def test_expanding_some_existing_env_vars_on_mac_or_linux(
 
     assert loaded_config == {"$FOO": "baz"}
     spy.assert_called_once_with(
-        ["bash", "-ic", "echo $BAR##$FOO"],
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
+        [
+            "bash",
+            "-ic",
+            "printf '%s\\0' __PLOVER_LOCAL_ENV_VAR_BATCH__ \"$BAR\" \"$FOO\""
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
     )
 
     # Original config file has had null variable BAR removed from it
@@ -224,3 +260,338 @@ def test_expanding_some_existing_env_vars_on_mac_or_linux(
     config_env_var_names = data.get("env_var_names", [])
 
     assert config_env_var_names == ["$FOO"]
+
+def test_default_settings(non_existent_config_path):
+    settings = config.load_settings(non_existent_config_path)
+
+    assert settings.strategy == config.STRATEGY_SUBPROCESS
+    assert settings.shell_config_files == ()
+    assert settings.resolvers == (config.RESOLVER_SHELL,)
+    assert settings.shell_mode == "interactive"
+
+def test_coprocess_strategy_setting(settings_coprocess_config_path):
+    settings = config.load_settings(settings_coprocess_config_path)
+
+    assert settings.strategy == config.STRATEGY_COPROCESS
+
+def test_auto_strategy_setting(tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+    config_path.write_text(json.dumps({"strategy": "auto"}), encoding="utf-8")
+
+    assert config.load_settings(config_path).strategy == config.STRATEGY_AUTO
+
+def test_invalid_strategy_setting(invalid_strategy_config_path):
+    with pytest.raises(ValueError, match="'strategy' must be one of"):
+        config.load_settings(invalid_strategy_config_path)
+
+def test_shell_config_files_setting(settings_shell_config_files_config_path):
+    settings = config.load_settings(settings_shell_config_files_config_path)
+
+    assert settings.shell_config_files == ("~/.secrets",)
+
+def test_invalid_shell_config_files_setting(
+    invalid_shell_config_files_config_path
+):
+    with pytest.raises(
+        ValueError,
+        match="'shell_config_files' must be a list of strings"
+    ):
+        config.load_settings(invalid_shell_config_files_config_path)
+
+def test_settings(settings_all_config_path):
+    settings = config.load_settings(settings_all_config_path)
+
+    assert settings.watch is True
+    assert settings.negative_cache_ttl == 0.5
+    assert settings.negative_cache_max_ttl == 60.0
+    assert settings.shell_timeout == 2.5
+    assert settings.circuit_breaker_threshold == 5
+    assert settings.circuit_breaker_cool_down == 120.0
+    assert settings.use_daemon is True
+    assert settings.idle_after_days == 90.0
+    assert settings.trace_sample_rate == 0.25
+
+def test_invalid_negative_cache_ttl_setting(
+    invalid_negative_cache_ttl_config_path
+):
+    with pytest.raises(
+        ValueError,
+        match="'negative_cache_ttl' must be a non-negative number of seconds"
+    ):
+        config.load_settings(invalid_negative_cache_ttl_config_path)
+
+def test_resolvers_setting(settings_resolvers_config_path):
+    settings = config.load_settings(settings_resolvers_config_path)
+
+    assert settings.resolvers == (
+        config.RESOLVER_ENVIRON,
+        config.RESOLVER_DOTENV,
+        config.RESOLVER_SHELL
+    )
+    assert settings.dotenv_file == "~/.plover.env"
+
+def test_invalid_trace_sample_rate_setting(tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+    config_path.write_text(
+        json.dumps({"trace_sample_rate": 1.5}),
+        encoding="utf-8"
+    )
+
+    with pytest.raises(
+        ValueError,
+        match="'trace_sample_rate' must be a number from 0 to 1"
+    ):
+        config.load_settings(config_path)
+
+def test_invalid_resolvers_setting(invalid_resolvers_config_path):
+    with pytest.raises(ValueError, match="'resolvers' must be a non-empty"):
+        config.load_settings(invalid_resolvers_config_path)
+
+def test_shell_mode_setting(settings_shell_mode_config_path):
+    settings = config.load_settings(settings_shell_mode_config_path)
+
+    assert settings.shell_mode == "source"
+    assert settings.shell_source_file == "~/.env_vars"
+
+def test_source_shell_mode_needs_source_file(invalid_shell_mode_config_path):
+    with pytest.raises(ValueError, match="'shell_source_file' must be set"):
+        config.load_settings(invalid_shell_mode_config_path)
+
+def test_expanding_env_vars_with_an_expander(
+    valid_env_var_names_mac_linux_config_path,
+    bash_command
+):
+    env_vars = config.load(
+        bash_command,
+        valid_env_var_names_mac_linux_config_path,
+        lambda env_var_names: env_var.BatchResult(
+            values={name: "value" for name in env_var_names[:1]},
+            failed=env_var_names[1:],
+            errored=[]
+        )
+    )
+
+    assert env_vars == {"$BAR": "value"}
+
+def test_saving_env_var_names_keeps_settings(settings_coprocess_config_path):
+    config.save(settings_coprocess_config_path, ["$BAR", "$FOO"])
+
+    with settings_coprocess_config_path.open(encoding="utf-8") as file:
+        data = json.load(file)
+        file.close()
+
+    assert data["env_var_names"] == ["$BAR", "$FOO"]
+    assert data["strategy"] == "coprocess"
+
+def test_flat_config_gets_usage_recorded_on_load(tmp_path, bash_command):
+    config_path = tmp_path / "local_env_var.json"
+    config_path.write_text(
+        json.dumps({"env_var_names": ["$BAR", "$FOO"]}),
+        encoding="utf-8"
+    )
+
+    env_vars = config.load(
+        bash_command,
+        config_path,
+        _all_found
+    )
+
+    with config_path.open(encoding="utf-8") as file:
+        data = json.load(file)
+        file.close()
+
+    assert env_vars == {"$BAR": "value", "$FOO": "value"}
+    assert data["version"] == 2
+    assert data["env_var_names"] == ["$BAR", "$FOO"]
+    assert {usage["hits"] for usage in data["usage"].values()} == {0}
+
+def test_most_used_env_vars_are_expanded_first(tmp_path, bash_command):
+    config_path = tmp_path / "local_env_var.json"
+    now = time.time()
+    config_path.write_text(
+        json.dumps({
+            "version": 2,
+            "env_var_names": ["$BAR", "$BAZ", "$FOO"],
+            "usage": {
+                "$BAR": {"hits": 1, "last_used": now},
+                "$BAZ": {"hits": 1, "last_used": now - 10},
+                "$FOO": {"hits": 5, "last_used": now - 20}
+            }
+        }),
+        encoding="utf-8"
+    )
+    expanded = []
+
+    def _expander(env_var_names):
+        expanded.append(env_var_names)
+        return _all_found(env_var_names)
+
+    config.load(bash_command, config_path, _expander)
+
+    assert expanded == [["$FOO", "$BAR", "$BAZ"]]
+
+def test_idle_env_vars_are_not_expanded_or_removed(tmp_path, bash_command):
+    config_path = tmp_path / "local_env_var.json"
+    now = time.time()
+    config_path.write_text(
+        json.dumps({
+            "version": 2,
+            "env_var_names": ["$BAR", "$FOO"],
+            "usage": {
+                "$BAR": {"hits": 9, "last_used": now - 100},
+                "$FOO": {"hits": 1, "last_used": now}
+            }
+        }),
+        encoding="utf-8"
+    )
+
+    env_vars = config.load(
+        bash_command,
+        config_path,
+        _all_found,
+        idle_after=50
+    )
+
+    assert env_vars == {"$FOO": "value"}
+    assert config.load_env_var_names(config_path) == ["$BAR", "$FOO"]
+    assert config.load_idle_env_var_names(config_path, 50) == ["$BAR"]
+    assert config.load_idle_env_var_names(config_path, 0) == []
+
+def test_hot_env_var_values_are_available_first(
+    tmp_path,
+    bash_command,
+    monkeypatch
+):
+    monkeypatch.setattr(loader, "_HOT_BATCH_SIZE", 1)
+    config_path = tmp_path / "local_env_var.json"
+    config_path.write_text(
+        json.dumps({
+            "version": 2,
+            "env_var_names": ["$BAR", "$FOO"],
+            "usage": {
+                "$BAR": {"hits": 1, "last_used": 1},
+                "$FOO": {"hits": 2, "last_used": 1}
+            }
+        }),
+        encoding="utf-8"
+    )
+    hot_values = []
+
+    env_vars = config.load(
+        bash_command,
+        config_path,
+        _all_found,
+        on_values=hot_values.append
+    )
+
+    assert hot_values == [{"$FOO": "value"}]
+    assert env_vars == {"$BAR": "value", "$FOO": "value"}
+
+def test_env_vars_in_a_failed_cold_batch_are_kept(
+    tmp_path,
+    bash_command,
+    monkeypatch
+):
+    monkeypatch.setattr(loader, "_HOT_BATCH_SIZE", 1)
+    config_path = tmp_path / "local_env_var.json"
+    config.save(config_path, ["$BAR", "$FOO"], {"$FOO": config.Usage(2, 1)})
+    hot_values = []
+
+    def _expander(env_var_names):
+        if env_var_names == ["$BAR"]:
+            raise ValueError("Shell timed out after 1.0s")
+        return _all_found(env_var_names)
+
+    env_vars = config.load(
+        bash_command,
+        config_path,
+        _expander,
+        on_values=hot_values.append
+    )
+
+    assert hot_values == [{"$FOO": "value"}]
+    assert env_vars == {"$FOO": "value"}
+    assert config.load_env_var_names(config_path) == ["$BAR", "$FOO"]
+
+def test_env_vars_whose_shell_errored_are_kept(tmp_path, bash_command):
+    config_path = tmp_path / "local_env_var.json"
+    config.save(config_path, ["$BAR", "$BAZ", "$FOO"])
+
+    env_vars = config.load(
+        bash_command,
+        config_path,
+        lambda env_var_names: env_var.BatchResult(
+            values={"$FOO": "value"},
+            failed=["$BAR"],
+            errored=["$BAZ"]
+        )
+    )
+
+    assert env_vars == {"$FOO": "value"}
+    assert config.load_env_var_names(config_path) == ["$BAZ", "$FOO"]
+
+def test_shell_timeout_does_not_remove_env_vars(
+    tmp_path,
+    mocker,
+    batch_output,
+    bash_command
+):
+    config_path = tmp_path / "local_env_var.json"
+    env_var_names = [f"$VAR_{index:03}" for index in range(450)]
+    config.save(config_path, env_var_names)
+
+    def _run_script(_shell_command, script):
+        if "$VAR_200" in script:
+            raise ValueError("Shell timed out after 10.0s")
+        return batch_output(*(["value"] * script.count("$")))
+
+    mocker.patch.object(
+        env_var.command,
+        "run_script",
+        side_effect=_run_script
+    )
+
+    env_vars = config.load(bash_command, config_path)
+
+    assert len(env_vars) == 250
+    assert config.load_env_var_names(config_path) == env_var_names
+
+def test_recording_uses_adds_to_saved_usage(tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+    config.save(config_path, ["$FOO"], {"$FOO": config.Usage(2, 100)})
+
+    config.record(
+        config_path,
+        ["$BAR"],
+        {"$FOO": config.Usage(1, 200), "$UNSAVED": config.Usage(1, 200)}
+    )
+
+    with config_path.open(encoding="utf-8") as file:
+        data = json.load(file)
+        file.close()
+
+    assert data["env_var_names"] == ["$BAR", "$FOO"]
+    assert data["usage"]["$FOO"] == {"hits": 3, "last_used": 200}
+    assert data["usage"]["$BAR"]["hits"] == 0
+    assert "$UNSAVED" not in data["usage"]
+
+def test_unknown_config_version(tmp_path, bash_command):
+    config_path = tmp_path / "local_env_var.json"
+    config_path.write_text(json.dumps({"version": 3}), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="'version' must be one of: 1, 2"):
+        config.load(bash_command, config_path)
+
+def test_invalid_usage(tmp_path, bash_command):
+    config_path = tmp_path / "local_env_var.json"
+    config_path.write_text(
+        json.dumps({
+            "version": 2,
+            "env_var_names": ["$FOO"],
+            "usage": {"$FOO": {"hits": -1}}
+        }),
+        encoding="utf-8"
+    )
+
+    with pytest.raises(ValueError, match="'usage' must map env var names"):
+        config.load(bash_command, config_path)
@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+
+from plover_local_env_var import (
+    config,
+    env_var
+)
+from plover_local_env_var.config import loader
+
+
+def _read(path):
+    with path.open(encoding="utf-8") as file:
+        data = json.load(file)
+        file.close()
+
+    return data
+
+def test_scheduled_names_are_coalesced_into_one_write(tmp_path, mocker):
+    config_path = tmp_path / "local_env_var.json"
+    spy = mocker.spy(os, "replace")
+    persister = config.ConfigPersister(config_path, delay=60)
+
+    persister.schedule(["$FOO"])
+    persister.schedule(["$BAR", "$FOO"])
+
+    assert not config_path.exists()
+
+    persister.flush()
+
+    assert _read(config_path)["env_var_names"] == ["$BAR", "$FOO"]
+    assert spy.call_count == 1
+
+def test_scheduled_names_are_written_after_delay(tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+    persister = config.ConfigPersister(config_path, delay=0.01)
+
+    persister.schedule(["$FOO"])
+    persister._timer.join(timeout=1)
+
+    assert _read(config_path)["env_var_names"] == ["$FOO"]
+
+def test_flush_with_nothing_scheduled_does_not_write(tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+    config.ConfigPersister(config_path).flush()
+
+    assert not config_path.exists()
+
+def test_unchanged_contents_are_not_rewritten(tmp_path, mocker):
+    config_path = tmp_path / "local_env_var.json"
+    config.save(config_path, ["$FOO"])
+    spy = mocker.spy(os, "replace")
+
+    config.save(config_path, ["$FOO"])
+
+    spy.assert_not_called()
+
+def test_saving_leaves_no_temporary_files(tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+    config.save(config_path, ["$FOO"])
+    config.save(config_path, ["$BAR", "$FOO"])
+
+    assert [path.name for path in tmp_path.iterdir()] == ["local_env_var.json"]
+    assert _read(config_path)["env_var_names"] == ["$BAR", "$FOO"]
+
+def test_on_save_is_called_after_writing(tmp_path, mocker):
+    config_path = tmp_path / "local_env_var.json"
+    on_save = mocker.Mock()
+    persister = config.ConfigPersister(config_path, delay=60, on_save=on_save)
+
+    persister.schedule(["$FOO"])
+    on_save.assert_not_called()
+    persister.flush()
+
+    on_save.assert_called_once_with()
+
+def test_uses_are_counted_and_saved_after_usage_delay(tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+    config.save(config_path, ["$FOO"])
+    persister = config.ConfigPersister(config_path, usage_delay=0.01)
+
+    persister.record_use("$FOO")
+    persister.record_use("$FOO")
+    persister._timer.join(timeout=1)
+
+    assert _read(config_path)["usage"]["$FOO"]["hits"] == 2
+
+def test_scheduled_names_are_added_to_saved_names(tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+    config.save(config_path, ["$FOO"])
+    persister = config.ConfigPersister(config_path, delay=60)
+
+    persister.schedule(["$BAR"])
+    persister.flush()
+
+    assert _read(config_path)["env_var_names"] == ["$BAR", "$FOO"]
+
+def test_uses_are_counted_while_writing(tmp_path, mocker):
+    config_path = tmp_path / "local_env_var.json"
+    writing = threading.Event()
+    finish_writing = threading.Event()
+
+    def _record(*_args):
+        writing.set()
+        finish_writing.wait(5)
+
+    mocker.patch.object(loader, "record", side_effect=_record)
+    persister = config.ConfigPersister(config_path, delay=60, usage_delay=60)
+    persister.schedule(["$FOO"])
+    flush = threading.Thread(target=persister.flush)
+    flush.start()
+    writing.wait(5)
+
+    recorded = threading.Thread(target=persister.record_use, args=("$FOO",))
+    recorded.start()
+    recorded.join(1)
+
+    assert not recorded.is_alive()
+
+    finish_writing.set()
+    flush.join(5)
+    persister.flush()
+
+def test_failed_write_is_reported_and_retried(tmp_path, mocker):
+    config_path = tmp_path / "local_env_var.json"
+    on_error = mocker.Mock()
+    record = mocker.patch.object(
+        loader,
+        "record",
+        side_effect=[PermissionError("Permission denied"), None]
+    )
+    persister = config.ConfigPersister(
+        config_path,
+        delay=60,
+        usage_delay=60,
+        on_error=on_error
+    )
+
+    persister.schedule(["$FOO"])
+    persister.record_use("$FOO")
+    persister.flush()
+
+    assert isinstance(on_error.call_args.args[0], PermissionError)
+
+    persister.flush()
+
+    assert record.call_count == 2
+    assert record.call_args.args[1] == ["$FOO"]
+    assert record.call_args.args[2]["$FOO"].hits == 1
+
+def test_pruning_keeps_names_saved_while_loading(tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+    config.save(config_path, ["$BAR", "$FOO"])
+    persister = config.ConfigPersister(config_path, delay=60)
+
+    def expander(names):
+        persister.schedule(["$NEW"])
+        persister.flush()
+        return env_var.BatchResult(
+            values={"$FOO": "foo"},
+            failed=["$BAR"],
+            errored=[]
+        )
+
+    values = config.load(
+        lambda _script: [],
+        config_path,
+        expander,
+        pruner=persister.prune
+    )
+
+    assert values == {"$FOO": "foo"}
+    assert _read(config_path)["env_var_names"] == ["$FOO", "$NEW"]
+
+def test_pruning_errors_are_reported(tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+    config_path.write_text("not json", encoding="utf-8")
+    errors = []
+    persister = config.ConfigPersister(config_path, on_error=errors.append)
+
+    persister.prune(["$FOO"])
+
+    assert len(errors) == 1
@@ -0,0 +1,118 @@
+from plover_local_env_var import config
+from plover_local_env_var.config import selector
+
+
+def _sh_command(prefix=""):
+    return lambda env_var: ["sh", "-c", f"{prefix}echo {env_var}"]
+
+def _measurement(strategy, setup_seconds, miss_seconds, mismatched=()):
+    return config.StrategyMeasurement(
+        strategy=strategy,
+        setup_seconds=setup_seconds,
+        miss_seconds=miss_seconds,
+        mismatched=list(mismatched),
+        error=None
+    )
+
+def test_measuring_strategies_with_exported_env_vars(monkeypatch):
+    monkeypatch.setenv("PLOVER_LOCAL_ENV_VAR_FOO", "Bar")
+    monkeypatch.setenv("PLOVER_LOCAL_ENV_VAR_SPACED", " a  b\n\nc ")
+
+    measurements = selector.measure_strategies(
+        _sh_command(),
+        ["$PLOVER_LOCAL_ENV_VAR_FOO", "$PLOVER_LOCAL_ENV_VAR_SPACED"]
+    )
+
+    assert [measurement.strategy for measurement in measurements] == [
+        config.STRATEGY_SUBPROCESS,
+        config.STRATEGY_COPROCESS,
+        config.STRATEGY_SNAPSHOT
+    ]
+    assert all(measurement.correct for measurement in measurements)
+    assert all(measurement.setup_seconds > 0 for measurement in measurements)
+
+def test_snapshot_is_incorrect_for_unexported_env_vars():
+    measurements = selector.measure_strategies(
+        _sh_command("PLOVER_LOCAL_ENV_VAR_UNEXPORTED=Bar; "),
+        ["$PLOVER_LOCAL_ENV_VAR_UNEXPORTED"]
+    )
+
+    assert [measurement.mismatched for measurement in measurements] == [
+        [],
+        [],
+        ["$PLOVER_LOCAL_ENV_VAR_UNEXPORTED"]
+    ]
+
+def test_snapshot_is_not_chosen_without_env_vars_to_check():
+    measurements = selector.measure_strategies(_sh_command(), [])
+
+    assert measurements[2].error == "No env var names to check values against"
+    assert config.choose_strategy(measurements) != config.STRATEGY_SNAPSHOT
+
+def test_choosing_cheapest_correct_strategy():
+    measurements = [
+        _measurement(config.STRATEGY_SUBPROCESS, 0.1, 0.1),
+        _measurement(config.STRATEGY_COPROCESS, 0.2, 0.001),
+        _measurement(config.STRATEGY_SNAPSHOT, 0.1, 0.0, ["$FOO"])
+    ]
+
+    assert config.choose_strategy(measurements) == config.STRATEGY_COPROCESS
+    assert config.choose_strategy(measurements[:1]) == (
+        config.STRATEGY_SUBPROCESS
+    )
+    assert config.choose_strategy(measurements[2:]) == (
+        config.STRATEGY_SUBPROCESS
+    )
+
+def test_formatting_measurements():
+    measurements = [
+        _measurement(config.STRATEGY_SUBPROCESS, 0.1, 0.05),
+        _measurement(config.STRATEGY_SNAPSHOT, 0.1, 0.0, ["$FOO"])
+    ]
+
+    assert config.format_measurements(measurements) == (
+        "subprocess (100ms setup + 50ms/miss), snapshot (differs: $FOO)"
+    )
+
+def test_selector_reuses_measurements_with_same_key(tmp_path, mocker):
+    measurements = [_measurement(config.STRATEGY_SUBPROCESS, 0.1, 0.05)]
+    measure = mocker.patch.object(
+        selector,
+        "measure_strategies",
+        return_value=measurements
+    )
+    strategy_selector = config.StrategySelector(tmp_path / "strategy.json")
+
+    assert strategy_selector.select(_sh_command(), [], "key") == measurements
+    assert strategy_selector.select(_sh_command(), [], "key") == measurements
+    assert measure.call_count == 1
+
+    strategy_selector.select(_sh_command(), [], "changed")
+    assert measure.call_count == 2
+
+def test_saved_measurements_without_measuring(tmp_path, mocker):
+    measurements = [_measurement(config.STRATEGY_COPROCESS, 0.1, 0.01)]
+    mocker.patch.object(
+        selector,
+        "measure_strategies",
+        return_value=measurements
+    )
+    strategy_selector = config.StrategySelector(tmp_path / "strategy.json")
+
+    assert strategy_selector.saved("key") is None
+
+    strategy_selector.select(_sh_command(), [], "key")
+
+    assert strategy_selector.saved("key") == measurements
+    assert strategy_selector.saved("changed") is None
+
+def test_clearing_saved_measurements(tmp_path, mocker):
+    mocker.patch.object(selector, "measure_strategies", return_value=[])
+    filepath = tmp_path / "strategy.json"
+    strategy_selector = config.StrategySelector(filepath)
+    strategy_selector.select(_sh_command(), [], "key")
+
+    strategy_selector.clear()
+    strategy_selector.clear()
+
+    assert not filepath.exists()
@@ -1,5 +1,8 @@
 import pytest
 
+from plover_local_env_var.env_var.guard import SHELL_GUARD
+from plover_local_env_var.metrics import METRICS
+
 
 @pytest.fixture
 def bash_command():
@@ -15,8 +18,17 @@ def powershell_command():
         ]
     )
 
-# NOTE: Given that the command passed in to `subprocess.run` will be different
-# between Windows and non-Windows:
+@pytest.fixture
+def batch_output():
+    def _method(*values):
+        return "__PLOVER_LOCAL_ENV_VAR_BATCH__\0" + "".join(
+            f"{value}\0" for value in values
+        )
+
+    return _method
+
+# NOTE: Given that the command passed in to `subprocess.Popen` will be
+# different between Windows and non-Windows:
 #
 # `powershell -command "$ExecutionContext.InvokeCommand.ExpandString($ENV:FOO)"`
 #
@@ -26,16 +38,26 @@ def powershell_command():
 #
 # This mock handwaves over how that command works, and what it returns, and
 # instead just gives back a the `return_value` passed in that we're reasonably
-# sure we're expecting back from `subprocess.run.stdout`.
+# sure we're expecting back from the process's stdout.
 @pytest.fixture()
 def mock_subprocess_run(mocker):
     mock = mocker.Mock()
-    mocker.patch("subprocess.run", return_value=mock)
+    mock.returncode = 0
+    mocker.patch("subprocess.Popen", return_value=mock)
 
     def _method(return_value=None):
-        # NOTE: Cannot do `mock.stdout.return_value = return_value`
-        # for properties.
-        # REF: https://docs.python.org/3.9/library/unittest.mock.html#unittest.mock.PropertyMock
-        type(mock).stdout = mocker.PropertyMock(return_value=return_value)
+        mock.communicate.return_value = (return_value, "")
 
     return _method
+
+@pytest.fixture(autouse=True)
+def reset_shell_guard():
+    yield
+
+    SHELL_GUARD.reset()
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    yield
+
+    METRICS.reset()
@@ -0,0 +1,32 @@
+from pathlib import Path
+import tempfile
+import threading
+
+import pytest
+
+from plover_local_env_var import daemon
+
+
+# NOTE: Unix domain socket paths are limited to around 100 characters, which
+# pytest's own temporary directories can exceed.
+@pytest.fixture
+def socket_path():
+    with tempfile.TemporaryDirectory(prefix="plev-") as directory:
+        yield Path(directory) / "daemon" / "resolver.sock"
+
+@pytest.fixture
+def resolver_daemon(socket_path, bash_command):
+    resolver_daemon = daemon.ResolverDaemon(bash_command, socket_path)
+    ready = threading.Event()
+    thread = threading.Thread(
+        target=resolver_daemon.serve_forever,
+        args=(ready,),
+        daemon=True
+    )
+    thread.start()
+    ready.wait(5)
+
+    yield resolver_daemon
+
+    resolver_daemon.shutdown()
+    thread.join(5)
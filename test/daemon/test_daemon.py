@@ -0,0 +1,212 @@
+import os
+import socket
+import stat
+import subprocess
+
+import pytest
+
+from plover_local_env_var import (
+    daemon,
+    env_var
+)
+
+
+def test_socket_is_only_accessible_by_its_owner(resolver_daemon, socket_path):
+    assert resolver_daemon.socket_path == socket_path
+    assert stat.S_IMODE(socket_path.parent.stat().st_mode) == 0o700
+    assert stat.S_IMODE(socket_path.stat().st_mode) == 0o600
+
+def test_client_pings_running_daemon(resolver_daemon, socket_path):
+    assert daemon.DaemonClient(socket_path).is_running()
+
+def test_client_with_no_daemon_running(socket_path):
+    client = daemon.DaemonClient(socket_path)
+
+    assert not client.is_running()
+    with pytest.raises(OSError):
+        client.resolve(["$FOO"])
+
+def test_daemon_resolves_and_caches_values(
+    resolver_daemon,
+    socket_path,
+    mock_subprocess_run,
+    batch_output,
+    mocker
+):
+    mock_subprocess_run(return_value=batch_output("Bar"))
+    spy = mocker.spy(subprocess, "Popen")
+    client = daemon.DaemonClient(socket_path)
+
+    assert client.resolve(["$FOO"]) == {
+        "values": {"$FOO": "Bar"},
+        "errors": {},
+        "errored": []
+    }
+    assert client.resolve(["$FOO"])["values"] == {"$FOO": "Bar"}
+    assert spy.call_count == 1
+
+def test_daemon_resolves_batch_with_errors(
+    resolver_daemon,
+    socket_path,
+    mock_subprocess_run,
+    batch_output
+):
+    mock_subprocess_run(return_value=batch_output("Bar", ""))
+    client = daemon.DaemonClient(socket_path)
+
+    assert client.resolve(["$FOO", "$BAZ"]) == {
+        "values": {"$FOO": "Bar"},
+        "errors": {"$BAZ": "No value found for env var: $BAZ"},
+        "errored": []
+    }
+
+def test_daemon_reload_drops_cached_values(
+    resolver_daemon,
+    socket_path,
+    mock_subprocess_run,
+    mocker
+):
+    mock_subprocess_run(return_value="Bar\n")
+    spy = mocker.spy(subprocess, "Popen")
+    client = daemon.DaemonClient(socket_path)
+
+    client.resolve(["$FOO"])
+    client.reload()
+    client.resolve(["$FOO"])
+
+    assert spy.call_count == 2
+
+def test_daemon_rejects_invalid_requests(socket_path, bash_command):
+    resolver_daemon = daemon.ResolverDaemon(bash_command, socket_path)
+
+    assert resolver_daemon.handle({"op": "resolve", "names": "$FOO"}) == {
+        "error": "Invalid request: {'op': 'resolve', 'names': '$FOO'}"
+    }
+
+def test_daemon_never_runs_shell_code_in_names(
+    resolver_daemon,
+    socket_path,
+    mocker
+):
+    spy = mocker.spy(subprocess, "Popen")
+    client = daemon.DaemonClient(socket_path)
+
+    response = client.resolve(["$X;echo pwn", "$(echo pwn)"])
+
+    assert response == {
+        "values": {},
+        "errors": {
+            "$X;echo pwn": "Provided value not an $ENV_VAR: $X;echo pwn",
+            "$(echo pwn)": "Provided value not an $ENV_VAR: $(echo pwn)"
+        },
+        "errored": []
+    }
+    spy.assert_not_called()
+
+def test_second_daemon_on_same_socket_fails(
+    resolver_daemon,
+    socket_path,
+    bash_command
+):
+    with pytest.raises(ValueError, match="already running"):
+        daemon.ResolverDaemon(bash_command, socket_path).serve_forever()
+
+def test_daemon_replaces_stale_socket(socket_path, bash_command):
+    socket_path.parent.mkdir(parents=True)
+    socket_path.touch()
+    resolver_daemon = daemon.ResolverDaemon(bash_command, socket_path)
+
+    # pylint: disable=protected-access
+    resolver_daemon._prepare_socket_path()
+
+    assert not socket_path.exists()
+
+def test_client_refuses_socket_directory_others_can_access(
+    resolver_daemon,
+    socket_path
+):
+    socket_path.parent.chmod(0o755)
+    client = daemon.DaemonClient(socket_path)
+
+    assert not client.is_running()
+    with pytest.raises(PermissionError, match="not private"):
+        client.resolve(["$FOO"])
+
+def test_client_refuses_linked_socket_directory(resolver_daemon, socket_path):
+    link = socket_path.parent.with_name("link")
+    link.symlink_to(socket_path.parent)
+
+    with pytest.raises(PermissionError, match="not private"):
+        daemon.DaemonClient(link / socket_path.name).resolve(["$FOO"])
+
+def test_daemon_refuses_socket_directory_of_another_user(
+    socket_path,
+    bash_command,
+    monkeypatch
+):
+    socket_path.parent.mkdir()
+    owner = socket_path.parent.stat().st_uid
+    monkeypatch.setattr(os, "getuid", lambda: owner + 1)
+    resolver_daemon = daemon.ResolverDaemon(bash_command, socket_path)
+
+    with pytest.raises(ValueError, match="not owned by the current user"):
+        # pylint: disable=protected-access
+        resolver_daemon._prepare_socket_path()
+
+def test_backend_falls_back_when_daemon_does_not_respond(socket_path):
+    socket_path.parent.mkdir(mode=0o700)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as hung_daemon:
+        hung_daemon.bind(str(socket_path))
+        hung_daemon.listen()
+        client = daemon.DaemonClient(socket_path, timeout=0.1, cool_down=60)
+        backend = daemon.daemon_backend(
+            client,
+            lambda env_var_names: {name: "Fallback" for name in env_var_names}
+        )
+
+        assert backend(["$FOO"]) == {"$FOO": "Fallback"}
+        with pytest.raises(OSError, match="recently timed out"):
+            client.resolve(["$FOO"])
+
+def test_backend_falls_back_when_daemon_not_running(socket_path):
+    backend = daemon.daemon_backend(
+        daemon.DaemonClient(socket_path),
+        lambda env_var_names: {name: "Fallback" for name in env_var_names}
+    )
+
+    assert backend(["$FOO"]) == {"$FOO": "Fallback"}
+
+def test_backend_raises_daemon_error_for_single_name(
+    resolver_daemon,
+    socket_path,
+    mock_subprocess_run
+):
+    mock_subprocess_run(return_value="")
+    backend = daemon.daemon_backend(
+        daemon.DaemonClient(socket_path),
+        lambda _env_var_names: pytest.fail("Fell back with daemon running")
+    )
+
+    with pytest.raises(ValueError, match="No value found for env var: \\$FOO"):
+        backend(["$FOO"])
+
+def test_backend_reports_names_the_daemon_shell_errored_on(
+    resolver_daemon,
+    socket_path,
+    mocker
+):
+    mocker.patch.object(
+        subprocess,
+        "Popen",
+        side_effect=OSError("No such file or directory")
+    )
+    backend = daemon.daemon_backend(
+        daemon.DaemonClient(socket_path),
+        lambda _env_var_names: pytest.fail("Fell back with daemon running")
+    )
+
+    with pytest.raises(env_var.BatchError) as exc_info:
+        backend(["$FOO", "$BAR"])
+
+    assert exc_info.value.values == {}
+    assert exc_info.value.errored == ["$FOO", "$BAR"]
@@ -0,0 +1,155 @@
+import json
+import tempfile
+from pathlib import Path
+
+from plover_local_env_var import (
+    cache,
+    config,
+    diagnostics,
+    env_var
+)
+from plover_local_env_var.__main__ import main
+from plover_local_env_var.config import selector
+
+
+def _write_config(config_path, data):
+    config_path.write_text(json.dumps(data), encoding="utf-8")
+
+    return config.load_settings(config_path)
+
+def test_diagnose_times_each_env_var(tmp_path, monkeypatch):
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    monkeypatch.setenv("SHELL", "/bin/sh")
+    monkeypatch.setenv("PLOVER_LOCAL_ENV_VAR_FOO", "Bar")
+    monkeypatch.delenv("PLOVER_LOCAL_ENV_VAR_MISSING", raising=False)
+    config_path = tmp_path / "local_env_var.json"
+    settings = _write_config(config_path, {"shell_mode": "login"})
+
+    diagnosis = diagnostics.diagnose(
+        settings,
+        ["$PLOVER_LOCAL_ENV_VAR_FOO", "$PLOVER_LOCAL_ENV_VAR_MISSING"],
+        config_path,
+        runs=1
+    )
+
+    assert diagnosis.shell_command == ["sh", "-lc", "echo $ENV_VAR"]
+    assert diagnosis.strategy == config.STRATEGY_SUBPROCESS
+    assert diagnosis.startup_seconds > 0
+    assert diagnosis.echo_seconds >= 0
+    assert [timing.name for timing in diagnosis.failures] == [
+        "$PLOVER_LOCAL_ENV_VAR_MISSING"
+    ]
+
+def test_diagnosis_report_does_not_show_values():
+    diagnosis = diagnostics.Diagnosis(
+        shell_command=["bash", "-ic", "echo $ENV_VAR"],
+        strategy=config.STRATEGY_SUBPROCESS,
+        startup_seconds=0.25,
+        echo_seconds=0.002,
+        timings=[
+            diagnostics.VariableTiming("$FOO", 0.26, None),
+            diagnostics.VariableTiming("$BAR", 0.25, "No value found")
+        ]
+    )
+
+    report = diagnostics.format_diagnosis(diagnosis).splitlines()
+
+    assert report[0] == "Shell command: bash -ic 'echo $ENV_VAR'"
+    assert report[1] == "Strategy: subprocess"
+    assert report[2] == "Shell startup: 250.0ms"
+    assert report[3] == "Echo 2 env vars: 2.0ms"
+    assert report[4].split() == ["$FOO", "260.0ms", "ok"]
+    assert report[5].split() == [
+        "$BAR",
+        "250.0ms",
+        "error:",
+        "No",
+        "value",
+        "found"
+    ]
+    assert report[6] == "1 of 2 env vars could not be expanded"
+
+def test_warming_persisted_values(tmp_path, monkeypatch):
+    monkeypatch.setenv("PLOVER_LOCAL_ENV_VAR_FOO", "Bar")
+    config_path = tmp_path / "local_env_var.json"
+    settings = _write_config(
+        config_path,
+        {"persist_values": True, "resolvers": ["environ"]}
+    )
+
+    with tempfile.TemporaryDirectory(prefix="plev-") as directory:
+        lines = diagnostics.warm_caches(
+            settings,
+            ["$PLOVER_LOCAL_ENV_VAR_FOO"],
+            config_path,
+            Path(directory) / "resolver.sock"
+        )
+
+    disk_cache = cache.DiskCache(tmp_path / cache.VALUE_CACHE_BASENAME)
+    key = cache.DiskCache.key(
+        repr(settings),
+        env_var.fingerprint(config.dependency_filepaths(settings))
+    )
+    assert disk_cache.load(key) == {"$PLOVER_LOCAL_ENV_VAR_FOO": "Bar"}
+    assert lines == [
+        "Persisted 1 env var values",
+        "Resolver daemon not running, not warming it"
+    ]
+
+def test_diagnose_command_uses_config_file_names(
+    tmp_path,
+    monkeypatch,
+    mocker,
+    capsys
+):
+    config_path = tmp_path / "local_env_var.json"
+    _write_config(config_path, {"env_var_names": ["$FOO"]})
+    diagnose = mocker.patch.object(
+        diagnostics,
+        "diagnose",
+        return_value=diagnostics.Diagnosis(["sh"], "subprocess", 0.1, 0.0, [])
+    )
+
+    assert main(["diagnose", "--config", str(config_path), "--runs", "1"]) == 0
+    assert diagnose.call_args.args[1:] == (["$FOO"], config_path, 1)
+    assert capsys.readouterr().out.startswith("Shell command: sh\n")
+
+def test_diagnose_uses_the_strategy_plover_starts_with(
+    tmp_path,
+    monkeypatch,
+    mocker
+):
+    monkeypatch.setenv("PLOVER_LOCAL_ENV_VAR_FOO", "Bar")
+    config_path = tmp_path / "local_env_var.json"
+    settings = _write_config(
+        config_path,
+        {"strategy": "auto", "resolvers": ["environ", "shell"]}
+    )
+    mocker.patch.object(
+        selector,
+        "measure_strategies",
+        return_value=[
+            config.StrategyMeasurement("subprocess", 0.2, 0.2, [], None),
+            config.StrategyMeasurement("coprocess", 0.3, 0.001, [], None)
+        ]
+    )
+    config.StrategySelector(
+        tmp_path / config.STRATEGY_MEASUREMENTS_BASENAME
+    ).select(
+        env_var.resolve_command(),
+        [],
+        cache.DiskCache.key(
+            repr(settings),
+            env_var.fingerprint(config.dependency_filepaths(settings))
+        )
+    )
+
+    diagnosis = diagnostics.diagnose(
+        settings,
+        ["$PLOVER_LOCAL_ENV_VAR_FOO"],
+        config_path,
+        runs=1
+    )
+
+    assert diagnosis.strategy == config.STRATEGY_COPROCESS
+    assert diagnosis.failures == []
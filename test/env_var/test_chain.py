@@ -0,0 +1,241 @@
+import subprocess
+
+import pytest
+
+from plover_local_env_var import env_var
+from plover_local_env_var.env_var import dotenv
+
+
+def test_parsing_dotenv_file_contents():
+    contents = "\n".join([
+        "# A comment",
+        "",
+        "FOO=Bar",
+        "export BAZ = Quux # trailing comment",
+        "SINGLE='Literal \\n # not a comment'",
+        "DOUBLE=\"Line one\\nLine \\\"two\\\"\"",
+        "not a variable",
+        "EMPTY="
+    ])
+
+    assert dotenv.parse(contents) == {
+        "FOO": "Bar",
+        "BAZ": "Quux",
+        "SINGLE": "Literal \\n # not a comment",
+        "DOUBLE": "Line one\nLine \"two\"",
+        "EMPTY": ""
+    }
+
+def test_loading_dotenv_file_reads_changes(tmp_path):
+    dotenv_filepath = tmp_path / ".env"
+
+    assert dotenv.load(dotenv_filepath) == {}
+
+    dotenv_filepath.write_text("FOO=Bar\n", encoding="utf-8")
+    assert dotenv.load(dotenv_filepath) == {"FOO": "Bar"}
+
+    dotenv_filepath.write_text("FOO=Bazzz\n", encoding="utf-8")
+    assert dotenv.load(dotenv_filepath) == {"FOO": "Bazzz"}
+
+def test_environ_backend(monkeypatch):
+    monkeypatch.setenv("PLOVER_LOCAL_ENV_VAR_FOO", "Bar")
+    monkeypatch.delenv("PLOVER_LOCAL_ENV_VAR_MISSING", raising=False)
+
+    assert env_var.environ_backend([
+        "$PLOVER_LOCAL_ENV_VAR_FOO",
+        "$ENV:PLOVER_LOCAL_ENV_VAR_FOO",
+        "$PLOVER_LOCAL_ENV_VAR_MISSING",
+        "PLOVER_LOCAL_ENV_VAR_FOO",
+        "$PLOVER_LOCAL_ENV_VAR_FOO extra"
+    ]) == {
+        "$PLOVER_LOCAL_ENV_VAR_FOO": "Bar",
+        "$ENV:PLOVER_LOCAL_ENV_VAR_FOO": "Bar"
+    }
+
+def test_chain_falls_through_to_later_backends(tmp_path, monkeypatch):
+    monkeypatch.setenv("PLOVER_LOCAL_ENV_VAR_FOO", "From environ")
+    dotenv_filepath = tmp_path / ".env"
+    dotenv_filepath.write_text(
+        "PLOVER_LOCAL_ENV_VAR_FOO=From dotenv\n"
+        "PLOVER_LOCAL_ENV_VAR_BAR=From dotenv\n",
+        encoding="utf-8"
+    )
+    shell_lookups = []
+
+    def _shell(env_var_names):
+        shell_lookups.append(env_var_names)
+        return {"$PLOVER_LOCAL_ENV_VAR_BAZ": "From shell"}
+
+    chain = env_var.ResolverChain([
+        env_var.environ_backend,
+        env_var.dotenv_backend(dotenv_filepath),
+        _shell
+    ])
+
+    assert chain.resolve([
+        "$PLOVER_LOCAL_ENV_VAR_FOO",
+        "$PLOVER_LOCAL_ENV_VAR_BAR",
+        "$PLOVER_LOCAL_ENV_VAR_BAZ",
+        "$PLOVER_LOCAL_ENV_VAR_QUUX"
+    ]) == env_var.BatchResult(
+        values={
+            "$PLOVER_LOCAL_ENV_VAR_FOO": "From environ",
+            "$PLOVER_LOCAL_ENV_VAR_BAR": "From dotenv",
+            "$PLOVER_LOCAL_ENV_VAR_BAZ": "From shell"
+        },
+        failed=["$PLOVER_LOCAL_ENV_VAR_QUUX"],
+        errored=[]
+    )
+    assert shell_lookups == [
+        ["$PLOVER_LOCAL_ENV_VAR_BAZ", "$PLOVER_LOCAL_ENV_VAR_QUUX"]
+    ]
+
+def test_chain_resolving_in_process_does_not_start_a_shell(
+    mocker,
+    monkeypatch,
+    bash_command
+):
+    monkeypatch.setenv("PLOVER_LOCAL_ENV_VAR_FOO", "Bar")
+    spy = mocker.spy(subprocess, "Popen")
+    chain = env_var.ResolverChain([
+        env_var.environ_backend,
+        env_var.shell_backend(bash_command)
+    ])
+
+    assert chain.resolve_one("$PLOVER_LOCAL_ENV_VAR_FOO") == "Bar"
+    spy.assert_not_called()
+
+def test_chain_resolving_one_with_shell(
+    mock_subprocess_run,
+    batch_output,
+    bash_command
+):
+    mock_subprocess_run(return_value=batch_output("Bar"))
+    chain = env_var.ResolverChain([
+        env_var.environ_backend,
+        env_var.shell_backend(bash_command)
+    ])
+
+    assert chain.resolve_one("$PLOVER_LOCAL_ENV_VAR_MISSING") == "Bar"
+
+def test_chain_resolving_one_raises_last_backend_error(
+    mock_subprocess_run,
+    bash_command
+):
+    mock_subprocess_run(return_value="")
+    chain = env_var.ResolverChain([
+        env_var.shell_backend(bash_command),
+        env_var.environ_backend
+    ])
+
+    with pytest.raises(
+        ValueError,
+        match="No value found for env var: \\$PLOVER_LOCAL_ENV_VAR_MISSING"
+    ):
+        chain.resolve_one("$PLOVER_LOCAL_ENV_VAR_MISSING")
+
+def test_chain_resolving_one_with_no_value_found():
+    chain = env_var.ResolverChain([env_var.environ_backend])
+
+    with pytest.raises(ValueError, match="No value found for env var: \\$"):
+        chain.resolve_one("$PLOVER_LOCAL_ENV_VAR_MISSING")
+
+def test_chain_resolving_one_prefers_errors_other_than_no_value(
+    mock_subprocess_run,
+    bash_command
+):
+    mock_subprocess_run(return_value="")
+
+    def _broken(_env_var_names):
+        raise ValueError("Shell timed out after 1.0s")
+
+    chain = env_var.ResolverChain([_broken, env_var.shell_backend(bash_command)])
+
+    with pytest.raises(ValueError, match="Shell timed out") as exc_info:
+        chain.resolve_one("$PLOVER_LOCAL_ENV_VAR_MISSING")
+
+    assert not isinstance(exc_info.value, env_var.NoValueError)
+
+def test_chain_raises_error_when_nothing_resolves():
+    def _broken(_env_var_names):
+        raise ValueError("Shell timed out after 1.0s")
+
+    chain = env_var.ResolverChain([env_var.environ_backend, _broken])
+
+    with pytest.raises(ValueError, match="Shell timed out"):
+        chain.resolve(["$PLOVER_LOCAL_ENV_VAR_MISSING"])
+
+def test_chain_reports_names_a_backend_errored_on(monkeypatch):
+    monkeypatch.setenv("PLOVER_LOCAL_ENV_VAR_FOO", "Bar")
+
+    def _broken(_env_var_names):
+        raise ValueError("Shell timed out after 1.0s")
+
+    chain = env_var.ResolverChain([env_var.environ_backend, _broken])
+
+    assert chain.resolve([
+        "$PLOVER_LOCAL_ENV_VAR_FOO",
+        "$PLOVER_LOCAL_ENV_VAR_BAR"
+    ]) == env_var.BatchResult(
+        values={"$PLOVER_LOCAL_ENV_VAR_FOO": "Bar"},
+        failed=[],
+        errored=["$PLOVER_LOCAL_ENV_VAR_BAR"]
+    )
+
+def test_chain_reports_names_with_no_value_when_nothing_resolves(
+    mock_subprocess_run,
+    bash_command
+):
+    mock_subprocess_run(return_value="")
+    chain = env_var.ResolverChain([
+        env_var.environ_backend,
+        env_var.shell_backend(bash_command)
+    ])
+
+    assert chain.resolve(["$PLOVER_LOCAL_ENV_VAR_MISSING"]) == (
+        env_var.BatchResult(
+            values={},
+            failed=["$PLOVER_LOCAL_ENV_VAR_MISSING"],
+            errored=[]
+        )
+    )
+
+def test_chain_keeps_values_from_a_partly_errored_shell(
+    mocker,
+    batch_output,
+    bash_command
+):
+    def _run_script(_shell_command, script):
+        if "$FOO" in script:
+            raise ValueError("Shell timed out after 10.0s")
+        return batch_output("bar", "")
+
+    mocker.patch.object(
+        env_var.command,
+        "run_script",
+        side_effect=_run_script
+    )
+    mocker.patch.object(env_var.expander, "_MAX_CHUNK_SCRIPT_LENGTH", 16)
+    chain = env_var.ResolverChain([env_var.shell_backend(bash_command)])
+
+    assert chain.resolve(["$FOO", "$QUUX", "$BAR", "$BAZ"]) == (
+        env_var.BatchResult(
+            values={"$BAR": "bar"},
+            failed=["$BAZ"],
+            errored=["$FOO", "$QUUX"]
+        )
+    )
+
+def test_chain_shell_backend_batches_multiple_names(
+    mock_subprocess_run,
+    batch_output,
+    bash_command
+):
+    mock_subprocess_run(return_value=batch_output("Bar", ""))
+    chain = env_var.ResolverChain([env_var.shell_backend(bash_command)])
+
+    assert chain.resolve(["$FOO", "$BAZ"]) == env_var.BatchResult(
+        values={"$FOO": "Bar"},
+        failed=["$BAZ"],
+        errored=[]
+    )
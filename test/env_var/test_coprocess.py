@@ -0,0 +1,156 @@
+import pytest
+import threading
+import time
+
+from plover_local_env_var import env_var
+from plover_local_env_var.env_var.coprocess import _stdin_command
+
+
+@pytest.fixture
+def coprocess(monkeypatch):
+    monkeypatch.setenv("FOO", "Bar")
+    monkeypatch.setenv("MULTILINE", "first\nsecond")
+    shell = env_var.ShellCoprocess(
+        lambda env_var: ["bash", "-c", f"echo \"{env_var}\""]
+    )
+
+    yield shell
+
+    shell.close()
+
+def test_stdin_command_for_interactive_shell():
+    assert _stdin_command(["zsh", "-ic", "echo $FOO"]) == ["zsh", "-i"]
+
+def test_stdin_command_for_non_interactive_shell():
+    assert _stdin_command(["bash", "-c", "echo $FOO"]) == ["bash"]
+
+def test_stdin_command_for_powershell():
+    assert _stdin_command(
+        ["powershell", "-command", "$ENV:FOO"]
+    ) == ["powershell", "-command", "-"]
+
+def test_coprocess_runs_scripts(coprocess):
+    assert coprocess.run_script("echo $FOO") == "Bar\n"
+    assert coprocess.run_script("echo \"$MULTILINE\"") == "first\nsecond\n"
+    assert coprocess.run_script("printf '%s' \"$FOO\"") == "Bar"
+    assert coprocess.run_script("printf ''") == ""
+
+def test_coprocess_reuses_a_single_shell(coprocess):
+    coprocess.run_script("echo $FOO")
+    process = coprocess._process
+    coprocess.run_script("echo $FOO")
+
+    assert coprocess._process is process
+
+def test_coprocess_restarts_after_crash(coprocess):
+    coprocess.run_script("echo $FOO")
+    coprocess._process.kill()
+    coprocess._process.wait()
+
+    assert coprocess.run_script("echo $FOO") == "Bar\n"
+
+def test_coprocess_restart_replaces_shell(coprocess):
+    coprocess.run_script("echo $FOO")
+    process = coprocess._process
+    coprocess.restart()
+
+    assert coprocess._process is not process
+    assert process.poll() is not None
+    assert coprocess.run_script("echo $FOO") == "Bar\n"
+
+def test_expand_with_coprocess_runner(coprocess):
+    shell_command = lambda env_var: ["bash", "-c", f"echo {env_var}"]
+
+    assert env_var.expand(shell_command, "$FOO", coprocess.run_script) == "Bar"
+    assert env_var.expand(
+        shell_command,
+        "$MULTILINE",
+        coprocess.run_script
+    ) == "first\nsecond"
+
+def test_expand_with_coprocess_runner_and_no_value(coprocess):
+    with pytest.raises(ValueError, match="No value found for env var"):
+        env_var.expand(
+            lambda env_var: ["bash", "-c", f"echo {env_var}"],
+            "$NOT_SET",
+            coprocess.run_script
+        )
+
+def test_values_are_the_same_however_they_get_fetched(coprocess, monkeypatch):
+    value = "  a  b\n\n c\t \n"
+    monkeypatch.setenv("SPACED", value)
+    shell_command = lambda env_var: ["bash", "-c", f"echo {env_var}"]
+
+    assert env_var.expand(shell_command, "$SPACED") == value
+    assert env_var.expand(shell_command, "$SPACED", coprocess.run_script) == (
+        value
+    )
+    assert env_var.expand_batch(shell_command, ["$SPACED", "$FOO"]).values == {
+        "$SPACED": value,
+        "$FOO": "Bar"
+    }
+
+def test_coprocess_sources_file_once(tmp_path, monkeypatch):
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    monkeypatch.setenv("SHELL", "/bin/bash")
+    monkeypatch.delenv("ONLY_IN_SOURCED_FILE", raising=False)
+    sourced_log = tmp_path / "sourced.log"
+    source_file = tmp_path / "env_vars"
+    source_file.write_text(
+        f"echo sourced >> {sourced_log}\nONLY_IN_SOURCED_FILE='a  b'\n",
+        encoding="utf-8"
+    )
+    shell_command = env_var.resolve_command(
+        env_var.SHELL_MODE_SOURCE,
+        str(source_file)
+    )
+    shell = env_var.ShellCoprocess(shell_command)
+
+    try:
+        for _lookup in range(2):
+            assert env_var.expand(
+                shell_command,
+                "$ONLY_IN_SOURCED_FILE",
+                shell.run_script
+            ) == "a  b"
+    finally:
+        shell.close()
+
+    assert sourced_log.read_text(encoding="utf-8") == "sourced\n"
+
+def test_coprocess_times_out_and_restarts(coprocess):
+    env_var.SHELL_GUARD.configure(timeout=0.5, failure_threshold=3, cool_down=30)
+
+    with pytest.raises(ValueError, match="Shell timed out after 0.5s"):
+        coprocess.run_script("sleep 5")
+
+    assert coprocess._process is None
+    assert coprocess.run_script("echo $FOO") == "Bar\n"
+    assert env_var.SHELL_GUARD.stats()["timeouts"] == 1
+
+def test_retiring_waits_for_requests_in_flight(coprocess):
+    coprocess.run_script("echo $FOO")
+    results = []
+    request = threading.Thread(
+        target=lambda: results.append(
+            coprocess.run_script("sleep 0.3; echo $FOO")
+        )
+    )
+    request.start()
+    while not coprocess._in_flight:
+        time.sleep(0.01)
+
+    coprocess.retire()
+
+    assert coprocess._process is not None
+    request.join(timeout=5)
+    assert results == ["Bar\n"]
+    assert coprocess._process is None
+
+def test_retired_coprocess_leaves_no_shell_running(coprocess):
+    coprocess.run_script("echo $FOO")
+    coprocess.retire()
+
+    assert coprocess._process is None
+    assert coprocess.run_script("echo $FOO") == "Bar\n"
+    assert coprocess._process is None
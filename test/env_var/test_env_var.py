@@ -1,8 +1,10 @@
 import os
+import re
 import pytest
 import subprocess
 
 from plover_local_env_var import env_var
+from plover_local_env_var.env_var import command
 
 
 def test_resolve_shell_command_for_windows(monkeypatch, powershell_command):
@@ -24,6 +26,63 @@ def test_resolve_shell_command_for_mac_or_linux(monkeypatch, shell_command):
         == shell_command("bash").__code__.co_code
     )
 
+def test_resolve_login_shell_command(monkeypatch):
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    monkeypatch.setenv("SHELL", "/usr/bin/zsh")
+
+    shell_command = env_var.resolve_command(env_var.SHELL_MODE_LOGIN)
+
+    assert shell_command("$FOO") == ["zsh", "-lc", "echo $FOO"]
+
+def test_resolve_source_shell_command(monkeypatch):
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    monkeypatch.setenv("SHELL", "/bin/bash")
+
+    shell_command = env_var.resolve_command(
+        env_var.SHELL_MODE_SOURCE,
+        "/home/me/my env; vars"
+    )
+
+    assert shell_command("$FOO") == [
+        "bash",
+        "-c",
+        ". '/home/me/my env; vars'; echo $FOO"
+    ]
+    assert command.resolve_script_command(shell_command, "env -0") == [
+        "bash",
+        "-c",
+        ". '/home/me/my env; vars'; env -0"
+    ]
+
+def test_resolve_source_shell_command_for_fish(monkeypatch):
+    monkeypatch.setattr("platform.system", lambda: "Darwin")
+    monkeypatch.setenv("SHELL", "/opt/homebrew/bin/fish")
+
+    shell_command = env_var.resolve_command(
+        env_var.SHELL_MODE_SOURCE,
+        "/tmp/vars.fish"
+    )
+
+    assert shell_command("$FOO") == [
+        "fish",
+        "-c",
+        "source /tmp/vars.fish; echo $FOO"
+    ]
+
+def test_resolve_source_shell_command_without_file(monkeypatch):
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+
+    with pytest.raises(ValueError, match="No file to source"):
+        env_var.resolve_command(env_var.SHELL_MODE_SOURCE)
+
+def test_shell_modes_ignored_for_windows(monkeypatch, powershell_command):
+    monkeypatch.setattr("platform.system", lambda: "Windows")
+
+    assert (
+        env_var.resolve_command(env_var.SHELL_MODE_LOGIN).__code__.co_code
+        == powershell_command.__code__.co_code
+    )
+
 def test_var_not_a_dollar_env_var(bash_command):
     with pytest.raises(
         ValueError,
@@ -31,22 +90,37 @@ def test_var_not_a_dollar_env_var(bash_command):
     ):
         env_var.expand(bash_command, "FOO")
 
+@pytest.mark.parametrize("var", ["$X;echo pwn", "$(echo pwn)", "$X`echo pwn`"])
+def test_var_with_shell_code_never_reaches_the_shell(mocker, bash_command, var):
+    spy = mocker.spy(subprocess, "Popen")
+
+    with pytest.raises(env_var.NoValueError, match="not an \\$ENV_VAR"):
+        env_var.expand(bash_command, var)
+
+    assert env_var.expand_batch(bash_command, [var]).failed == [var]
+    spy.assert_not_called()
+
 def test_no_value_for_var_found_on_mac_on_linux(
     mock_subprocess_run,
     mocker,
     bash_command
 ):
     mock_subprocess_run(return_value="")
-    spy = mocker.spy(subprocess, "run")
+    spy = mocker.spy(subprocess, "Popen")
 
     with pytest.raises(ValueError, match="No value found for env var: \\$FOO"):
         env_var.expand(bash_command, "$FOO")
 
     spy.assert_called_once_with(
-        ["bash", "-ic", "echo $FOO"],
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
+        [
+            "bash",
+            "-ic",
+            "printf '%s\\0' __PLOVER_LOCAL_ENV_VAR_BATCH__ \"$FOO\""
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
     )
 
 def test_no_value_for_var_found_on_windows(
@@ -55,7 +129,7 @@ def test_no_value_for_var_found_on_windows(
     powershell_command
 ):
     mock_subprocess_run(return_value="")
-    spy = mocker.spy(subprocess, "run")
+    spy = mocker.spy(subprocess, "Popen")
 
     with pytest.raises(
         ValueError,
@@ -67,45 +141,191 @@ def test_no_value_for_var_found_on_windows(
         [
             "powershell",
             "-command",
-            "$ExecutionContext.InvokeCommand.ExpandString(\"$ENV:FOO\")"
+            "[Console]::Out.Write("
+            "\"__PLOVER_LOCAL_ENV_VAR_BATCH__`0$ENV:FOO`0\")"
         ],
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
     )
 
 def test_returns_expanded_value_of_found_env_var_on_mac_or_linux(
     mock_subprocess_run,
+    batch_output,
     mocker,
     bash_command
 ):
-    mock_subprocess_run(return_value="Bar")
-    spy = mocker.spy(subprocess, "run")
+    mock_subprocess_run(return_value=batch_output("Bar"))
+    spy = mocker.spy(subprocess, "Popen")
 
     assert env_var.expand(bash_command, "$FOO") == "Bar"
     spy.assert_called_once_with(
-        ["bash", "-ic", "echo $FOO"],
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
+        [
+            "bash",
+            "-ic",
+            "printf '%s\\0' __PLOVER_LOCAL_ENV_VAR_BATCH__ \"$FOO\""
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
     )
 
 def test_returns_expanded_value_of_found_env_var_on_windows(
     mock_subprocess_run,
+    batch_output,
     mocker,
     powershell_command
 ):
-    mock_subprocess_run(return_value="Bar")
-    spy = mocker.spy(subprocess, "run")
+    mock_subprocess_run(return_value=batch_output("Bar"))
+    spy = mocker.spy(subprocess, "Popen")
 
     assert env_var.expand(powershell_command, "$ENV:FOO") == "Bar"
     spy.assert_called_once_with(
         [
             "powershell",
             "-command",
-            "$ExecutionContext.InvokeCommand.ExpandString(\"$ENV:FOO\")"
+            "[Console]::Out.Write("
+            "\"__PLOVER_LOCAL_ENV_VAR_BATCH__`0$ENV:FOO`0\")"
         ],
-        capture_output=True,
-        check=False,
-        encoding="utf-8"
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
     )
+
+def test_expand_batch_keeps_values_with_dividers_and_newlines(
+    batch_output,
+    mock_subprocess_run,
+    bash_command
+):
+    mock_subprocess_run(
+        return_value="Welcome to bash!\n" + batch_output("a##b", "c\nd")
+    )
+
+    result = env_var.expand_batch(bash_command, ["$FOO", "$BAR"])
+
+    assert result.values == {"$FOO": "a##b", "$BAR": "c\nd"}
+    assert result.failed == []
+
+def test_expand_batch_reports_individual_failures(
+    batch_output,
+    mock_subprocess_run,
+    bash_command
+):
+    mock_subprocess_run(return_value=batch_output("", "baz", ""))
+
+    result = env_var.expand_batch(
+        bash_command,
+        ["$FOO", "$BAR", "NOT_AN_ENV_VAR", "$BAZ"]
+    )
+
+    assert result.values == {"$BAR": "baz"}
+    assert result.failed == ["NOT_AN_ENV_VAR", "$FOO", "$BAZ"]
+
+def test_expand_batch_reports_truncated_output_as_failures(
+    mock_subprocess_run,
+    bash_command
+):
+    mock_subprocess_run(
+        return_value="__PLOVER_LOCAL_ENV_VAR_BATCH__\0baz\0qu"
+    )
+
+    result = env_var.expand_batch(bash_command, ["$FOO", "$BAR"])
+
+    assert result.values == {"$FOO": "baz"}
+    assert result.failed == ["$BAR"]
+
+def test_expand_batch_with_no_output(mock_subprocess_run, bash_command):
+    mock_subprocess_run(return_value="")
+
+    result = env_var.expand_batch(bash_command, ["$FOO", "$BAR"])
+
+    assert result.values == {}
+    assert result.failed == ["$FOO", "$BAR"]
+
+def test_expand_batch_in_a_real_shell(monkeypatch):
+    monkeypatch.setenv("FOO", "a##b")
+    monkeypatch.setenv("BAR", "c\nd")
+    monkeypatch.delenv("BAZ", raising=False)
+
+    result = env_var.expand_batch(
+        lambda env_var: ["bash", "-c", f"echo {env_var}"],
+        ["$FOO", "$BAR", "$BAZ"]
+    )
+
+    assert result.values == {"$FOO": "a##b", "$BAR": "c\nd"}
+    assert result.failed == ["$BAZ"]
+
+def test_expand_batch_never_runs_shell_code_in_names(monkeypatch):
+    monkeypatch.setenv("FOO", "Bar")
+
+    result = env_var.expand_batch(
+        lambda env_var: ["bash", "-c", f"echo {env_var}"],
+        ["$FOO", "$FOO\"; echo \"pwn", "$(echo pwn)"]
+    )
+
+    assert result.values == {"$FOO": "Bar"}
+    assert result.failed == ["$FOO\"; echo \"pwn", "$(echo pwn)"]
+
+def test_expand_batch_in_parallel_chunks(mocker, batch_output, bash_command):
+    scripts = []
+
+    def _run_script(_shell_command, script):
+        scripts.append(script)
+        names = re.findall(r"\"\$(\w+)\"", script)
+        return batch_output(*(
+            "" if name == "VAR_13" else name.lower()
+            for name in names
+        ))
+
+    mocker.patch.object(command, "run_script", side_effect=_run_script)
+    env_var_names = [f"$VAR_{index}" for index in range(1000)]
+
+    result = env_var.expand_batch(bash_command, env_var_names, chunk_size=64)
+
+    assert len(scripts) == 16
+    assert len(result.values) == 999
+    assert result.values["$VAR_999"] == "var_999"
+    assert result.failed == ["$VAR_13"]
+
+def test_expand_batch_chunks_bounded_by_script_length(mocker, bash_command):
+    run_script = mocker.patch.object(command, "run_script", return_value="")
+    env_var_names = [f"${'A' * 1000}_{index}" for index in range(40)]
+
+    env_var.expand_batch(bash_command, env_var_names)
+
+    assert run_script.call_count > 1
+    assert all(
+        len(call.args[1]) <= 16_000 + 1_100
+        for call in run_script.call_args_list
+    )
+
+def test_expand_batch_with_a_failed_chunk(mocker, batch_output, bash_command):
+    def _run_script(_shell_command, script):
+        if "$FOO" in script:
+            raise ValueError("Shell timed out after 10.0s")
+        return batch_output("bar", "baz")
+
+    mocker.patch.object(command, "run_script", side_effect=_run_script)
+
+    result = env_var.expand_batch(
+        bash_command,
+        ["$FOO", "$QUUX", "$BAR", "$BAZ"],
+        chunk_size=2
+    )
+
+    assert result.values == {"$BAR": "bar", "$BAZ": "baz"}
+    assert result.failed == []
+    assert result.errored == ["$FOO", "$QUUX"]
+
+def test_expand_batch_with_every_chunk_failed(mocker, bash_command):
+    mocker.patch.object(
+        command,
+        "run_script",
+        side_effect=ValueError("Unable to start shell: not found")
+    )
+
+    with pytest.raises(ValueError, match="Unable to start shell"):
+        env_var.expand_batch(bash_command, ["$FOO", "$BAR"], chunk_size=1)
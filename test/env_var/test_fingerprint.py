@@ -0,0 +1,37 @@
+import os
+from pathlib import Path
+
+from plover_local_env_var import env_var
+
+
+def test_fingerprint_changes_when_a_file_changes(tmp_path):
+    rc_file = tmp_path / ".bashrc"
+    rc_file.write_text("export FOO=Bar\n", encoding="utf-8")
+    before = env_var.fingerprint([rc_file])
+
+    assert env_var.fingerprint([rc_file]) == before
+
+    rc_file.write_text("export FOO=Baz\n", encoding="utf-8")
+    os.utime(rc_file, ns=(0, 0))
+
+    assert env_var.fingerprint([rc_file]) != before
+
+def test_fingerprint_of_missing_file(tmp_path):
+    missing_file = tmp_path / ".zshrc"
+
+    assert env_var.fingerprint([missing_file]) == {str(missing_file): None}
+
+def test_fingerprint_changes_when_a_file_is_created(tmp_path):
+    rc_file = tmp_path / ".zshrc"
+    before = env_var.fingerprint([rc_file])
+    rc_file.write_text("export FOO=Bar\n", encoding="utf-8")
+
+    assert env_var.fingerprint([rc_file]) != before
+
+def test_shell_config_filepaths_include_extra_files():
+    filepaths = env_var.shell_config_filepaths(["~/.secrets"])
+
+    assert Path("~/.bashrc").expanduser() in filepaths
+    assert Path("~/.zshrc").expanduser() in filepaths
+    assert Path("~/.config/fish/config.fish").expanduser() in filepaths
+    assert filepaths[-1] == Path("~/.secrets").expanduser()
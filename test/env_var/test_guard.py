@@ -0,0 +1,117 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+from plover_local_env_var import env_var
+from plover_local_env_var.env_var import command
+from plover_local_env_var.env_var.guard import ShellGuard
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def sleepy_command():
+    # NOTE: The sleep runs in a child process of the shell, so it only gets
+    # killed if the whole process group is killed.
+    return lambda env_var: [
+        "bash",
+        "-c",
+        f"sleep 5 & echo $! > {env_var}; wait"
+    ]
+
+def test_guard_opens_after_consecutive_failures_and_cools_down():
+    clock = _Clock()
+    guard = ShellGuard(clock=clock)
+    guard.configure(timeout=1, failure_threshold=2, cool_down=30)
+
+    guard.check()
+    guard.record_failure(0.5)
+    guard.check()
+    guard.record_failure(1.0, timed_out=True)
+
+    with pytest.raises(ValueError, match="Shell unavailable"):
+        guard.check()
+
+    clock.now = 30
+    guard.check()
+
+    with pytest.raises(ValueError, match="Shell unavailable"):
+        guard.check()
+
+    guard.record_success(0.25)
+    guard.check()
+
+    assert guard.stats() == {
+        "runs": 3,
+        "successes": 1,
+        "failures": 2,
+        "timeouts": 1,
+        "rejections": 2,
+        "total_seconds": 1.75,
+        "max_seconds": 1.0,
+        "last_seconds": 0.25,
+        "open": 0.0
+    }
+
+def test_successes_reset_consecutive_failures():
+    guard = ShellGuard()
+    guard.configure(timeout=1, failure_threshold=2, cool_down=30)
+
+    guard.record_failure(0.1)
+    guard.record_success(0.1)
+    guard.record_failure(0.1)
+
+    guard.check()
+
+def test_timed_out_shell_and_its_children_are_killed(tmp_path, sleepy_command):
+    pid_file = tmp_path / "sleep.pid"
+    env_var.SHELL_GUARD.configure(
+        timeout=0.5,
+        failure_threshold=3,
+        cool_down=30
+    )
+    start = time.perf_counter()
+
+    with pytest.raises(ValueError, match="Shell timed out after 0.5s"):
+        command.run_command(sleepy_command, str(pid_file))
+
+    assert time.perf_counter() - start < 3
+    sleep_pid = int(pid_file.read_text(encoding="utf-8"))
+    # NOTE: The killed process can take a moment to be reaped.
+    deadline = time.perf_counter() + 2
+    with pytest.raises(ProcessLookupError):
+        while time.perf_counter() < deadline:
+            os.kill(sleep_pid, 0)
+            time.sleep(0.05)
+    assert env_var.SHELL_GUARD.stats()["timeouts"] == 1
+
+def test_open_circuit_breaker_stops_shells_starting(
+    mock_subprocess_run,
+    mocker,
+    bash_command
+):
+    mock_subprocess_run(return_value="")
+    spy = mocker.spy(subprocess, "Popen")
+    env_var.SHELL_GUARD.configure(timeout=1, failure_threshold=1, cool_down=60)
+    env_var.SHELL_GUARD.record_failure(1, timed_out=True)
+
+    with pytest.raises(ValueError, match="Shell unavailable"):
+        env_var.expand(bash_command, "$FOO")
+
+    spy.assert_not_called()
+
+def test_unstartable_shell_is_a_failure():
+    with pytest.raises(ValueError, match="Unable to start shell"):
+        env_var.expand(
+            lambda env_var: ["not-a-real-shell", "-c", f"echo {env_var}"],
+            "$FOO"
+        )
+
+    assert env_var.SHELL_GUARD.stats()["failures"] == 1
@@ -0,0 +1,67 @@
+from plover_local_env_var import env_var
+from plover_local_env_var.__main__ import main
+from plover_local_env_var.env_var import probe
+
+
+def test_probe_shell_modes(monkeypatch, mocker):
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    monkeypatch.setenv("SHELL", "/bin/bash")
+    outputs = {
+        "-ic": {"$FOO": "Bar", "$BAZ": "Quux"},
+        "-lc": {"$FOO": "Bar"},
+        "-c": {"$FOO": "Bar", "$BAZ": "Quux"}
+    }
+    mocker.patch.object(
+        probe.expander,
+        "expand_batch",
+        side_effect=lambda shell_command, names: env_var.BatchResult(
+            values=outputs[shell_command("")[1]],
+            failed=[],
+            errored=[]
+        )
+    )
+
+    results = env_var.probe_shell_modes(
+        ["$FOO", "$BAZ"],
+        "~/.env_vars",
+        runs=2
+    )
+
+    assert [result.mode for result in results] == [
+        env_var.SHELL_MODE_INTERACTIVE,
+        env_var.SHELL_MODE_LOGIN,
+        env_var.SHELL_MODE_SOURCE
+    ]
+    assert [result.mismatched for result in results] == [[], ["$BAZ"], []]
+    assert [result.matches for result in results] == [True, False, True]
+    assert all(result.seconds >= 0 for result in results)
+
+def test_probe_skips_source_mode_without_file(monkeypatch, mocker):
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    run_command = mocker.patch.object(
+        probe.command,
+        "run_command",
+        return_value=""
+    )
+
+    results = env_var.probe_shell_modes([], runs=1)
+
+    assert [result.mode for result in results] == [
+        env_var.SHELL_MODE_INTERACTIVE,
+        env_var.SHELL_MODE_LOGIN
+    ]
+    assert run_command.call_count == 2
+
+def test_probe_reports_shell_errors(monkeypatch, mocker, capsys):
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    mocker.patch.object(
+        probe.expander,
+        "expand_batch",
+        side_effect=ValueError("Shell timed out after 10.0s")
+    )
+
+    assert main(["probe", "$FOO", "--runs", "1"]) == 1
+
+    output = capsys.readouterr().out
+    assert "interactive" in output
+    assert "error: Shell timed out after 10.0s" in output
@@ -0,0 +1,36 @@
+from plover_local_env_var import env_var
+
+
+def test_scan_finds_env_var_meta_arguments():
+    translations = [
+        "{:ENV_VAR:$PHONE_NUMBER}",
+        "Address: {:ENV_VAR:$STREET}, {:env_var:$CITY}",
+        "{:ENV_VAR:$ENV:POSTCODE}",
+        "{:ENV_VAR:$PHONE_NUMBER}"
+    ]
+
+    assert env_var.scan(translations) == {
+        "$PHONE_NUMBER",
+        "$STREET",
+        "$CITY",
+        "$ENV:POSTCODE"
+    }
+
+def test_scan_finds_env_vars_in_templates():
+    translations = [
+        "{:ENV_VAR:$FIRST $LAST}",
+        "{:ENV_VAR:$\\{CITY:-Unknown\\}, $STATE}",
+        "{:ENV_VAR:no env vars}"
+    ]
+
+    assert env_var.scan(translations) == {
+        "$FIRST",
+        "$LAST",
+        "$CITY",
+        "$STATE"
+    }
+
+def test_scan_ignores_other_translations():
+    translations = ["hello", "{^}", "{:OTHER_META:$FOO}", "{:ENV_VAR:}"]
+
+    assert env_var.scan(translations) == set()
@@ -0,0 +1,52 @@
+import subprocess
+
+import pytest
+
+from plover_local_env_var import env_var
+
+
+def test_snapshot_on_mac_or_linux(mock_subprocess_run, mocker, bash_command):
+    mock_subprocess_run(
+        return_value="Welcome!\nFOO=Bar\0URL=a=b\0MULTI=one\ntwo\0EMPTY=\0"
+    )
+    spy = mocker.spy(subprocess, "Popen")
+
+    assert env_var.snapshot(bash_command) == {
+        "$FOO": "Bar",
+        "$URL": "a=b",
+        "$MULTI": "one\ntwo"
+    }
+    spy.assert_called_once_with(
+        ["bash", "-ic", "env -0"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True
+    )
+
+def test_snapshot_on_windows(mock_subprocess_run, mocker, powershell_command):
+    mock_subprocess_run(return_value="FOO=Bar\0BAZ=Quux\0")
+    spy = mocker.spy(subprocess, "Popen")
+
+    assert env_var.snapshot(powershell_command) == {
+        "$ENV:FOO": "Bar",
+        "$ENV:BAZ": "Quux"
+    }
+    command = spy.call_args.args[0]
+    assert command[:2] == ["powershell", "-command"]
+    assert command[2].startswith("Get-ChildItem env:")
+
+def test_snapshot_with_no_output(mock_subprocess_run, bash_command):
+    mock_subprocess_run(return_value="")
+
+    with pytest.raises(ValueError, match="No env vars found"):
+        env_var.snapshot(bash_command)
+
+def test_snapshot_with_failing_shell(mocker, bash_command):
+    process = mocker.Mock()
+    process.returncode = 125
+    process.communicate.return_value = ("FOO=Bar\0", "env: invalid option")
+    mocker.patch("subprocess.Popen", return_value=process)
+
+    with pytest.raises(ValueError, match="Shell exited with status 125"):
+        env_var.snapshot(bash_command)
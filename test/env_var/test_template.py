@@ -0,0 +1,92 @@
+import pytest
+
+from plover_local_env_var import env_var
+from plover_local_env_var.env_var.template import Variable
+
+
+def _lookup(values):
+    def _method(name):
+        if name not in values:
+            raise ValueError(f"No value found for env var: {name}")
+        return values[name]
+
+    return _method
+
+def test_single_env_var_template():
+    template = env_var.compile_template("$FOO")
+
+    assert template.names == ("$FOO",)
+    assert template.render(_lookup({"$FOO": "Bar"})) == "Bar"
+
+def test_template_with_literals_and_multiple_env_vars():
+    template = env_var.compile_template("$FIRST $LAST, ${CITY}!")
+
+    assert template.names == ("$FIRST", "$LAST", "$CITY")
+    assert template.render(
+        _lookup({"$FIRST": "Jo", "$LAST": "Smith", "$CITY": "Melbourne"})
+    ) == "Jo Smith, Melbourne!"
+
+def test_template_defaults():
+    template = env_var.compile_template("${CITY:-Unknown} ${STATE:-}$COUNTRY")
+
+    assert template.render(_lookup({"$COUNTRY": "AU"})) == "Unknown AU"
+
+def test_template_without_default_raises_lookup_error():
+    template = env_var.compile_template("${CITY:-Unknown} $STATE")
+
+    with pytest.raises(ValueError, match="No value found for env var: \\$STATE"):
+        template.render(_lookup({}))
+
+def test_windows_template():
+    template = env_var.compile_template("$ENV:FIRST ${ENV:LAST:-Smith}")
+
+    assert template.names == ("$ENV:FIRST", "$ENV:LAST")
+    assert template.render(_lookup({"$ENV:FIRST": "Jo"})) == "Jo Smith"
+
+def test_template_escaped_dollar_and_repeated_env_var():
+    template = env_var.compile_template("$$5 $FOO/$FOO")
+
+    assert template.names == ("$FOO",)
+    assert template.parts == (
+        "$5 ",
+        Variable("$FOO", None),
+        "/",
+        Variable("$FOO", None)
+    )
+
+def test_template_without_env_vars():
+    with pytest.raises(
+        ValueError,
+        match="Provided value not an \\$ENV_VAR: FOO"
+    ):
+        env_var.compile_template("FOO")
+
+def test_templates_are_compiled_once():
+    assert env_var.compile_template("$A $B") is env_var.compile_template("$A $B")
+
+def test_template_filters():
+    template = env_var.compile_template(
+        "$NAME|upper ${PHONE|digits} ${CITY|trim|title:-  unknown  }"
+    )
+
+    assert template.names == ("$NAME", "$PHONE", "$CITY")
+    assert template.render(
+        _lookup({"$NAME": "Jo Smith", "$PHONE": "+61 (3) 1234-5678"})
+    ) == "JO SMITH 61312345678 Unknown"
+
+def test_template_filter_transform():
+    transformed = []
+    template = env_var.compile_template("$PHONE|DIGITS $PHONE")
+
+    def _transform(name, filters, value):
+        transformed.append((name, filters, value))
+        return env_var.apply_filters(value, filters)
+
+    assert template.render(_lookup({"$PHONE": "12-34"}), _transform) == (
+        "1234 12-34"
+    )
+    assert transformed == [("$PHONE", ("digits",), "12-34")]
+
+def test_template_with_unknown_filter():
+    with pytest.raises(ValueError, match="Unknown filter: reverse"):
+        env_var.compile_template("$NAME|reverse")
@@ -0,0 +1,107 @@
+import json
+import threading
+
+from plover_local_env_var import (
+    config,
+    env_var,
+    metrics
+)
+
+
+def test_histogram_percentiles():
+    histogram = metrics.Histogram()
+
+    assert histogram.percentile(50) is None
+
+    for seconds in [0.002] * 90 + [0.3] * 9 + [20.0]:
+        histogram.observe(seconds)
+
+    assert histogram.count == 100
+    assert histogram.percentile(50) == 0.005
+    assert histogram.percentile(95) == 0.5
+    assert histogram.percentile(100) == 20.0
+    assert histogram.max_seconds == 20.0
+    assert histogram.buckets()["<=0.005s"] == 90
+    assert histogram.buckets()[">10s"] == 1
+
+def test_percentiles_capped_at_max():
+    histogram = metrics.Histogram()
+    histogram.observe(0.2)
+
+    assert histogram.percentile(99) == 0.2
+
+def test_counters_and_summary():
+    recorder = metrics.Metrics()
+
+    assert recorder.summary() == "no activity"
+
+    recorder.increment("hits", 3)
+    recorder.increment("misses")
+    recorder.observe("lookup_seconds", 0.0004)
+
+    snapshot = recorder.snapshot()
+    assert snapshot["counters"] == {"hits": 3, "misses": 1}
+    assert snapshot["histograms"]["lookup_seconds"]["count"] == 1
+    assert recorder.summary() == (
+        "hits=3, misses=1, "
+        "lookup_seconds[n=1 p50=0.4ms p95=0.4ms p99=0.4ms max=0.4ms]"
+    )
+
+def test_counters_are_thread_safe():
+    recorder = metrics.Metrics()
+
+    def _count():
+        for _ in range(1000):
+            recorder.increment("hits")
+            recorder.observe("lookup_seconds", 0.001)
+
+    threads = [threading.Thread(target=_count) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = recorder.snapshot()
+    assert snapshot["counters"]["hits"] == 8000
+    assert snapshot["histograms"]["lookup_seconds"]["count"] == 8000
+
+def test_periodic_reporter():
+    reported = threading.Event()
+    reporter = metrics.PeriodicReporter(0.01, reported.set)
+
+    reporter.start()
+    assert reported.wait(2)
+    reporter.stop()
+
+def test_shell_runs_are_timed(
+    mock_subprocess_run,
+    batch_output,
+    bash_command
+):
+    mock_subprocess_run(return_value=batch_output("Bar"))
+
+    env_var.expand(bash_command, "$FOO")
+
+    histogram = metrics.METRICS.snapshot()["histograms"]["shell_seconds"]
+    assert histogram["count"] == 1
+
+def test_config_loads_and_writes_are_counted(
+    tmp_path,
+    mock_subprocess_run,
+    batch_output,
+    bash_command
+):
+    config_filepath = tmp_path / "local_env_var.json"
+    config_filepath.write_text(
+        json.dumps({"env_var_names": ["$BAR", "$FOO"]}, indent=2),
+        encoding="utf-8"
+    )
+    mock_subprocess_run(return_value=batch_output("", "Bar"))
+
+    config.load(bash_command, config_filepath)
+    # NOTE: Saving unchanged contents does not count as a write.
+    config.save(config_filepath, ["$FOO"])
+
+    snapshot = metrics.METRICS.snapshot()
+    assert snapshot["counters"] == {"config_loads": 1, "config_writes": 1}
+    assert snapshot["histograms"]["config_load_seconds"]["count"] == 1
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from plover_local_env_var import (
+    config,
+    metrics
+)
+from plover_local_env_var.env_var import command
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    path = tmp_path / metrics.TRACE_BASENAME
+    metrics.TRACER.configure(path, 1.0)
+
+    yield path
+
+    metrics.TRACER.close()
+
+def _events(trace_path):
+    return [
+        json.loads(line)
+        for line in trace_path.read_text(encoding="utf-8").splitlines()
+    ]
+
+def test_tracing_off_by_default(tmp_path):
+    tracer = metrics.Tracer()
+
+    assert tracer.sampled() is False
+
+    tracer.configure(tmp_path / metrics.TRACE_BASENAME, 0.0)
+    tracer.record("env_var", seconds=0.1)
+
+    assert tracer.sampled() is False
+    assert not (tmp_path / metrics.TRACE_BASENAME).exists()
+
+def test_record_writes_json_lines(tmp_path):
+    path = tmp_path / metrics.TRACE_BASENAME
+    tracer = metrics.Tracer()
+    tracer.configure(path, 1.0)
+
+    tracer.record("env_var", names=["$FOO"], hit=True)
+    tracer.record("save", bytes=10)
+    tracer.close()
+    tracer.record("save", bytes=20)
+
+    events = _events(path)
+    assert [event["event"] for event in events] == ["env_var", "save"]
+    assert events[0]["names"] == ["$FOO"]
+    assert events[0]["hit"] is True
+    assert isinstance(events[0]["time"], float)
+    assert events[0]["thread"] == "MainThread"
+    assert path.stat().st_mode & 0o777 == 0o600
+
+def test_sample_traces_everything_within_a_sampled_operation(tmp_path):
+    tracer = metrics.Tracer()
+    tracer.configure(tmp_path / metrics.TRACE_BASENAME, 0.5)
+    samples = []
+
+    for _ in range(200):
+        with tracer.sample() as sampled:
+            samples.append(sampled)
+            if sampled:
+                assert tracer.sampled() is True
+    tracer.close()
+
+    assert True in samples
+    assert False in samples
+
+def test_run_command_traced_without_values(trace_path):
+    command.run_command(lambda target: ["sh", "-c", f"echo {target}"], "secret")
+
+    [event] = _events(trace_path)
+    assert event["event"] == "run_command"
+    assert event["argv_length"] == len("sh") + len("-c") + len("echo secret")
+    assert event["exit_code"] == 0
+    assert event["timed_out"] is False
+    assert event["spawn_seconds"] >= 0
+    assert event["wait_seconds"] >= 0
+    assert "secret" not in trace_path.read_text(encoding="utf-8")
+
+def test_config_save_traced(trace_path, tmp_path):
+    config_path = tmp_path / "local_env_var.json"
+
+    config.save(config_path, ["$FOO"])
+
+    [event] = _events(trace_path)
+    assert event["event"] == "save"
+    assert event["filename"] == "local_env_var.json"
+    assert event["bytes"] == len(config_path.read_bytes())
+    assert event["seconds"] >= 0
@@ -0,0 +1,67 @@
+import dataclasses
+
+from plover_local_env_var import (
+    config,
+    resolver
+)
+
+
+def _settings(**changes):
+    return dataclasses.replace(
+        config.Settings(),
+        resolvers=(config.RESOLVER_ENVIRON, config.RESOLVER_SHELL),
+        **changes
+    )
+
+def test_resolver_resolves_through_the_chain(
+    monkeypatch,
+    mock_subprocess_run,
+    batch_output
+):
+    monkeypatch.setenv("PLOVER_LOCAL_ENV_VAR_FOO", "Bar")
+    mock_subprocess_run(return_value=batch_output("Quux"))
+    env_var_resolver = resolver.Resolver(
+        _settings(),
+        config.STRATEGY_SUBPROCESS
+    )
+
+    assert env_var_resolver.strategy == config.STRATEGY_SUBPROCESS
+    assert env_var_resolver.chain.resolve_one(
+        "$PLOVER_LOCAL_ENV_VAR_FOO"
+    ) == "Bar"
+    assert env_var_resolver.chain.resolve_one(
+        "$PLOVER_LOCAL_ENV_VAR_BAZ"
+    ) == "Quux"
+
+def test_snapshot_strategy_never_asks_the_shell(monkeypatch, mocker):
+    monkeypatch.delenv("PLOVER_LOCAL_ENV_VAR_MISSING", raising=False)
+    spy = mocker.spy(resolver.env_var.command, "run_script")
+    env_var_resolver = resolver.Resolver(
+        _settings(),
+        config.STRATEGY_SNAPSHOT
+    )
+
+    assert env_var_resolver.chain.resolve(
+        ["$PLOVER_LOCAL_ENV_VAR_MISSING"]
+    ).failed == ["$PLOVER_LOCAL_ENV_VAR_MISSING"]
+    spy.assert_not_called()
+
+def test_switching_strategy_retires_the_coprocess_after_swapping(mocker):
+    coprocess = mocker.patch.object(resolver.env_var, "ShellCoprocess")
+    env_var_resolver = resolver.Resolver(
+        _settings(),
+        config.STRATEGY_COPROCESS
+    )
+
+    env_var_resolver.restart()
+    coprocess.return_value.restart.assert_called_once_with()
+
+    previous_chain = env_var_resolver.chain
+    strategies = []
+    coprocess.return_value.retire.side_effect = lambda: strategies.append(
+        (env_var_resolver.strategy, env_var_resolver.chain is previous_chain)
+    )
+    env_var_resolver.use_strategy(config.STRATEGY_SUBPROCESS)
+
+    assert strategies == [(config.STRATEGY_SUBPROCESS, False)]
+    coprocess.return_value.close.assert_not_called()
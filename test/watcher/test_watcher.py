@@ -0,0 +1,56 @@
+import os
+import queue
+
+import pytest
+
+from plover_local_env_var import watcher
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "polling"])
+def watch(request, tmp_path):
+    changes = queue.Queue()
+    rc_file = tmp_path / ".bashrc"
+    rc_file.write_text("export FOO=Bar\n", encoding="utf-8")
+    file_watcher = watcher.FileWatcher(
+        [rc_file, tmp_path / "local_env_var.json"],
+        changes.put,
+        poll_interval=0.05,
+        use_inotify=request.param
+    )
+    if request.param and not file_watcher.uses_inotify:
+        pytest.skip("inotify not available")
+    file_watcher.start()
+
+    yield tmp_path, changes
+
+    file_watcher.stop()
+
+def test_modified_file_is_reported(watch):
+    directory, changes = watch
+    rc_file = directory / ".bashrc"
+    rc_file.write_text("export FOO=Baz\n", encoding="utf-8")
+    os.utime(rc_file, ns=(0, 0))
+
+    assert changes.get(timeout=2) == [str(rc_file)]
+
+def test_created_file_is_reported(watch):
+    directory, changes = watch
+    config_file = directory / "local_env_var.json"
+    config_file.write_text("{}", encoding="utf-8")
+
+    assert changes.get(timeout=2) == [str(config_file)]
+
+def test_replaced_file_is_reported(watch):
+    directory, changes = watch
+    temp_file = directory / ".bashrc.tmp"
+    temp_file.write_text("export FOO=Quux\n", encoding="utf-8")
+    os.replace(temp_file, directory / ".bashrc")
+
+    assert changes.get(timeout=2) == [str(directory / ".bashrc")]
+
+def test_unwatched_file_is_not_reported(watch):
+    directory, changes = watch
+    (directory / ".unrelated").write_text("Hello", encoding="utf-8")
+
+    with pytest.raises(queue.Empty):
+        changes.get(timeout=0.5)